@@ -29,22 +29,31 @@ def setup_logging():
 
 # --- MIDDLEWARE DE SESIÓN ---
 class DBSessionMiddleware(BaseMiddleware):
-    """Middleware para inyectar la sesión de base de datos en los handlers"""
-    def __init__(self, session_pool: async_sessionmaker[AsyncSession]):
+    """Middleware para inyectar la sesión de base de datos en los handlers.
+
+    Con ``use_unit_of_work`` activo los servicios sólo hacen ``flush()`` y se
+    realiza un único commit al terminar la actualización (rollback si falla).
+    """
+    def __init__(self, session_pool: async_sessionmaker[AsyncSession], use_unit_of_work: bool = False):
         self.session_pool = session_pool
+        self.use_unit_of_work = use_unit_of_work
 
     async def __call__(self, handler, event, data):
         async with self.session_pool() as session:
             data["session"] = session
             try:
+                if self.use_unit_of_work:
+                    async with unit_of_work(session):
+                        return await handler(event, data)
                 return await handler(event, data)
             finally:
                 await session.close()
 
 # Imports
-from database.setup import init_db, get_session_factory
+from database.setup import init_db, get_session_factory, close_db
+from database.unit_of_work import unit_of_work
 from utils.message_safety import patch_message_methods
-from utils.config import BOT_TOKEN, VIP_CHANNEL_ID
+from utils.config import BOT_TOKEN, VIP_CHANNEL_ID, Config
 
 # Handlers imports
 from handlers import start, free_user, daily_gift, minigames, setup as setup_handlers
@@ -76,15 +85,24 @@ import combinar_pistas
 from backpack import router as backpack_router
 
 # Services imports
-from services import (
-    channel_request_scheduler,
-    vip_subscription_scheduler,
-    vip_membership_scheduler,
-)
-from services.scheduler import auction_monitor_scheduler, free_channel_cleanup_scheduler
+from services import create_job_scheduler
+from services.point_accumulator import get_point_accumulator
+from services.leaderboard import get_leaderboard
+from services.reaction_counters import get_reaction_counters
+from services.reaction_markup import get_reaction_markup_updater
+from services.event_bus import get_event_bus
+from services.event_journal import get_event_journal
+from services.outbound_dispatcher import OutboundMiddleware, get_outbound_dispatcher
+from services.notification_service import get_notification_aggregator
+from services.webhook_server import run_webhook
 
 # Middlewares
-from middlewares import PointsMiddleware, UserRegistrationMiddleware
+from middlewares import (
+    PointsMiddleware,
+    UserRegistrationMiddleware,
+    RoleCacheMiddleware,
+    VipMembershipMiddleware,
+)
 
 # --- MANEJO DE ERRORES GLOBAL ---
 async def global_error_handler(event: ErrorEvent) -> None:
@@ -111,6 +129,7 @@ class BackgroundTaskManager:
     
     def __init__(self):
         self.tasks: list[asyncio.Task] = []
+        self.shutdown_callbacks: list[tuple[str, callable]] = []
     
     def add_task(self, coro, name: str):
         """Añade una tarea con manejo de errores"""
@@ -126,6 +145,10 @@ class BackgroundTaskManager:
         task = asyncio.create_task(safe_task(), name=name)
         self.tasks.append(task)
         return task
+
+    def add_shutdown_callback(self, callback, name: str):
+        """Registra una corrutina que se ejecuta tras cancelar las tareas"""
+        self.shutdown_callbacks.append((name, callback))
     
     async def shutdown(self):
         """Cierre ordenado de todas las tareas"""
@@ -138,6 +161,12 @@ class BackgroundTaskManager:
         if self.tasks:
             await asyncio.gather(*self.tasks, return_exceptions=True)
         
+        for name, callback in self.shutdown_callbacks:
+            try:
+                await callback()
+            except Exception as e:
+                logging.error(f"Error en cierre de {name}: {e}", exc_info=True)
+        
         logging.info("Todas las tareas cerradas")
 
 # --- FUNCIÓN PRINCIPAL MEJORADA ---
@@ -164,13 +193,15 @@ async def main() -> None:
             BOT_TOKEN, 
             default=DefaultBotProperties(parse_mode=ParseMode.HTML)
         )
+        # Todos los envíos pasan por la cola de salida con límites global y por chat
+        bot.session.middleware(OutboundMiddleware(get_outbound_dispatcher()))
         dp = Dispatcher(storage=MemoryStorage(), session_factory=session_factory)
 
         # Registrar manejo de errores PRIMERO
         dp.error.register(global_error_handler)
 
         # --- MIDDLEWARE DE SESIÓN ---
-        session_middleware = DBSessionMiddleware(session_factory)
+        session_middleware = DBSessionMiddleware(session_factory, use_unit_of_work=Config.DB_UNIT_OF_WORK)
         dp.update.outer_middleware(session_middleware)  # Registrar PRIMERO
 
         # Configurar middlewares en orden correcto
@@ -185,6 +216,11 @@ async def main() -> None:
         dp.poll_answer.middleware(points_middleware)
         dp.message_reaction.middleware(points_middleware)
 
+        # Invalida la caché de roles cuando cambia la membresía de un canal
+        dp.chat_member.outer_middleware(RoleCacheMiddleware())
+        # Registra la membresía del canal VIP a partir de los ChatMemberUpdated
+        dp.chat_member.outer_middleware(VipMembershipMiddleware())
+
         # Registrar routers en orden de prioridad
         logger.info("Registrando handlers...")
         routers = [
@@ -229,30 +265,47 @@ async def main() -> None:
         task_manager = BackgroundTaskManager()
         
         logger.info("Iniciando tareas en segundo plano...")
+        job_scheduler = create_job_scheduler(bot, session_factory)
+        job_scheduler.start()
+        task_manager.add_shutdown_callback(job_scheduler.shutdown, "job_scheduler")
+        leaderboard = get_leaderboard()
+        await leaderboard.seed(session_factory)
         task_manager.add_task(
-            channel_request_scheduler(bot, session_factory), 
-            "channel_requests"
-        )
-        task_manager.add_task(
-            vip_subscription_scheduler(bot, session_factory), 
-            "vip_subscriptions"
-        )
-        task_manager.add_task(
-            vip_membership_scheduler(bot, session_factory), 
-            "vip_memberships"
-        )
-        task_manager.add_task(
-            auction_monitor_scheduler(bot, session_factory), 
-            "auction_monitor"
+            leaderboard.run_reconciler(session_factory, Config.LEADERBOARD_RECONCILE_INTERVAL),
+            "leaderboard_reconcile"
         )
+        reaction_counters = get_reaction_counters()
+        await reaction_counters.seed(session_factory)
         task_manager.add_task(
-            free_channel_cleanup_scheduler(bot, session_factory), 
-            "channel_cleanup"
+            reaction_counters.run_reseeder(session_factory, Config.REACTION_COUNTERS_RESEED_INTERVAL),
+            "reaction_counters_reseed"
         )
+        if Config.POINTS_WRITE_BEHIND:
+            point_accumulator = get_point_accumulator()
+            task_manager.add_task(
+                point_accumulator.run(bot, session_factory),
+                "points_flush"
+            )
+            task_manager.add_shutdown_callback(point_accumulator.shutdown, "points_flush")
+        # Al cerrar se envían las notificaciones que aún esperaban su agregación
+        task_manager.add_shutdown_callback(get_notification_aggregator().shutdown, "notifications")
+        task_manager.add_shutdown_callback(get_reaction_markup_updater().shutdown, "reaction_markup")
+        task_manager.add_shutdown_callback(get_event_bus().shutdown, "event_bus")
+        if Config.EVENT_JOURNAL_DIR:
+            event_journal = get_event_journal()
+            get_event_bus().add_sink(event_journal.append)
+            # Tras el bus: los eventos publicados durante el cierre también quedan en el diario
+            task_manager.add_shutdown_callback(event_journal.close, "event_journal")
 
-        # Iniciar polling
-        logger.info("Bot iniciado correctamente. Comenzando polling...")
-        await dp.start_polling(bot, allowed_updates=dp.resolve_used_update_types())
+        if Config.WEBHOOK_MODE:
+            logger.info("Bot iniciado correctamente. Sirviendo webhook...")
+            await run_webhook(dp, bot)
+        else:
+            # Iniciar polling
+            logger.info("Bot iniciado correctamente. Comenzando polling...")
+            # getUpdates falla mientras haya un webhook registrado de un despliegue anterior
+            await bot.delete_webhook()
+            await dp.start_polling(bot, allowed_updates=dp.resolve_used_update_types())
         
     except Exception as e:
         logger.critical(f"Error crítico en main(): {e}", exc_info=True)
@@ -263,6 +316,7 @@ async def main() -> None:
             await task_manager.shutdown()
             if 'bot' in locals():
                 await bot.session.close()
+            await close_db()
         except Exception as e:
             logger.error(f"Error durante el cierre: {e}", exc_info=True)
 
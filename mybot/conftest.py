@@ -0,0 +1,14 @@
+"""
+Fixtures de pytest comunes a todo el paquete.
+"""
+import pytest
+
+from services.notification_service import reset_notification_aggregator
+
+
+@pytest.fixture(autouse=True)
+def fresh_notification_aggregator():
+    """El agregador de notificaciones es global: cada test empieza con uno vacío."""
+    reset_notification_aggregator()
+    yield
+    reset_notification_aggregator()
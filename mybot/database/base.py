@@ -1,5 +1,17 @@
 # database/base.py
+from typing import TypeVar
+
+from sqlalchemy import inspect
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.ext.asyncio import AsyncAttrs
 
 Base = declarative_base(cls=AsyncAttrs)
+
+ModelT = TypeVar("ModelT")
+
+
+def detached_copy(instance: ModelT) -> ModelT:
+    """Transient copy of ``instance`` holding only its column values."""
+    # Copia transitoria para cachés de proceso: sobrevive a la sesión que cargó el original
+    mapper = inspect(type(instance))
+    return type(instance)(**{attr.key: getattr(instance, attr.key) for attr in mapper.column_attrs})
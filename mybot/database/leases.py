@@ -0,0 +1,50 @@
+# database/leases.py
+"""
+Lease-based leader lock.
+
+A lease row names the replica allowed to run a job until ``expires_at``.
+Acquiring is a single conditional ``UPDATE`` (or an ``INSERT`` for a new
+job), so it is atomic on both SQLite and PostgreSQL without advisory locks.
+The holder renews the lease before it expires; if it dies, another replica
+takes over once the lease runs out.
+"""
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, or_, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .models import SchedulerLease
+
+
+async def acquire_lease(session: AsyncSession, name: str, owner: str, ttl: float) -> bool:
+    """Take or renew the lease ``name`` for ``ttl`` seconds. Returns True if held."""
+    now = datetime.utcnow()
+    expires_at = now + timedelta(seconds=ttl)
+    result = await session.execute(
+        update(SchedulerLease)
+        .where(
+            SchedulerLease.name == name,
+            or_(SchedulerLease.owner == owner, SchedulerLease.expires_at <= now),
+        )
+        .values(owner=owner, expires_at=expires_at)
+    )
+    if result.rowcount:
+        await session.commit()
+        return True
+    try:
+        session.add(SchedulerLease(name=name, owner=owner, expires_at=expires_at))
+        await session.commit()
+        return True
+    except IntegrityError:
+        # Otra réplica tiene el lease vigente
+        await session.rollback()
+        return False
+
+
+async def release_lease(session: AsyncSession, name: str, owner: str) -> None:
+    """Give the lease up so another replica can take it right away."""
+    await session.execute(
+        delete(SchedulerLease).where(SchedulerLease.name == name, SchedulerLease.owner == owner)
+    )
+    await session.commit()
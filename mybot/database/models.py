@@ -30,6 +30,14 @@ class AuctionStatus(enum.Enum):
     CANCELLED = "cancelled"
 
 
+class BroadcastStatus(enum.Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    PAUSED = "paused"
+    COMPLETED = "completed"
+    CANCELLED = "cancelled"
+
+
 
 class User(Base):
     __tablename__ = "users"
@@ -37,7 +45,7 @@ class User(Base):
     username = Column(String, nullable=True)
     first_name = Column(String, nullable=True)
     last_name = Column(String, nullable=True)
-    points = Column(Float, default=0)
+    points = Column(Float, default=0, index=True)
     level = Column(Integer, default=1)
     achievements = Column(JSON, default={})
     missions_completed = Column(JSON, default={})
@@ -46,7 +54,7 @@ class User(Base):
     created_at = Column(DateTime, default=func.now())
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
     role = Column(String, default="free")
-    vip_expires_at = Column(DateTime, nullable=True)
+    vip_expires_at = Column(DateTime, nullable=True, index=True)
     last_reminder_sent_at = Column(DateTime, nullable=True)
     menu_state = Column(String, default="root")
     is_admin = Column(Boolean, default=False) # New column for admin status
@@ -238,6 +246,20 @@ class VipSubscription(Base):
     created_at = Column(DateTime, default=func.now())
 
 
+class ChannelMembership(Base):
+    """Last known membership status of a user in a tracked channel."""
+
+    __tablename__ = "channel_memberships"
+    chat_id = Column(BigInteger, primary_key=True)
+    user_id = Column(BigInteger, primary_key=True)
+    status = Column(String, nullable=False)
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+    # Última comprobación con get_chat_member (NULL = nunca verificado)
+    verified_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (Index("ix_channel_memberships_verified", "chat_id", "verified_at"),)
+
+
 class UserStats(Base):
     """Activity and progression stats per user (points stored in User)."""
 
@@ -275,6 +297,66 @@ class ConfigEntry(Base):
     value = Column(String, nullable=True)
 
 
+class SchedulerLease(Base):
+    """Lease that lets a single bot replica run a scheduled job."""
+
+    __tablename__ = "scheduler_leases"
+    name = Column(String, primary_key=True)
+    owner = Column(String, nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+
+
+class NotificationOutbox(Base):
+    """Notification written with the reward that caused it, sent later by the drainer."""
+
+    __tablename__ = "notification_outbox"
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(BigInteger, nullable=False)
+    notification_type = Column(String, nullable=False)
+    data = Column(JSON, nullable=False, default=dict)
+    priority = Column(Integer, nullable=False, default=2)
+    created_at = Column(DateTime, nullable=False, default=func.now())
+    # Fin de la ventana de agregación: antes de esto no se envía
+    available_at = Column(DateTime, nullable=False, default=func.now())
+    claimed_by = Column(String, nullable=True)
+    claimed_until = Column(DateTime, nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    sent_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_notification_outbox_due", "sent_at", "available_at"),
+        Index("ix_notification_outbox_user", "user_id", "sent_at"),
+    )
+
+
+class Broadcast(Base):
+    """Admin mass message; ``cursor`` is the last user id already processed."""
+
+    __tablename__ = "broadcasts"
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    text = Column(Text, nullable=False)
+    # Filtros de audiencia: role, min_level, active_days
+    audience = Column(JSON, nullable=False, default=dict)
+    status = Column(Enum(BroadcastStatus), nullable=False, default=BroadcastStatus.PENDING)
+    cursor = Column(BigInteger, nullable=False, default=0)
+    total = Column(Integer, nullable=False, default=0)
+    sent = Column(Integer, nullable=False, default=0)
+    failed = Column(Integer, nullable=False, default=0)
+    blocked = Column(Integer, nullable=False, default=0)
+    created_by = Column(BigInteger, nullable=True)
+    created_at = Column(DateTime, default=func.now())
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+
+class BlockedUser(Base):
+    """User that blocked the bot; broadcasts skip them for a while."""
+
+    __tablename__ = "blocked_users"
+    user_id = Column(BigInteger, primary_key=True)
+    blocked_at = Column(DateTime, nullable=False, default=func.now())
+
+
 class BotConfig(Base):
     __tablename__ = "bot_config"
     id = Column(Integer, primary_key=True, autoincrement=True)
@@ -309,6 +391,10 @@ class PendingChannelRequest(Base):
     social_media_message_sent = Column(Boolean, default=False)
     welcome_message_sent = Column(Boolean, default=False)
 
+    __table_args__ = (
+        Index("ix_pending_channel_requests_approved", "approved", "request_timestamp"),
+    )
+
 
 class Challenge(Base):
     __tablename__ = "challenges"
@@ -1,14 +1,23 @@
 # database/setup.py
 import logging
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
-from sqlalchemy.pool import NullPool
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import NullPool, StaticPool
 from .base import Base
+from .pool import (
+    InstrumentedQueuePool,
+    PoolStats,
+    attach_pool_listeners,
+    attach_sqlite_pragmas,
+    attach_sqlite_transactions,
+)
 from utils.config import Config
 
 logger = logging.getLogger(__name__)
 
 _engine = None
 _sessionmaker = None
+_pool_stats = PoolStats()
 
 TABLES_ORDER = [
     'users',
@@ -27,6 +36,10 @@ TABLES_ORDER = [
     'levels',
     'invite_tokens',
     'config_entries',
+    'scheduler_leases',
+    'notification_outbox',
+    'broadcasts',
+    'blocked_users',
     'bot_config',
     'channels',
     'pending_channel_requests',
@@ -39,6 +52,7 @@ TABLES_ORDER = [
     'raffle_entries',
     'user_badges',
     'vip_subscriptions',
+    'channel_memberships',
     'user_stats',
     'user_challenge_progress',
     'button_reactions',
@@ -53,6 +67,35 @@ TABLES_ORDER = [
     'vip_transactions',
 ]
 
+def _build_engine_kwargs(db_url: str) -> dict:
+    """Return pool arguments for ``create_async_engine`` based on ``Config``."""
+    if Config.DB_POOL_MODE == "null":
+        return {"poolclass": NullPool}
+
+    if db_url.startswith("sqlite+aiosqlite://"):
+        database = make_url(db_url).database
+        if not database or database == ":memory:":
+            # Una base en memoria sólo existe dentro de su única conexión
+            return {"poolclass": StaticPool}
+        # SQLite admite un único escritor: WAL deja leer en paralelo y
+        # busy_timeout serializa las escrituras en lugar de fallar con "locked"
+        return {
+            "poolclass": InstrumentedQueuePool,
+            "pool_size": Config.DB_POOL_SIZE,
+            "max_overflow": 0,
+            "pool_timeout": Config.DB_POOL_TIMEOUT,
+        }
+
+    return {
+        "poolclass": InstrumentedQueuePool,
+        "pool_size": Config.DB_POOL_SIZE,
+        "max_overflow": Config.DB_MAX_OVERFLOW,
+        "pool_timeout": Config.DB_POOL_TIMEOUT,
+        "pool_recycle": Config.DB_POOL_RECYCLE,
+        "pool_pre_ping": True,
+    }
+
+
 async def init_db():
     global _engine
     try:
@@ -66,11 +109,20 @@ async def init_db():
             raise ValueError("DATABASE_URL debe comenzar con 'postgresql+asyncpg://' o 'sqlite+aiosqlite://'")
 
         if _engine is None:
+            engine_kwargs = _build_engine_kwargs(db_url)
             _engine = create_async_engine(
                 db_url,
                 echo=False,
-                poolclass=NullPool
+                **engine_kwargs
             )
+            if isinstance(_engine.pool, InstrumentedQueuePool):
+                _engine.pool.stats = _pool_stats
+            attach_pool_listeners(_engine.sync_engine, _pool_stats)
+            if db_url.startswith("sqlite+aiosqlite://"):
+                attach_sqlite_transactions(_engine.sync_engine)
+                if engine_kwargs["poolclass"] is not NullPool:
+                    attach_sqlite_pragmas(_engine.sync_engine, Config.SQLITE_BUSY_TIMEOUT_MS)
+            logger.info(f"Pool de conexiones: {engine_kwargs['poolclass'].__name__}")
 
         async with _engine.begin() as conn:
             logger.info("Creando tablas en orden definido...")
@@ -83,6 +135,22 @@ async def init_db():
         logger.critical(f"Error crítico al inicializar la base de datos: {e}")
         raise
 
+def get_pool_stats() -> dict:
+    """Return checkout/wait/overflow statistics of the engine pool."""
+    return _pool_stats.snapshot(_engine.pool if _engine is not None else None)
+
+
+async def close_db() -> None:
+    """Dispose the engine and release every pooled connection."""
+    global _engine, _sessionmaker
+    if _engine is None:
+        return
+    logger.info(f"Estadísticas del pool al cerrar: {get_pool_stats()}")
+    await _engine.dispose()
+    _engine = None
+    _sessionmaker = None
+
+
 def get_session_factory():
     global _sessionmaker
     if _engine is None:
@@ -0,0 +1,73 @@
+# database/unit_of_work.py
+"""
+Request-scoped unit of work.
+
+When a session is opened through :func:`unit_of_work`, services only
+``flush()`` their changes and the single ``commit()`` happens when the update
+finishes. Sessions used outside of a unit of work keep committing eagerly,
+so scripts and schedulers behave exactly as before.
+"""
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+UNIT_OF_WORK_KEY = "unit_of_work"
+
+
+def in_unit_of_work(session: AsyncSession) -> bool:
+    """Return True if ``session`` is managed by a request-scoped unit of work."""
+    return bool(session.info.get(UNIT_OF_WORK_KEY))
+
+
+async def commit_or_flush(session: AsyncSession) -> None:
+    """Flush inside a unit of work, commit otherwise."""
+    if in_unit_of_work(session):
+        await session.flush()
+    else:
+        await session.commit()
+
+
+async def refresh_if_committed(session: AsyncSession, *instances) -> None:
+    """Refresh instances only when the previous write was really committed.
+
+    Inside a unit of work the identity map already holds the flushed state,
+    so the extra SELECT round trips are skipped.
+    """
+    if in_unit_of_work(session):
+        return
+    for instance in instances:
+        await session.refresh(instance)
+
+
+@asynccontextmanager
+async def savepoint(session: AsyncSession) -> AsyncIterator[None]:
+    """Open a SAVEPOINT inside a unit of work so a failure only undoes this block.
+
+    Outside a unit of work the block commits on its own, so a failure leaves
+    nothing to preserve and the session is simply rolled back.
+    """
+    if in_unit_of_work(session):
+        async with session.begin_nested():
+            yield
+    else:
+        try:
+            yield
+        except BaseException:
+            await session.rollback()
+            raise
+
+
+@asynccontextmanager
+async def unit_of_work(session: AsyncSession) -> AsyncIterator[AsyncSession]:
+    """Commit once when the block succeeds and roll back everything on error."""
+    session.info[UNIT_OF_WORK_KEY] = True
+    try:
+        yield session
+        if session.in_transaction():
+            await session.commit()
+    except BaseException:
+        await session.rollback()
+        raise
+    finally:
+        session.info.pop(UNIT_OF_WORK_KEY, None)
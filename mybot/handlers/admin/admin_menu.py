@@ -35,6 +35,7 @@ from .game_admin import router as game_admin_router
 from .event_admin import router as event_admin_router
 from .admin_config import router as admin_config_router
 from .narrative_admin import router as narrative_admin_router
+from .broadcast_admin import router as broadcast_admin_router
 
 router.include_router(vip_router)
 router.include_router(free_router)
@@ -45,6 +46,7 @@ router.include_router(game_admin_router)
 router.include_router(event_admin_router)
 router.include_router(admin_config_router)
 router.include_router(narrative_admin_router)
+router.include_router(broadcast_admin_router)
 
 @router.message(Command("admin"))
 async def admin_start(message: Message, session: AsyncSession):
@@ -0,0 +1,163 @@
+from aiogram import Router, F
+from aiogram.types import CallbackQuery, Message
+from aiogram.fsm.context import FSMContext
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.models import BroadcastStatus
+from keyboards.admin_broadcast_kb import (
+    AUDIENCE_PRESETS,
+    get_admin_broadcast_kb,
+    get_broadcast_audience_kb,
+    get_broadcast_confirm_kb,
+)
+from keyboards.common import get_back_kb
+from services.broadcast_service import (
+    count_audience,
+    create_broadcast,
+    get_broadcast_engine,
+    get_recent_broadcasts,
+    set_broadcast_status,
+)
+from utils.admin_state import AdminBroadcastStates
+from utils.menu_utils import update_menu
+from utils.user_roles import is_admin
+
+router = Router()
+
+STATUS_LABELS = {
+    BroadcastStatus.PENDING: "⏳ En cola",
+    BroadcastStatus.RUNNING: "📤 Enviando",
+    BroadcastStatus.PAUSED: "⏸ Pausada",
+    BroadcastStatus.COMPLETED: "✅ Completada",
+    BroadcastStatus.CANCELLED: "⛔ Detenida",
+}
+OPEN_STATUSES = (BroadcastStatus.PENDING, BroadcastStatus.RUNNING, BroadcastStatus.PAUSED)
+
+
+def _format_eta(seconds) -> str:
+    if seconds is None:
+        return "—"
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h {minutes}m" if hours else f"{minutes}m {seconds}s"
+
+
+def _format_broadcast(broadcast) -> str:
+    progress = get_broadcast_engine().progress(broadcast)
+    done = progress["sent"] + progress["failed"] + progress["blocked"]
+    preview = broadcast.text if len(broadcast.text) <= 40 else broadcast.text[:40] + "…"
+    return (
+        f"#{broadcast.id} {STATUS_LABELS[broadcast.status]} — {preview}\n"
+        f"   {done}/{progress['total']} · ✅ {progress['sent']} · ❌ {progress['failed']} "
+        f"· 🚫 {progress['blocked']}\n"
+        f"   {progress['rate']} msg/s · ETA {_format_eta(progress['eta'])}"
+    )
+
+
+async def _show_menu(callback: CallbackQuery, session: AsyncSession) -> None:
+    broadcasts = await get_recent_broadcasts(session)
+    current = next((b for b in broadcasts if b.status in OPEN_STATUSES), None)
+    text = "📢 **Difusión**\n\n"
+    if broadcasts:
+        text += "\n\n".join(_format_broadcast(b) for b in broadcasts)
+    else:
+        text += "No hay difusiones todavía."
+    await update_menu(
+        callback,
+        text,
+        get_admin_broadcast_kb(current),
+        session,
+        "admin_broadcast",
+    )
+
+
+@router.callback_query(F.data == "admin_broadcast")
+async def admin_broadcast_menu(callback: CallbackQuery, session: AsyncSession, state: FSMContext):
+    if not await is_admin(callback.from_user.id, session):
+        return await callback.answer()
+    await state.clear()
+    await _show_menu(callback, session)
+    await callback.answer()
+
+
+@router.callback_query(F.data == "broadcast_new")
+async def broadcast_new(callback: CallbackQuery, session: AsyncSession):
+    if not await is_admin(callback.from_user.id, session):
+        return await callback.answer()
+    await callback.message.edit_text(
+        "¿A quién se envía la difusión?", reply_markup=get_broadcast_audience_kb()
+    )
+    await callback.answer()
+
+
+@router.callback_query(F.data.startswith("broadcast_aud:"))
+async def broadcast_audience(callback: CallbackQuery, session: AsyncSession, state: FSMContext):
+    if not await is_admin(callback.from_user.id, session):
+        return await callback.answer()
+    key = callback.data.split(":", 1)[1]
+    if key not in AUDIENCE_PRESETS:
+        return await callback.answer("Audiencia no válida", show_alert=True)
+    await state.update_data(audience_key=key)
+    await state.set_state(AdminBroadcastStates.waiting_for_text)
+    await callback.message.edit_text(
+        "Envía el texto de la difusión:", reply_markup=get_back_kb("admin_broadcast")
+    )
+    await callback.answer()
+
+
+@router.message(AdminBroadcastStates.waiting_for_text)
+async def broadcast_text(message: Message, session: AsyncSession, state: FSMContext):
+    if not await is_admin(message.from_user.id, session):
+        return
+    if not message.text:
+        return await message.answer("Envía un mensaje de texto.")
+    data = await state.get_data()
+    label, audience = AUDIENCE_PRESETS[data["audience_key"]]
+    total = await count_audience(session, audience)
+    await state.update_data(text=message.text)
+    await state.set_state(AdminBroadcastStates.confirming)
+    await message.answer(
+        f"📢 Vista previa\n\nAudiencia: {label} ({total} usuarios)\n\n{message.text}",
+        reply_markup=get_broadcast_confirm_kb(),
+    )
+
+
+@router.callback_query(AdminBroadcastStates.confirming, F.data == "broadcast_confirm")
+async def broadcast_confirm(callback: CallbackQuery, session: AsyncSession, state: FSMContext):
+    if not await is_admin(callback.from_user.id, session):
+        return await callback.answer()
+    data = await state.get_data()
+    await state.clear()
+    _, audience = AUDIENCE_PRESETS[data["audience_key"]]
+    broadcast = await create_broadcast(session, data["text"], audience, callback.from_user.id)
+    await callback.message.edit_text(
+        f"✅ Difusión #{broadcast.id} en cola para {broadcast.total} usuarios.",
+        reply_markup=get_back_kb("admin_broadcast"),
+    )
+    await callback.answer()
+
+
+async def _change_status(callback: CallbackQuery, session: AsyncSession, status: BroadcastStatus, done: str):
+    if not await is_admin(callback.from_user.id, session):
+        return await callback.answer()
+    broadcast_id = int(callback.data.split(":", 1)[1])
+    if await set_broadcast_status(session, broadcast_id, status) is None:
+        return await callback.answer("La difusión ya terminó", show_alert=True)
+    await _show_menu(callback, session)
+    await callback.answer(done)
+
+
+@router.callback_query(F.data.startswith("broadcast_pause:"))
+async def broadcast_pause(callback: CallbackQuery, session: AsyncSession):
+    await _change_status(callback, session, BroadcastStatus.PAUSED, "Difusión pausada")
+
+
+@router.callback_query(F.data.startswith("broadcast_resume:"))
+async def broadcast_resume(callback: CallbackQuery, session: AsyncSession):
+    # Vuelve a RUNNING: el motor continúa desde el cursor guardado
+    await _change_status(callback, session, BroadcastStatus.RUNNING, "Difusión reanudada")
+
+
+@router.callback_query(F.data.startswith("broadcast_stop:"))
+async def broadcast_stop(callback: CallbackQuery, session: AsyncSession):
+    await _change_status(callback, session, BroadcastStatus.CANCELLED, "Difusión detenida")
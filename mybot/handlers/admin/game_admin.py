@@ -145,8 +145,11 @@ async def process_points_amount(message: Message, state: FSMContext, session: As
         await service.add_points(user_id, amount)
         await message.answer(f"Se han sumado {amount} puntos a {user_id}.")
     else:
-        await service.deduct_points(user_id, amount)
-        await message.answer(f"Se han restado {amount} puntos a {user_id}.")
+        # Un saldo final de 0.0 también es un descuento correcto
+        if await service.deduct_points(user_id, amount) is None:
+            await message.answer(f"No se pudieron restar {amount} puntos a {user_id}: saldo insuficiente.")
+        else:
+            await message.answer(f"Se han restado {amount} puntos a {user_id}.")
     await state.clear()
 
 
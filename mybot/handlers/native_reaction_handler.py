@@ -159,11 +159,8 @@ async def _send_unified_notification(
                 "is_native": True
             }
         )
-        
-        # Forzar envío para asegurar que todas las notificaciones se procesen
-        # después del tiempo de agregación
-        await asyncio.sleep(notification_service.aggregation_delay + 0.1)
-        await notification_service.flush_pending_notifications(user_id)
+
+        # El agregador global las envía juntas cuando vence su plazo
         
         logger.debug(f"Added unified notifications for user {user_id}")
         
@@ -0,0 +1,45 @@
+from typing import Optional
+
+from aiogram.utils.keyboard import InlineKeyboardBuilder
+
+from database.models import Broadcast, BroadcastStatus
+
+AUDIENCE_PRESETS = {
+    "all": ("👥 Todos", {}),
+    "vip": ("💎 VIP", {"role": "vip"}),
+    "free": ("💬 Free", {"role": "free"}),
+    "active7": ("🔥 Activos 7 días", {"active_days": 7}),
+    "level5": ("⭐ Nivel 5+", {"min_level": 5}),
+}
+
+
+def get_admin_broadcast_kb(current: Optional[Broadcast] = None):
+    builder = InlineKeyboardBuilder()
+    builder.button(text="➕ Nueva Difusión", callback_data="broadcast_new")
+    if current is not None:
+        if current.status == BroadcastStatus.PAUSED:
+            builder.button(text="▶️ Reanudar", callback_data=f"broadcast_resume:{current.id}")
+        else:
+            builder.button(text="⏸ Pausar", callback_data=f"broadcast_pause:{current.id}")
+        builder.button(text="⛔ Detener", callback_data=f"broadcast_stop:{current.id}")
+    builder.button(text="🔄 Actualizar", callback_data="admin_broadcast")
+    builder.button(text="🔙 Volver", callback_data="admin_main_menu")
+    builder.adjust(1)
+    return builder.as_markup()
+
+
+def get_broadcast_audience_kb():
+    builder = InlineKeyboardBuilder()
+    for key, (label, _) in AUDIENCE_PRESETS.items():
+        builder.button(text=label, callback_data=f"broadcast_aud:{key}")
+    builder.button(text="🔙 Volver", callback_data="admin_broadcast")
+    builder.adjust(1)
+    return builder.as_markup()
+
+
+def get_broadcast_confirm_kb():
+    builder = InlineKeyboardBuilder()
+    builder.button(text="✅ Enviar", callback_data="broadcast_confirm")
+    builder.button(text="❌ Cancelar", callback_data="admin_broadcast")
+    builder.adjust(2)
+    return builder.as_markup()
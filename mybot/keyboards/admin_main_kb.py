@@ -37,10 +37,13 @@ async def get_admin_main_kb(session: AsyncSession = None):
     builder.button(text="📊 Estadísticas", callback_data="admin_stats")
     builder.button(text="⚙️ Configuración", callback_data="admin_config")
     
-    # Fila 5: Navegación
+    # Fila 5: Comunicación
+    builder.button(text="📢 Difusión", callback_data="admin_broadcast")
+    
+    # Fila 6: Navegación
     builder.button(text="🔄 Actualizar", callback_data="admin_main_menu")
     builder.button(text="↩️ Volver", callback_data="admin_back")
     
-    # Distribución: 2x2x2x2x2 = 10 botones total
-    builder.adjust(2, 2, 2, 2, 2)
+    # Distribución: 2x2x2x2x1x2 = 11 botones total
+    builder.adjust(2, 2, 2, 2, 1, 2)
     return builder.as_markup()
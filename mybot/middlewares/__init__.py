@@ -1,7 +1,11 @@
 from .points_middleware import PointsMiddleware
 from .user_middleware import UserRegistrationMiddleware
+from .role_cache_middleware import RoleCacheMiddleware
+from .vip_membership_middleware import VipMembershipMiddleware
 
 __all__ = [
     "PointsMiddleware",
     "UserRegistrationMiddleware",
+    "RoleCacheMiddleware",
+    "VipMembershipMiddleware",
 ]
@@ -0,0 +1,25 @@
+from __future__ import annotations
+
+import logging
+from typing import Any, Callable, Dict
+from aiogram import BaseMiddleware
+from aiogram.types import ChatMemberUpdated
+
+from utils.user_roles import clear_role_cache
+
+logger = logging.getLogger(__name__)
+
+
+class RoleCacheMiddleware(BaseMiddleware):
+    """Drop the cached role of users whose channel membership changed."""
+
+    async def __call__(
+        self,
+        handler: Callable[[ChatMemberUpdated, Dict[str, Any]], Any],
+        event: ChatMemberUpdated,
+        data: Dict[str, Any],
+    ) -> Any:
+        member = getattr(event, "new_chat_member", None)
+        if member is not None and member.user:
+            clear_role_cache(member.user.id)
+        return await handler(event, data)
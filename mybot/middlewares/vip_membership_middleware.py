@@ -0,0 +1,35 @@
+from __future__ import annotations
+
+import logging
+from typing import Any, Callable, Dict
+from aiogram import BaseMiddleware
+from aiogram.types import ChatMemberUpdated
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from services.config_service import ConfigService
+from services.vip_membership import track_member_update
+
+logger = logging.getLogger(__name__)
+
+
+class VipMembershipMiddleware(BaseMiddleware):
+    """Record VIP channel membership changes and promote users who join it."""
+
+    async def __call__(
+        self,
+        handler: Callable[[ChatMemberUpdated, Dict[str, Any]], Any],
+        event: ChatMemberUpdated,
+        data: Dict[str, Any],
+    ) -> Any:
+        session: AsyncSession | None = data.get("session")
+        member = getattr(event, "new_chat_member", None)
+        if session and member is not None and member.user:
+            try:
+                vip_channel_id = await ConfigService(session).get_vip_channel_id()
+                if vip_channel_id and event.chat.id == vip_channel_id:
+                    await track_member_update(
+                        session, event.chat.id, member.user.id, member.status
+                    )
+            except Exception as e:
+                logger.error("Error tracking VIP membership of %s: %s", member.user.id, e)
+        return await handler(event, data)
@@ -0,0 +1,4 @@
+-- Database migration script for the points leaderboard
+-- Index used by ranking queries (ORDER BY points DESC) and rank lookups
+
+CREATE INDEX IF NOT EXISTS ix_users_points ON users(points);
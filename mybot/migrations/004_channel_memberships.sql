@@ -0,0 +1,13 @@
+-- Database migration script for the VIP membership tracker
+-- Stores the last known status of each user in tracked channels
+
+CREATE TABLE IF NOT EXISTS channel_memberships (
+    chat_id BIGINT NOT NULL,
+    user_id BIGINT NOT NULL,
+    status VARCHAR NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    verified_at TIMESTAMP,
+    PRIMARY KEY (chat_id, user_id)
+);
+
+CREATE INDEX IF NOT EXISTS ix_channel_memberships_verified ON channel_memberships(chat_id, verified_at);
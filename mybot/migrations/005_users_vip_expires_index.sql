@@ -0,0 +1,4 @@
+-- Database migration script for the VIP expiry queue
+-- Index used to load upcoming VIP deadlines
+
+CREATE INDEX IF NOT EXISTS ix_users_vip_expires_at ON users(vip_expires_at);
@@ -0,0 +1,8 @@
+-- Database migration script for the job scheduler leader lock
+-- One row per job; the replica holding an unexpired lease runs the job
+
+CREATE TABLE IF NOT EXISTS scheduler_leases (
+    name VARCHAR PRIMARY KEY,
+    owner VARCHAR NOT NULL,
+    expires_at TIMESTAMP NOT NULL
+);
@@ -0,0 +1,4 @@
+-- Database migration script for the join request pipeline
+-- Index used to load unapproved requests ordered by request time
+
+CREATE INDEX IF NOT EXISTS ix_pending_channel_requests_approved ON pending_channel_requests(approved, request_timestamp);
@@ -0,0 +1,19 @@
+-- Database migration script for the durable notification outbox
+-- Rows are written in the same transaction as the reward and sent by the drainer
+
+CREATE TABLE IF NOT EXISTS notification_outbox (
+    id INTEGER PRIMARY KEY,
+    user_id BIGINT NOT NULL,
+    notification_type VARCHAR NOT NULL,
+    data JSON NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 2,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    available_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    claimed_by VARCHAR,
+    claimed_until TIMESTAMP,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    sent_at TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS ix_notification_outbox_due ON notification_outbox(sent_at, available_at);
+CREATE INDEX IF NOT EXISTS ix_notification_outbox_user ON notification_outbox(user_id, sent_at);
@@ -0,0 +1,24 @@
+-- Database migration script for the broadcast engine
+-- Broadcasts keep a keyset cursor so they resume after a restart
+
+CREATE TABLE IF NOT EXISTS broadcasts (
+    id INTEGER PRIMARY KEY,
+    text TEXT NOT NULL,
+    audience JSON NOT NULL,
+    status VARCHAR(9) NOT NULL DEFAULT 'PENDING',
+    cursor BIGINT NOT NULL DEFAULT 0,
+    total INTEGER NOT NULL DEFAULT 0,
+    sent INTEGER NOT NULL DEFAULT 0,
+    failed INTEGER NOT NULL DEFAULT 0,
+    blocked INTEGER NOT NULL DEFAULT 0,
+    created_by BIGINT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    started_at TIMESTAMP,
+    finished_at TIMESTAMP
+);
+
+-- Users that blocked the bot
+CREATE TABLE IF NOT EXISTS blocked_users (
+    user_id BIGINT PRIMARY KEY,
+    blocked_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
@@ -0,0 +1,85 @@
+"""
+Reproduce eventos del diario (EVENT_JOURNAL_DIR) hacia los suscriptores actuales.
+
+Uso, desde la carpeta ``mybot``:
+
+    python -m scripts.replay_events --since 2026-10-01T00:00:00 --until 2026-10-02T00:00:00 --list
+    python -m scripts.replay_events --user 123456 --list
+    python -m scripts.replay_events --type points_awarded --speed 10 --apply
+
+Con ``--list`` sólo se muestran los eventos. Con ``--apply`` se registran las
+suscripciones de EventCoordinator y CrossModuleRewards sobre la base de datos
+configurada y se les entregan los eventos.
+
+Atención: esos manejadores no son idempotentes. Otorgan puntos e insignias y
+escriben notificaciones, así que reproducir eventos que ya se procesaron en la
+misma base de datos duplica las recompensas. ``--apply`` está pensado para
+una base de datos restaurada de antes del rango reproducido (o vacía), no
+para la de producción en marcha.
+"""
+import argparse
+import asyncio
+import logging
+from datetime import datetime
+
+from database.setup import close_db, get_session_factory, init_db
+from services.event_bus import EventType, get_event_bus
+from services.event_journal import read_events, replay
+from services.integration.event_coordinator import EventCoordinator
+from services.rewards.cross_module_rewards import CrossModuleRewards
+from utils.config import Config
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Reproduce eventos del diario del EventBus")
+    parser.add_argument("--dir", default=Config.EVENT_JOURNAL_DIR, help="Carpeta del diario")
+    parser.add_argument("--since", type=datetime.fromisoformat, help="Inicio (ISO, UTC)")
+    parser.add_argument("--until", type=datetime.fromisoformat, help="Fin (ISO, UTC)")
+    parser.add_argument("--type", action="append", type=EventType, dest="types", help="Tipo de evento, repetible")
+    parser.add_argument("--user", type=int, help="Sólo eventos de este usuario")
+    parser.add_argument("--correlation", help="Sólo eventos con este correlation_id")
+    parser.add_argument("--speed", type=float, default=0.0, help="Respeta los tiempos originales divididos por N")
+    parser.add_argument("--list", action="store_true", help="Mostrar los eventos sin reproducirlos")
+    parser.add_argument(
+        "--apply",
+        action="store_true",
+        help="Entregar los eventos a los manejadores (no idempotentes: vuelven a otorgar recompensas)",
+    )
+    args = parser.parse_args()
+    if not args.list and not args.apply:
+        parser.error("indica --list para ver los eventos o --apply para reproducirlos sobre la base de datos")
+    return args
+
+
+async def main() -> None:
+    args = parse_args()
+    if not args.dir:
+        raise SystemExit("Indica la carpeta del diario con --dir o EVENT_JOURNAL_DIR")
+    events = read_events(args.dir, args.since, args.until, args.types, args.user, args.correlation)
+
+    if args.list:
+        for event in events:
+            print(f"{event.timestamp.isoformat()} {event.event_type.value} user={event.user_id} {event.data}")
+        return
+
+    await init_db()
+    bus = get_event_bus()
+    try:
+        async with get_session_factory()() as session:
+            await EventCoordinator(session).setup_cross_module_subscriptions()
+            await CrossModuleRewards(session)._setup_event_subscriptions()
+        count = await replay(bus, events, args.speed)
+        await bus.shutdown(timeout=60)
+        logger.info(f"Replayed {count} events")
+    finally:
+        await close_db()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -68,7 +68,7 @@ class NotificationSystemVerifier:
         
         required_methods = [
             "add_notification",
-            "_schedule_send_with_priority",
+            "get_pending_count",
             "_build_enhanced_unified_message",
             "send_immediate_notification",
             "flush_pending_notifications"
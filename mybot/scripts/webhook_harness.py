@@ -0,0 +1,121 @@
+"""
+Envía actualizaciones sintéticas al webhook local para probarlo sin Telegram.
+
+Uso, desde la carpeta ``mybot`` y con el bot arrancado con ``WEBHOOK_MODE=1``
+(sin ``WEBHOOK_BASE_URL`` no se registra en Telegram):
+
+    python -m scripts.webhook_harness --count 1000 --users 50 --concurrency 40
+    python -m scripts.webhook_harness --kind callback --data menu:main
+    python -m scripts.webhook_harness --secret incorrecto --count 1
+
+Cada petición lleva ``X-Telegram-Bot-Api-Secret-Token`` con ``WEBHOOK_SECRET``.
+Al terminar se muestran los códigos de respuesta y la latencia del acuse
+(p50/p95/máx): mide la ingesta, no el tiempo de los manejadores, que se
+procesan después en los workers del bot.
+"""
+import argparse
+import asyncio
+import itertools
+import time
+from collections import Counter
+from typing import Any, Dict, List
+
+from aiohttp import ClientSession, ClientTimeout
+
+from utils.config import Config
+
+# Ids altos para no coincidir con usuarios reales de la base de datos
+FIRST_USER_ID = 9_000_000_000
+FIRST_UPDATE_ID = int(time.time())
+
+
+def _user(user_id: int) -> Dict[str, Any]:
+    return {"id": user_id, "is_bot": False, "first_name": f"Harness {user_id}", "language_code": "es"}
+
+
+def build_update(kind: str, update_id: int, user_id: int, text: str, data: str) -> Dict[str, Any]:
+    """Return a minimal Telegram update of ``kind`` sent by ``user_id``."""
+    message = {
+        "message_id": update_id,
+        "date": int(time.time()),
+        "chat": {"id": user_id, "type": "private", "first_name": f"Harness {user_id}"},
+        "from": _user(user_id),
+        "text": text,
+    }
+    if text.startswith("/"):
+        message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}]
+    if kind == "message":
+        return {"update_id": update_id, "message": message}
+    return {
+        "update_id": update_id,
+        "callback_query": {
+            "id": str(update_id),
+            "from": _user(user_id),
+            "chat_instance": str(user_id),
+            "message": message,
+            "data": data,
+        },
+    }
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Envía actualizaciones sintéticas al webhook local")
+    parser.add_argument(
+        "--url",
+        default=f"http://127.0.0.1:{Config.WEBHOOK_PORT}{Config.WEBHOOK_PATH}",
+        help="URL del webhook",
+    )
+    parser.add_argument("--secret", default=Config.WEBHOOK_SECRET, help="Secreto enviado en la cabecera")
+    parser.add_argument("--count", type=int, default=100, help="Actualizaciones a enviar")
+    parser.add_argument("--users", type=int, default=10, help="Usuarios distintos entre los que repartirlas")
+    parser.add_argument("--concurrency", type=int, default=20, help="Peticiones simultáneas")
+    parser.add_argument("--kind", choices=("message", "callback"), default="message")
+    parser.add_argument("--text", default="/start", help="Texto de los mensajes")
+    parser.add_argument("--data", default="menu:main", help="callback_data de los callbacks")
+    return parser.parse_args()
+
+
+def _percentile(values: List[float], fraction: float) -> float:
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+async def main() -> None:
+    args = parse_args()
+    headers = {"X-Telegram-Bot-Api-Secret-Token": args.secret} if args.secret else {}
+    update_ids = itertools.count(FIRST_UPDATE_ID)
+    statuses: Counter = Counter()
+    latencies: List[float] = []
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def post(session: ClientSession, number: int) -> None:
+        update_id = next(update_ids)
+        update = build_update(args.kind, update_id, FIRST_USER_ID + number % args.users, args.text, args.data)
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                async with session.post(args.url, json=update, headers=headers) as response:
+                    await response.read()
+                    statuses[response.status] += 1
+            except Exception as e:
+                statuses[type(e).__name__] += 1
+                return
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    async with ClientSession(timeout=ClientTimeout(total=30)) as session:
+        await asyncio.gather(*(post(session, number) for number in range(args.count)))
+    elapsed = time.perf_counter() - started
+
+    print(f"{args.count} actualizaciones en {elapsed:.2f}s ({args.count / elapsed:.0f}/s)")
+    print("Respuestas: " + ", ".join(f"{status}={count}" for status, count in sorted(statuses.items(), key=str)))
+    if latencies:
+        latencies.sort()
+        print(
+            f"Acuse: p50 {_percentile(latencies, 0.5) * 1000:.1f} ms, "
+            f"p95 {_percentile(latencies, 0.95) * 1000:.1f} ms, "
+            f"máx {latencies[-1] * 1000:.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
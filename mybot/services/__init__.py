@@ -14,7 +14,7 @@ from .message_service import MessageService
 from .auction_service import AuctionService
 from .user_service import UserService
 from .lore_piece_service import LorePieceService
-from .scheduler import channel_request_scheduler, vip_subscription_scheduler, vip_membership_scheduler
+from .scheduler import create_job_scheduler, vip_subscription_scheduler
 
 __all__ = [
     "AchievementService",
@@ -29,9 +29,8 @@ __all__ = [
     "validate_token",
     "ConfigService",
     "ChannelService",
-    "channel_request_scheduler",
+    "create_job_scheduler",
     "vip_subscription_scheduler",
-    "vip_membership_scheduler",
     "EventService",
     "RaffleService",
     "MessageService",
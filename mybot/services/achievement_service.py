@@ -1,8 +1,10 @@
 from __future__ import annotations
 
+from typing import Iterable
 
 from aiogram import Bot
 from sqlalchemy import select, func
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from database.models import (
@@ -15,6 +17,9 @@ from database.models import (
     UserStats,
     UserMissionEntry,
 )
+from database.unit_of_work import commit_or_flush, savepoint
+from services.badge_engine import BadgeEvaluator, get_owned_badge_ids, mark_badge_owned
+from services.outbound_dispatcher import notify_after_commit
 
 PREDEFINED_ACHIEVEMENTS = [
     {
@@ -72,7 +77,7 @@ class AchievementService:
                 obj = Achievement(**ach)
                 self.session.add(obj)
         if self.session.new:
-            await self.session.commit()
+            await commit_or_flush(self.session)
 
     async def _grant(self, user_id: int, achievement: Achievement, *, bot: Bot | None = None) -> bool:
         stmt = select(UserAchievement).where(
@@ -82,11 +87,14 @@ class AchievementService:
         result = await self.session.execute(stmt)
         if result.scalar_one_or_none():
             return False
-        obj = UserAchievement(user_id=user_id, achievement_id=achievement.id)
-        self.session.add(obj)
-        await self.session.commit()
+        try:
+            async with savepoint(self.session):
+                self.session.add(UserAchievement(user_id=user_id, achievement_id=achievement.id))
+                await commit_or_flush(self.session)
+        except IntegrityError:
+            return False
         if bot:
-            await bot.send_message(user_id, achievement.reward_text)
+            await notify_after_commit(self.session, bot, user_id, achievement.reward_text)
         return True
 
     async def _check_and_grant(self, user_id: int, condition_type: str, value: int, bot: Bot | None = None):
@@ -120,60 +128,46 @@ class AchievementService:
 
     # ----- Badge related methods -----
     async def _badge_condition_met(self, user_id: int, badge: Badge) -> bool:
-        progress = await self.session.get(UserStats, user_id)
-        if not progress:
-            return False
-        if badge.condition_type == "messages":
-            return progress.messages_sent >= badge.condition_value
-        if badge.condition_type == "login_streak":
-            return progress.checkin_streak >= badge.condition_value
-        if badge.condition_type == "missions":
-            stmt = select(func.count()).select_from(UserMissionEntry).where(
-                UserMissionEntry.user_id == user_id,
-                UserMissionEntry.completed == True,
-            )
-            count = (await self.session.execute(stmt)).scalar() or 0
-            return count >= badge.condition_value
-        if badge.condition_type == "invites":
-            stmt = select(func.count()).select_from(InviteToken).where(
-                InviteToken.created_by == user_id,
-                InviteToken.used_by.is_not(None),
-            )
-            count = (await self.session.execute(stmt)).scalar() or 0
-            return count >= badge.condition_value
-        return False
-
-    async def check_user_badges(self, user_id: int) -> list[Badge]:
-        stmt = select(Badge).where(Badge.is_active == True)
-        badges = (await self.session.execute(stmt)).scalars().all()
-        unlockable = []
-        for badge in badges:
-            stmt = select(UserBadge).where(
-                UserBadge.user_id == user_id,
-                UserBadge.badge_id == badge.id,
-            )
-            existing = (await self.session.execute(stmt)).scalar_one_or_none()
-            if existing:
-                continue
-            if await self._badge_condition_met(user_id, badge):
-                unlockable.append(badge)
-        return unlockable
+        return await BadgeEvaluator(self.session).condition_met(user_id, badge)
+
+    async def check_user_badges(self, user_id: int, condition_types: Iterable[str] | None = None) -> list[Badge]:
+        """Return unlockable badges, optionally only those driven by ``condition_types``."""
+        return await BadgeEvaluator(self.session).evaluate(user_id, condition_types)
+
+    async def award_unlocked_badges(
+        self, user_id: int, condition_types: Iterable[str], *, bot: Bot | None = None
+    ) -> list[Badge]:
+        """Award and announce the badges of ``condition_types`` the user has just unlocked."""
+        awarded = []
+        for badge in await self.check_user_badges(user_id, condition_types):
+            if await self.award_badge(user_id, badge.id):
+                awarded.append(badge)
+                if bot:
+                    await notify_after_commit(
+                        self.session,
+                        bot,
+                        user_id,
+                        f"🏅 Has obtenido la insignia {badge.icon or ''} {badge.name}!",
+                    )
+        return awarded
 
     async def award_badge(self, user_id: int, badge_id: int, *, force: bool = False) -> bool:
         badge = await self.session.get(Badge, badge_id)
         if not badge or not badge.is_active:
             return False
-        stmt = select(UserBadge).where(
-            UserBadge.user_id == user_id,
-            UserBadge.badge_id == badge_id,
-        )
-        existing = (await self.session.execute(stmt)).scalar_one_or_none()
-        if existing:
+        if badge_id in await get_owned_badge_ids(self.session, user_id):
             return False
         if not force and not await self._badge_condition_met(user_id, badge):
             return False
-        self.session.add(UserBadge(user_id=user_id, badge_id=badge_id))
-        await self.session.commit()
+        try:
+            async with savepoint(self.session):
+                self.session.add(UserBadge(user_id=user_id, badge_id=badge_id))
+                await commit_or_flush(self.session)
+        except IntegrityError:
+            # El badge ya fue otorgado por otra actualización concurrente
+            mark_badge_owned(self.session, user_id, badge_id)
+            return False
+        mark_badge_owned(self.session, user_id, badge_id)
         return True
 
     async def get_user_badges(self, user_id: int) -> list[Badge]:
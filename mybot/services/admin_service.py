@@ -9,6 +9,7 @@ from sqlalchemy import select, func
 from database.models import User
 from services.config_service import ConfigService
 from services.channel_service import ChannelService
+from utils.user_roles import clear_role_cache
 
 logger = logging.getLogger(__name__)
 
@@ -39,6 +40,7 @@ class AdminService:
                 user.role = "admin"
             
             await self.session.commit()
+            clear_role_cache(user_id)
             
             logger.info(f"Admin user ensured: {user_id}")
             return {
@@ -0,0 +1,174 @@
+"""
+Auction close timers.
+
+Every active auction is armed in a min-heap keyed by its ``end_time`` and
+the clock sleeps until the earliest one is due, so auctions close at their
+deadline instead of up to a minute late. ``AuctionService`` re-arms an
+auction when a late bid extends ``end_time``; the old entry is skipped when
+popped because its deadline no longer matches, and an auction extended on
+another replica is re-armed when its old deadline pops. Closing therefore
+needs no polling: the clock only reloads the active auctions every
+``AUCTION_CLOCK_RESYNC_INTERVAL`` seconds (15 minutes by default) to pick up
+auctions created on another replica, closing any that expired meanwhile.
+
+The clock is leader-only under the ``auction_monitor`` lease, see
+:mod:`services.job_scheduler`.
+"""
+import asyncio
+import heapq
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from aiogram import Bot
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from database.models import Auction, AuctionStatus
+from utils.config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class AuctionClock:
+    """Min-heap of ``(end_time, auction_id)`` deadlines."""
+
+    def __init__(self, resync_interval: float):
+        self.resync_interval = resync_interval
+        self._heap: List[Tuple[datetime, int]] = []
+        self._deadlines: Dict[int, datetime] = {}
+        self._wakeup = asyncio.Event()
+        self.running = False
+
+    def __len__(self) -> int:
+        return len(self._deadlines)
+
+    def arm(self, auction_id: int, end_time: datetime) -> None:
+        """Close ``auction_id`` at ``end_time``, replacing any previous deadline."""
+        if not self.running or self._deadlines.get(auction_id) == end_time:
+            return
+        self._deadlines[auction_id] = end_time
+        heapq.heappush(self._heap, (end_time, auction_id))
+        self._wakeup.set()
+
+    def disarm(self, auction_id: int) -> None:
+        self._deadlines.pop(auction_id, None)
+
+    def next_deadline(self) -> Optional[datetime]:
+        self._drop_stale()
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now: datetime) -> List[int]:
+        """Pop every auction whose deadline has passed."""
+        due = []
+        while True:
+            self._drop_stale()
+            if not self._heap or self._heap[0][0] > now:
+                return due
+            _, auction_id = heapq.heappop(self._heap)
+            self._deadlines.pop(auction_id, None)
+            due.append(auction_id)
+
+    def _drop_stale(self) -> None:
+        while self._heap:
+            end_time, auction_id = self._heap[0]
+            if self._deadlines.get(auction_id) == end_time:
+                return
+            heapq.heappop(self._heap)
+
+    async def seed(self, bot: Bot, session_factory: async_sessionmaker[AsyncSession]) -> None:
+        """Close auctions that expired while offline and arm the active ones."""
+        from services.auction_service import AuctionService
+
+        async with session_factory() as session:
+            service = AuctionService(session)
+            expired = await service.check_expired_auctions(bot)
+            if expired:
+                logger.info(f"Auto-ended {len(expired)} auctions expired while offline")
+            active = await service.get_active_auctions()
+        active_ids = {auction.id for auction in active}
+        for auction_id in [aid for aid in self._deadlines if aid not in active_ids]:
+            self.disarm(auction_id)
+        for auction in active:
+            self.arm(auction.id, auction.end_time)
+        logger.debug(f"Auction clock armed with {len(self)} active auctions")
+
+    async def _sleep_until_due(self, max_wait: float) -> None:
+        deadline = self.next_deadline()
+        timeout = max_wait
+        if deadline is not None:
+            timeout = min(timeout, max(0.0, (deadline - datetime.utcnow()).total_seconds()))
+        self._wakeup.clear()
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def run(self, bot: Bot, session_factory: async_sessionmaker[AsyncSession]) -> None:
+        """Call ``end_auction`` for each auction as soon as its deadline passes."""
+        self.running = True
+        try:
+            await self._run(bot, session_factory)
+        finally:
+            self.running = False
+            self._heap.clear()
+            self._deadlines.clear()
+
+    async def _run(self, bot: Bot, session_factory: async_sessionmaker[AsyncSession]) -> None:
+        await self.seed(bot, session_factory)
+        loop = asyncio.get_running_loop()
+        resync_at = loop.time() + self.resync_interval
+        while True:
+            await self._sleep_until_due(max(0.0, resync_at - loop.time()))
+            if loop.time() >= resync_at:
+                try:
+                    await self.seed(bot, session_factory)
+                except Exception as e:
+                    logger.error(f"Error reloading auction clock: {e}", exc_info=True)
+                resync_at = loop.time() + self.resync_interval
+            for auction_id in self.pop_due(datetime.utcnow()):
+                try:
+                    await self._close(bot, session_factory, auction_id)
+                except Exception as e:
+                    logger.error(f"Error closing auction {auction_id}: {e}", exc_info=True)
+
+    async def _close(
+        self, bot: Bot, session_factory: async_sessionmaker[AsyncSession], auction_id: int
+    ) -> None:
+        from services.auction_service import AuctionService
+
+        async with session_factory() as session:
+            auction = await session.get(Auction, auction_id)
+            if not auction or auction.status != AuctionStatus.ACTIVE:
+                return
+            if auction.end_time > datetime.utcnow():
+                # Extendida por una puja que aún no había re-armado el reloj
+                self.arm(auction_id, auction.end_time)
+                return
+            if await AuctionService(session).end_auction(auction_id, bot):
+                logger.info(f"Auction {auction_id} closed at its deadline")
+
+
+# Global clock instance, same singleton pattern as the leaderboard
+_auction_clock_instance = None
+
+
+def get_auction_clock() -> AuctionClock:
+    """
+    Get the global AuctionClock instance.
+
+    Returns:
+        AuctionClock: The global auction clock
+    """
+    global _auction_clock_instance
+    if _auction_clock_instance is None:
+        _auction_clock_instance = AuctionClock(Config.AUCTION_CLOCK_RESYNC_INTERVAL)
+    return _auction_clock_instance
+
+
+def reset_auction_clock() -> None:
+    """
+    Reset the global AuctionClock instance.
+    Primarily used for testing purposes.
+    """
+    global _auction_clock_instance
+    _auction_clock_instance = None
@@ -20,6 +20,8 @@ from utils.text_utils import anonymize_username, format_points, format_time_rema
 from services.point_service import PointService
 from services.level_service import LevelService
 from services.achievement_service import AchievementService
+from services.auction_clock import get_auction_clock
+from services.outbound_dispatcher import send_notification
 
 logger = logging.getLogger(__name__)
 
@@ -78,6 +80,7 @@ class AuctionService:
         auction.status = AuctionStatus.ACTIVE
         auction.start_time = datetime.utcnow()
         await self.session.commit()
+        get_auction_clock().arm(auction_id, auction.end_time)
         
         logger.info(f"Auction {auction_id} started")
         return True
@@ -156,6 +159,7 @@ class AuctionService:
         await self._ensure_participant(auction_id, user_id)
         
         await self.session.commit()
+        get_auction_clock().arm(auction_id, auction.end_time)
         
         # Send notifications to other participants
         if bot:
@@ -182,7 +186,8 @@ class AuctionService:
             # Notify winner
             if bot:
                 try:
-                    await bot.send_message(
+                    await send_notification(
+                        bot,
                         auction.winner_id,
                         f"🎉 ¡Felicidades! Has ganado la subasta '{auction.name}'\n"
                         f"🏆 Premio: {auction.prize_description}\n"
@@ -197,6 +202,7 @@ class AuctionService:
         
         await self.session.commit()
         await self.session.refresh(auction)
+        get_auction_clock().disarm(auction_id)
         
         logger.info(f"Auction {auction_id} ended. Winner: {auction.winner_id}")
         return auction
@@ -215,6 +221,7 @@ class AuctionService:
             await self._notify_auction_cancelled(auction, bot)
         
         await self.session.commit()
+        get_auction_clock().disarm(auction_id)
         
         logger.info(f"Auction {auction_id} cancelled")
         return True
@@ -390,7 +397,7 @@ class AuctionService:
                     f"¡Haz tu puja para no perder la oportunidad!"
                 )
                 
-                await bot.send_message(participant.user_id, message)
+                await send_notification(bot, participant.user_id, message)
                 participant.last_notified_at = datetime.utcnow()
                 
             except Exception as e:
@@ -424,7 +431,7 @@ class AuctionService:
                     f"🎁 Premio: {auction.prize_description}"
                 )
                 
-                await bot.send_message(participant.user_id, message)
+                await send_notification(bot, participant.user_id, message)
                 
             except Exception as e:
                 logger.error(f"Failed to notify participant {participant.user_id} about auction end: {e}")
@@ -445,7 +452,7 @@ class AuctionService:
                     f"Disculpa las molestias."
                 )
                 
-                await bot.send_message(participant.user_id, message)
+                await send_notification(bot, participant.user_id, message)
                 
             except Exception as e:
                 logger.error(f"Failed to notify participant {participant.user_id} about cancellation: {e}")
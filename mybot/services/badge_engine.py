@@ -0,0 +1,155 @@
+"""
+Badge evaluation indexed by condition type.
+
+Active badges are cached per process, grouped by ``condition_type`` and
+sorted by ``condition_value``, so finding the badges unlocked by a stat is a
+bisect. The badges a user already owns are loaded once per session and kept
+in ``session.info``. An evaluation therefore costs at most one query for the
+owned set plus one per stat source (user stats, missions, invites), no matter
+how many badges exist.
+"""
+import time
+from bisect import bisect_right
+from typing import Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.base import detached_copy
+from database.models import Badge, InviteToken, UserBadge, UserMissionEntry, UserStats
+
+OWNED_BADGES_KEY = "owned_badges"
+CATALOG_TTL_SECONDS = 300
+
+# Tipos de condición que se leen de UserStats y su columna
+STATS_CONDITIONS = {
+    "messages": "messages_sent",
+    "login_streak": "checkin_streak",
+}
+CONDITION_TYPES = ("messages", "login_streak", "missions", "invites")
+
+
+class BadgeCatalog:
+    """Active badges grouped by condition type and sorted by threshold."""
+
+    def __init__(self, badges: List[Badge]):
+        self.loaded_at = time.monotonic()
+        self.by_type: Dict[str, List[Badge]] = {}
+        for badge in badges:
+            if badge.condition_type in CONDITION_TYPES and badge.condition_value is not None:
+                self.by_type.setdefault(badge.condition_type, []).append(badge)
+        self.thresholds: Dict[str, List[int]] = {}
+        for condition_type, group in self.by_type.items():
+            group.sort(key=lambda b: (b.condition_value, b.id))
+            self.thresholds[condition_type] = [b.condition_value for b in group]
+
+    def unlocked(self, condition_type: str, value: int) -> List[Badge]:
+        """Badges of ``condition_type`` whose threshold is reached by ``value``."""
+        group = self.by_type.get(condition_type)
+        if not group:
+            return []
+        return group[:bisect_right(self.thresholds[condition_type], value)]
+
+
+_catalog: Optional[BadgeCatalog] = None
+
+
+async def get_badge_catalog(session: AsyncSession) -> BadgeCatalog:
+    """Return the cached catalog, loading it with ``session`` if needed."""
+    global _catalog
+    if _catalog is None or time.monotonic() - _catalog.loaded_at > CATALOG_TTL_SECONDS:
+        result = await session.execute(select(Badge).where(Badge.is_active == True))
+        _catalog = BadgeCatalog([detached_copy(b) for b in result.scalars()])
+    return _catalog
+
+
+def invalidate_badge_catalog() -> None:
+    """Drop the cached catalog after badges are created, changed or deleted."""
+    global _catalog
+    _catalog = None
+
+
+async def get_owned_badge_ids(session: AsyncSession, user_id: int) -> Set[int]:
+    """Badge ids owned by ``user_id``, loaded once per session."""
+    owned = session.info.setdefault(OWNED_BADGES_KEY, {})
+    if user_id not in owned:
+        result = await session.execute(
+            select(UserBadge.badge_id).where(UserBadge.user_id == user_id)
+        )
+        owned[user_id] = set(result.scalars())
+    return owned[user_id]
+
+
+def mark_badge_owned(session: AsyncSession, user_id: int, badge_id: int) -> None:
+    """Record a badge granted through ``session``."""
+    owned = session.info.get(OWNED_BADGES_KEY)
+    if owned is not None and user_id in owned:
+        owned[user_id].add(badge_id)
+
+
+class BadgeEvaluator:
+    """Finds the badges a user has just unlocked."""
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def _stat_values(self, user_id: int, condition_types: Iterable[str]) -> Optional[Dict[str, int]]:
+        progress = await self.session.get(UserStats, user_id)
+        if not progress:
+            return None
+        values: Dict[str, int] = {}
+        for condition_type in condition_types:
+            if condition_type in STATS_CONDITIONS:
+                values[condition_type] = getattr(progress, STATS_CONDITIONS[condition_type]) or 0
+            elif condition_type == "missions":
+                stmt = select(func.count()).select_from(UserMissionEntry).where(
+                    UserMissionEntry.user_id == user_id,
+                    UserMissionEntry.completed == True,
+                )
+                values[condition_type] = (await self.session.execute(stmt)).scalar() or 0
+            elif condition_type == "invites":
+                stmt = select(func.count()).select_from(InviteToken).where(
+                    InviteToken.created_by == user_id,
+                    InviteToken.used_by.is_not(None),
+                )
+                values[condition_type] = (await self.session.execute(stmt)).scalar() or 0
+        return values
+
+    async def evaluate(self, user_id: int, condition_types: Optional[Iterable[str]] = None) -> List[Badge]:
+        """
+        Return active badges not yet owned whose condition is met.
+
+        Only the badges of ``condition_types`` are considered; ``None`` means all.
+        """
+        catalog = await get_badge_catalog(self.session)
+        types = CONDITION_TYPES if condition_types is None else condition_types
+        types = [t for t in types if t in catalog.by_type]
+        if not types:
+            return []
+
+        owned = await get_owned_badge_ids(self.session, user_id)
+        # Sólo se consultan las estadísticas de tipos con insignias pendientes
+        pending_types = [
+            t for t in types if any(b.id not in owned for b in catalog.by_type[t])
+        ]
+        if not pending_types:
+            return []
+
+        values = await self._stat_values(user_id, pending_types)
+        if values is None:
+            return []
+        unlocked = []
+        for condition_type in pending_types:
+            for badge in catalog.unlocked(condition_type, values[condition_type]):
+                if badge.id not in owned:
+                    unlocked.append(badge)
+        return unlocked
+
+    async def condition_met(self, user_id: int, badge: Badge) -> bool:
+        """Check a single badge's condition."""
+        if badge.condition_type not in CONDITION_TYPES or badge.condition_value is None:
+            return False
+        values = await self._stat_values(user_id, [badge.condition_type])
+        if values is None:
+            return False
+        return values[badge.condition_type] >= badge.condition_value
@@ -3,6 +3,8 @@ from sqlalchemy import select
 from aiogram import Bot
 
 from database.models import Badge, UserBadge, User, UserStats
+from services.badge_engine import invalidate_badge_catalog, mark_badge_owned
+from services.outbound_dispatcher import notify_after_commit
 import re
 
 class BadgeService:
@@ -14,6 +16,7 @@ class BadgeService:
         self.session.add(badge)
         await self.session.commit()
         await self.session.refresh(badge)
+        invalidate_badge_catalog()
         return badge
 
     async def list_badges(self) -> list[Badge]:
@@ -26,6 +29,7 @@ class BadgeService:
             return False
         await self.session.delete(badge)
         await self.session.commit()
+        invalidate_badge_catalog()
         return True
 
     async def grant_badge(self, user_id: int, badge: Badge) -> bool:
@@ -38,6 +42,7 @@ class BadgeService:
             return False
         self.session.add(UserBadge(user_id=user_id, badge_id=badge.id))
         await self.session.commit()
+        mark_badge_owned(self.session, user_id, badge.id)
         return True
 
     async def check_badges(self, user: User, progress: UserStats, bot: Bot | None = None):
@@ -62,4 +67,4 @@ class BadgeService:
                 await self.grant_badge(user.id, badge)
                 if bot:
                     text = f"🏅 Has obtenido la insignia {badge.emoji or ''} {badge.name}!"
-                    await bot.send_message(user.id, text)
+                    await notify_after_commit(self.session, bot, user.id, text)
@@ -0,0 +1,282 @@
+"""
+Resumable broadcasts for admin mass messaging.
+
+A :class:`Broadcast` row stores the text, the audience filters and a keyset
+cursor (the last user id processed). :class:`BroadcastEngine` streams the
+audience in pages of ``BROADCAST_PAGE_SIZE`` ordered by ``users.id``, sends
+each page with ``BROADCAST_CONCURRENCY`` concurrent requests and commits the
+cursor and counters once per page. After a restart the broadcast resumes from
+the cursor, so at most one page is sent twice.
+
+The send rate is set by the outbound dispatcher: broadcasts use
+``Priority.BULK`` and fill whatever the global limit leaves after replies and
+notifications. Users that blocked the bot are recorded in ``blocked_users``
+and skipped for ``BROADCAST_BLOCK_RETRY_DAYS``.
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Any, Deque, Dict, List, Optional
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError
+from sqlalchemy import and_, func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from database.models import BlockedUser, Broadcast, BroadcastStatus, User, UserStats
+from services.outbound_dispatcher import Priority, outbound_priority
+from utils.config import Config
+from utils.message_safety import safe_send_message
+
+logger = logging.getLogger(__name__)
+
+RATE_WINDOW = 60.0
+ACTIVE_STATUSES = (BroadcastStatus.PENDING, BroadcastStatus.RUNNING)
+
+
+def audience_filter(audience: Dict[str, Any]):
+    """Return the ``select(User.id)`` of the users matching ``audience``.
+
+    Supported keys: ``role`` ("vip"/"free"), ``min_level`` and
+    ``active_days`` (activity registered in ``user_stats`` in the last N days).
+    """
+    blocked_since = datetime.utcnow() - timedelta(days=Config.BROADCAST_BLOCK_RETRY_DAYS)
+    stmt = select(User.id).outerjoin(
+        BlockedUser,
+        and_(BlockedUser.user_id == User.id, BlockedUser.blocked_at >= blocked_since),
+    ).where(BlockedUser.user_id.is_(None))
+    if audience.get("role"):
+        stmt = stmt.where(User.role == audience["role"])
+    if audience.get("min_level"):
+        stmt = stmt.where(User.level >= int(audience["min_level"]))
+    if audience.get("active_days"):
+        since = datetime.utcnow() - timedelta(days=int(audience["active_days"]))
+        stmt = stmt.join(UserStats, UserStats.user_id == User.id).where(
+            UserStats.last_activity_at >= since
+        )
+    return stmt
+
+
+async def count_audience(session: AsyncSession, audience: Dict[str, Any]) -> int:
+    result = await session.execute(
+        select(func.count()).select_from(audience_filter(audience).subquery())
+    )
+    return result.scalar() or 0
+
+
+async def fetch_audience_page(
+    session: AsyncSession, audience: Dict[str, Any], after_id: int, limit: int
+) -> List[int]:
+    """Next ``limit`` user ids after ``after_id`` (keyset pagination on ``users.id``)."""
+    stmt = audience_filter(audience).where(User.id > after_id).order_by(User.id).limit(limit)
+    return list((await session.execute(stmt)).scalars().all())
+
+
+async def create_broadcast(
+    session: AsyncSession, text: str, audience: Dict[str, Any], created_by: Optional[int]
+) -> Broadcast:
+    """Store a pending broadcast and wake the engine."""
+    broadcast = Broadcast(
+        text=text,
+        audience=audience,
+        created_by=created_by,
+        total=await count_audience(session, audience),
+    )
+    session.add(broadcast)
+    await session.commit()
+    get_broadcast_engine().wake()
+    return broadcast
+
+
+async def set_broadcast_status(
+    session: AsyncSession, broadcast_id: int, status: BroadcastStatus
+) -> Optional[Broadcast]:
+    """Pause, resume or cancel a broadcast. Returns None if it already finished."""
+    broadcast = await session.get(Broadcast, broadcast_id)
+    if broadcast is None or broadcast.status in (BroadcastStatus.COMPLETED, BroadcastStatus.CANCELLED):
+        return None
+    broadcast.status = status
+    if status == BroadcastStatus.CANCELLED:
+        broadcast.finished_at = datetime.utcnow()
+    await session.commit()
+    get_broadcast_engine().wake()
+    return broadcast
+
+
+async def get_recent_broadcasts(session: AsyncSession, limit: int = 5) -> List[Broadcast]:
+    result = await session.execute(select(Broadcast).order_by(Broadcast.id.desc()).limit(limit))
+    return list(result.scalars().all())
+
+
+class BroadcastEngine:
+    """Send pending broadcasts one at a time, resuming from their cursor."""
+
+    def __init__(self, page_size: int, concurrency: int, poll_interval: float):
+        self.page_size = page_size
+        self.concurrency = max(1, concurrency)
+        self.poll_interval = poll_interval
+        self.current_id: Optional[int] = None
+        self._wakeup = asyncio.Event()
+        self._sent_at: Deque[float] = deque()
+
+    def wake(self) -> None:
+        self._wakeup.set()
+
+    def rate(self) -> float:
+        """Messages per second over the last minute."""
+        now = time.monotonic()
+        while self._sent_at and now - self._sent_at[0] > RATE_WINDOW:
+            self._sent_at.popleft()
+        if not self._sent_at:
+            return 0.0
+        return len(self._sent_at) / max(1.0, min(RATE_WINDOW, now - self._sent_at[0]))
+
+    def progress(self, broadcast: Broadcast) -> Dict[str, Any]:
+        """Sent, failed and blocked counters plus rate and ETA of ``broadcast``."""
+        done = broadcast.sent + broadcast.failed + broadcast.blocked
+        remaining = max(0, (broadcast.total or 0) - done)
+        if broadcast.id == self.current_id:
+            rate = self.rate()
+        elif broadcast.started_at and broadcast.finished_at:
+            elapsed = (broadcast.finished_at - broadcast.started_at).total_seconds()
+            rate = done / elapsed if elapsed > 0 else 0.0
+        else:
+            rate = 0.0
+        return {
+            "status": broadcast.status.value,
+            "total": broadcast.total or 0,
+            "sent": broadcast.sent,
+            "failed": broadcast.failed,
+            "blocked": broadcast.blocked,
+            "rate": round(rate, 1),
+            "eta": round(remaining / rate) if rate > 0 and remaining else None,
+        }
+
+    async def run(self, bot: Bot, session_factory: async_sessionmaker[AsyncSession]) -> None:
+        """Process broadcasts until cancelled."""
+        while True:
+            try:
+                broadcast_id = await self._next_broadcast(session_factory)
+                if broadcast_id is not None:
+                    await self._process(bot, session_factory, broadcast_id)
+                    continue
+            except Exception as e:
+                logger.error(f"Error in broadcast engine: {e}", exc_info=True)
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _next_broadcast(self, session_factory: async_sessionmaker[AsyncSession]) -> Optional[int]:
+        async with session_factory() as session:
+            result = await session.execute(
+                select(Broadcast.id)
+                .where(Broadcast.status.in_(ACTIVE_STATUSES))
+                .order_by(Broadcast.id)
+                .limit(1)
+            )
+            return result.scalar_one_or_none()
+
+    async def _process(
+        self, bot: Bot, session_factory: async_sessionmaker[AsyncSession], broadcast_id: int
+    ) -> None:
+        self.current_id = broadcast_id
+        try:
+            while True:
+                async with session_factory() as session:
+                    broadcast = await session.get(Broadcast, broadcast_id)
+                    # El admin puede pausar o cancelar entre páginas
+                    if broadcast is None or broadcast.status not in ACTIVE_STATUSES:
+                        return
+                    if broadcast.started_at is None:
+                        broadcast.status = BroadcastStatus.RUNNING
+                        broadcast.started_at = datetime.utcnow()
+                        logger.info(f"Broadcast {broadcast_id} started for {broadcast.total} users")
+                    user_ids = await fetch_audience_page(
+                        session, broadcast.audience or {}, broadcast.cursor, self.page_size
+                    )
+                    if not user_ids:
+                        broadcast.status = BroadcastStatus.COMPLETED
+                        broadcast.finished_at = datetime.utcnow()
+                        await session.commit()
+                        logger.info(
+                            f"Broadcast {broadcast_id} completed: {broadcast.sent} sent, "
+                            f"{broadcast.failed} failed, {broadcast.blocked} blocked"
+                        )
+                        return
+                    text = broadcast.text
+                    await session.commit()
+
+                outcomes = await self._send_page(bot, text, user_ids)
+
+                async with session_factory() as session:
+                    broadcast = await session.get(Broadcast, broadcast_id)
+                    blocked_ids = [uid for uid, outcome in zip(user_ids, outcomes) if outcome == "blocked"]
+                    now = datetime.utcnow()
+                    for user_id in blocked_ids:
+                        await session.merge(BlockedUser(user_id=user_id, blocked_at=now))
+                    broadcast.sent += outcomes.count("sent")
+                    broadcast.failed += outcomes.count("failed")
+                    broadcast.blocked += len(blocked_ids)
+                    # Cursor y contadores se guardan una vez por página
+                    broadcast.cursor = user_ids[-1]
+                    await session.commit()
+        finally:
+            self.current_id = None
+
+    async def _send_page(self, bot: Bot, text: str, user_ids: List[int]) -> List[str]:
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def send(user_id: int) -> str:
+            async with semaphore:
+                try:
+                    with outbound_priority(Priority.BULK):
+                        await safe_send_message(bot, user_id, text)
+                except TelegramForbiddenError:
+                    return "blocked"
+                except TelegramBadRequest as e:
+                    # Chat inexistente o usuario desactivado: tampoco volverá a recibir
+                    if "chat not found" in str(e).lower() or "deactivated" in str(e).lower():
+                        return "blocked"
+                    logger.warning(f"Broadcast to {user_id} failed: {e}")
+                    return "failed"
+                except Exception as e:
+                    logger.warning(f"Broadcast to {user_id} failed: {e}")
+                    return "failed"
+                self._sent_at.append(time.monotonic())
+                return "sent"
+
+        return list(await asyncio.gather(*(send(user_id) for user_id in user_ids)))
+
+
+# Global engine instance, same singleton pattern as the leaderboard
+_engine_instance = None
+
+
+def get_broadcast_engine() -> BroadcastEngine:
+    """
+    Get the global BroadcastEngine instance.
+
+    Returns:
+        BroadcastEngine: The global broadcast engine
+    """
+    global _engine_instance
+    if _engine_instance is None:
+        _engine_instance = BroadcastEngine(
+            Config.BROADCAST_PAGE_SIZE,
+            Config.BROADCAST_CONCURRENCY,
+            Config.BROADCAST_POLL_INTERVAL,
+        )
+    return _engine_instance
+
+
+def reset_broadcast_engine() -> None:
+    """
+    Reset the global BroadcastEngine instance.
+    Primarily used for testing purposes.
+    """
+    global _engine_instance
+    _engine_instance = None
@@ -1,14 +1,83 @@
 from __future__ import annotations
 
 import logging
+import time
+import weakref
 from typing import Dict
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.util import identity_key
 
 from database.models import ConfigEntry
+from utils.config import Config
 from utils.text_utils import sanitize_text
 
 logger = logging.getLogger(__name__)
 
+# Fila que cambia con cada escritura para que otros procesos detecten cambios
+CONFIG_VERSION_KEY = "__config_version__"
+
+
+class ConfigCache:
+    """Snapshot of ``config_entries`` shared by every ConfigService of an engine.
+
+    The whole table is loaded at once (it only holds a few keys). When the TTL
+    expires and ``CONFIG_VERSION_ROW`` is enabled, the version row is read
+    first and the table is only reloaded if another process changed it.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self.values: Dict[str, str | None] = {}
+        self.version: str | None = None
+        self.checked_at: float | None = None
+        self.loads = 0
+
+    def is_fresh(self) -> bool:
+        return self.checked_at is not None and time.monotonic() - self.checked_at < self.ttl
+
+    async def refresh(self, session: AsyncSession) -> None:
+        if self.checked_at is not None:
+            result = await session.execute(
+                select(ConfigEntry.value).where(ConfigEntry.key == CONFIG_VERSION_KEY)
+            )
+            version = result.scalar_one_or_none()
+            if version is not None and version == self.version:
+                self.checked_at = time.monotonic()
+                return
+        result = await session.execute(select(ConfigEntry.key, ConfigEntry.value))
+        self.values = {key: value for key, value in result.all()}
+        self.version = self.values.pop(CONFIG_VERSION_KEY, None)
+        self.checked_at = time.monotonic()
+        self.loads += 1
+
+    def store(self, key: str, value: str | None, version: str | None) -> None:
+        self.values[key] = value
+        if version is not None:
+            self.version = version
+
+    def invalidate(self) -> None:
+        self.checked_at = None
+
+
+# Una caché por engine para que bases de datos distintas no se mezclen
+_config_caches: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+
+def get_config_cache(session: AsyncSession) -> ConfigCache:
+    """Return the cache shared by every session bound to the same engine."""
+    engine = session.get_bind()
+    cache = _config_caches.get(engine)
+    if cache is None:
+        cache = _config_caches[engine] = ConfigCache(Config.CONFIG_CACHE_TTL)
+    return cache
+
+
+def invalidate_config_cache() -> None:
+    """Force the next read of every cache to hit the database."""
+    for cache in list(_config_caches.values()):
+        cache.invalidate()
+
 
 class ConfigService:
     VIP_CHANNEL_KEY = "VIP_CHANNEL_ID"
@@ -23,8 +92,40 @@ class ConfigService:
         self.session = session
 
     async def get_value(self, key: str) -> str | None:
-        entry = await self.session.get(ConfigEntry, key)
-        return entry.value if entry else None
+        # Una entrada ya cargada en esta sesión refleja sus propios cambios
+        entry = self.session.identity_map.get(identity_key(ConfigEntry, key))
+        if entry is not None:
+            return entry.value
+        cache = get_config_cache(self.session)
+        if not cache.is_fresh():
+            await cache.refresh(self.session)
+        return cache.values.get(key)
+
+    async def get_int(self, key: str, default: int | None = None) -> int | None:
+        value = await self.get_value(key)
+        try:
+            return int(value) if value is not None else default
+        except (TypeError, ValueError):
+            return default
+
+    async def get_float(self, key: str, default: float | None = None) -> float | None:
+        value = await self.get_value(key)
+        try:
+            return float(value) if value is not None else default
+        except (TypeError, ValueError):
+            return default
+
+    async def get_bool(self, key: str, default: bool = False) -> bool:
+        value = await self.get_value(key)
+        if value is None:
+            return default
+        return value.strip().lower() in ("1", "true", "yes", "on")
+
+    async def get_list(self, key: str, separator: str = ";") -> list[str]:
+        value = await self.get_value(key)
+        if not value:
+            return []
+        return [item.strip() for item in value.split(separator) if item.strip()]
 
     async def set_value(self, key: str, value: str) -> ConfigEntry:
         """Store a configuration value, sanitizing text to avoid encoding issues."""
@@ -35,26 +136,28 @@ class ConfigService:
         else:
             entry = ConfigEntry(key=key, value=clean_value)
             self.session.add(entry)
+        version = None
+        if Config.CONFIG_VERSION_ROW:
+            version = str(time.time_ns())
+            version_entry = await self.session.get(ConfigEntry, CONFIG_VERSION_KEY)
+            if version_entry:
+                version_entry.value = version
+            else:
+                self.session.add(ConfigEntry(key=CONFIG_VERSION_KEY, value=version))
         await self.session.commit()
         await self.session.refresh(entry)
+        # Write-through: este proceso ve el valor nuevo sin esperar al TTL
+        get_config_cache(self.session).store(key, clean_value, version)
         return entry
 
     async def get_vip_channel_id(self) -> int | None:
-        value = await self.get_value(self.VIP_CHANNEL_KEY)
-        try:
-            return int(value) if value is not None else None
-        except (TypeError, ValueError):
-            return None
+        return await self.get_int(self.VIP_CHANNEL_KEY)
 
     async def set_vip_channel_id(self, chat_id: int) -> ConfigEntry:
         return await self.set_value(self.VIP_CHANNEL_KEY, str(chat_id))
 
     async def get_free_channel_id(self) -> int | None:
-        value = await self.get_value(self.FREE_CHANNEL_KEY)
-        try:
-            return int(value) if value is not None else None
-        except (TypeError, ValueError):
-            return None
+        return await self.get_int(self.FREE_CHANNEL_KEY)
 
     async def set_free_channel_id(self, chat_id: int) -> ConfigEntry:
         return await self.set_value(self.FREE_CHANNEL_KEY, str(chat_id))
@@ -73,11 +176,9 @@ class ConfigService:
 
     async def get_reaction_buttons(self) -> list[str]:
         """Return custom reaction button texts or defaults."""
-        value = await self.get_value(self.REACTION_BUTTONS_KEY)
-        if value:
-            texts = [t.strip() for t in value.split(";") if t.strip()]
-            if texts:
-                return texts[:10]
+        texts = await self.get_list(self.REACTION_BUTTONS_KEY)
+        if texts:
+            return texts[:10]
         from utils.config import DEFAULT_REACTION_BUTTONS
 
         return DEFAULT_REACTION_BUTTONS
@@ -88,11 +189,7 @@ class ConfigService:
 
     async def get_vip_reactions(self) -> list[str]:
         """Return the list of default VIP message reactions."""
-        value = await self.get_value(self.VIP_REACTIONS_KEY)
-        if value:
-            emojis = [e.strip() for e in value.split(";") if e.strip()]
-            return emojis[:5]
-        return []
+        return (await self.get_list(self.VIP_REACTIONS_KEY))[:5]
 
     async def set_vip_reactions(self, reactions: list[str]) -> ConfigEntry:
         """Store the default VIP message reactions as a semicolon string."""
@@ -16,6 +16,7 @@ from services.config_service import ConfigService
 from services.free_channel_service import FreeChannelService
 from services.subscription_service import SubscriptionService
 from utils.text_utils import sanitize_text
+from utils.user_roles import clear_role_cache
 
 logger = logging.getLogger(__name__)
 
@@ -300,6 +301,8 @@ class EnhancedChannelService:
             
             if processed_count > 0:
                 await self.session.commit()
+                for user in expired_users:
+                    clear_role_cache(user.id)
             
             return processed_count
         except Exception as e:
@@ -1,16 +1,39 @@
 """
 EventBus system for inter-module communication within the Bolt OK Telegram bot.
 Implements Observer pattern for asynchronous event propagation between modules.
+
+Published events go to a bounded queue per event type and are delivered by a
+fixed pool of ``EVENT_BUS_WORKERS`` consumer tasks, so ``publish`` costs the
+same no matter how many subscribers there are and a burst of events cannot
+spawn an unbounded number of tasks. When a queue is full its overflow policy
+applies, see :class:`OverflowPolicy`.
+
+Event types registered with :meth:`EventBus.enable_coalescing` are merged per
+user for a short window before reaching the queues, so a burst of reactions
+reaches the subscribers as one event with summed points.
 """
+import contextvars
+import inspect
 import logging
 import asyncio
-from typing import Dict, List, Callable, Any, Optional
+import time
+from collections import deque
+from typing import Awaitable, Deque, Dict, List, Callable, Any, Optional
 from dataclasses import dataclass
 from datetime import datetime
 from enum import Enum
 
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from database.unit_of_work import savepoint, unit_of_work
+from utils.config import Config
+from utils.timer_wheel import TimerWheel
+
 logger = logging.getLogger(__name__)
 
+# Marca las publicaciones hechas desde un manejador del propio bus
+_in_worker: contextvars.ContextVar[bool] = contextvars.ContextVar("event_bus_worker", default=False)
+
 class EventType(Enum):
     """Enumeration of system events that can be published and subscribed to."""
     # User engagement events
@@ -50,6 +73,150 @@ class Event:
     source: Optional[str] = None
     correlation_id: Optional[str] = None
 
+def merge_points_awarded(data: Dict[str, Any], new: Dict[str, Any]) -> None:
+    """Sum ``points``; ``total_points`` and ``source`` come from the latest event."""
+    data["points"] = (data.get("points") or 0) + (new.get("points") or 0)
+    for key in ("total_points", "source"):
+        if key in new:
+            data[key] = new[key]
+
+
+def merge_user_reaction(data: Dict[str, Any], new: Dict[str, Any]) -> None:
+    """Sum ``points_awarded`` and keep the latest ``total_points`` and unlocked hint.
+
+    The ``coalesced`` counter added by the bus is the number of reactions.
+    """
+    data["points_awarded"] = (data.get("points_awarded") or 0) + (new.get("points_awarded") or 0)
+    if "total_points" in new:
+        data["total_points"] = new["total_points"]
+    if new.get("hint_unlocked"):
+        data["hint_unlocked"] = new["hint_unlocked"]
+
+
+# Fusión por defecto de los tipos que admiten agregación
+DEFAULT_MERGERS: Dict[EventType, Callable[[Dict[str, Any], Dict[str, Any]], None]] = {
+    EventType.POINTS_AWARDED: merge_points_awarded,
+    EventType.USER_REACTION: merge_user_reaction,
+}
+
+
+@dataclass
+class _Coalescer:
+    window: float
+    merge: Callable[[Dict[str, Any], Dict[str, Any]], None]
+    merged: int = 0
+    emitted: int = 0
+
+
+class OverflowPolicy(Enum):
+    """What ``publish`` does when the queue of an event type is full."""
+    # Esperar a que haya hueco (contrapresión sobre quien publica)
+    BLOCK = "block"
+    # Descartar el evento más antiguo de la cola
+    DROP_OLDEST = "drop_oldest"
+    # Sustituir el evento en cola del mismo usuario; si no hay, descartar el más antiguo
+    COALESCE = "coalesce"
+
+
+class SessionScopedHandler:
+    """
+    Subscriber that runs ``handler(session, event)`` on a session of its own.
+    
+    Each dispatch opens a session from ``session_factory`` inside a unit of
+    work, so the handler never touches the session of the update that
+    published the event and several handlers can run in parallel. With
+    ``batch_size > 1`` events are buffered for up to ``batch_window`` seconds
+    and handled in one session and transaction, each one inside a savepoint so
+    a failing event does not undo the others.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[AsyncSession, Event], Awaitable[Any]],
+        session_factory: Optional[async_sessionmaker[AsyncSession]] = None,
+        batch_size: int = 1,
+        batch_window: float = 0.0,
+    ):
+        self.handler = handler
+        self.__qualname__ = getattr(handler, "__qualname__", str(handler))
+        self._session_factory = session_factory
+        self.batch_size = max(1, batch_size)
+        self.batch_window = batch_window
+        self._batch: List[Event] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._flush_tasks: set = set()
+        self.errors = 0
+
+    @property
+    def session_factory(self) -> async_sessionmaker[AsyncSession]:
+        if self._session_factory is None:
+            # Importación diferida: la base de datos se inicializa después de importar el bus
+            from database.setup import get_session_factory
+            self._session_factory = get_session_factory()
+        return self._session_factory
+
+    async def __call__(self, event: Event) -> None:
+        if self.batch_size == 1:
+            async with self.session_factory() as session, unit_of_work(session):
+                await self.handler(session, event)
+            return
+        self._batch.append(event)
+        if len(self._batch) >= self.batch_size:
+            await self.flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.batch_window, self._flush_later)
+
+    def _flush_later(self) -> None:
+        self._timer = None
+        task = asyncio.create_task(self.flush())
+        self._flush_tasks.add(task)
+        task.add_done_callback(self._flush_tasks.discard)
+
+    async def flush(self) -> None:
+        """Handle the buffered events in one session and transaction."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        events, self._batch = self._batch, []
+        if not events:
+            return
+        async with self.session_factory() as session, unit_of_work(session):
+            for event in events:
+                try:
+                    async with savepoint(session):
+                        await self.handler(session, event)
+                except Exception as e:
+                    self.errors += 1
+                    logger.exception(f"Error in event handler {self.__qualname__} for {event.event_type.value}: {e}")
+
+    async def close(self) -> None:
+        """Flush the buffered events and wait for scheduled flushes."""
+        await self.flush()
+        if self._flush_tasks:
+            await asyncio.gather(*self._flush_tasks, return_exceptions=True)
+
+
+@dataclass
+class _HandlerStats:
+    calls: int = 0
+    errors: int = 0
+    total_time: float = 0.0
+    max_time: float = 0.0
+
+
+class _TypeQueue:
+    """Bounded queue of pending events of one type."""
+
+    def __init__(self, maxsize: int, policy: OverflowPolicy):
+        self.maxsize = maxsize
+        self.policy = policy
+        self.items: Deque[Event] = deque()
+        self.space = asyncio.Event()
+        self.published = 0
+        self.dropped = 0
+        self.coalesced = 0
+
+
 class EventBus:
     """
     Central event bus for asynchronous inter-module communication.
@@ -61,12 +228,33 @@ class EventBus:
     - Providing non-intrusive event capabilities that don't break existing flows
     """
     
-    def __init__(self):
+    def __init__(
+        self,
+        workers: int = 8,
+        queue_size: int = 1000,
+        overflow: OverflowPolicy = OverflowPolicy.DROP_OLDEST,
+        max_history: int = 1000,
+    ):
         """Initialize the event bus with empty subscriber registry."""
         self._subscribers: Dict[EventType, List[Callable]] = {}
-        self._event_history: List[Event] = []
-        self._max_history = 1000  # Keep last 1000 events for debugging
-        self._lock = asyncio.Lock()
+        self._max_history = max_history  # Keep last events for debugging
+        self._event_history: Deque[Event] = deque(maxlen=max_history)
+        self.workers = max(1, workers)
+        self.queue_size = max(1, queue_size)
+        self.overflow = overflow
+        self._queues: Dict[EventType, _TypeQueue] = {}
+        self._order: List[EventType] = []
+        self._next = 0
+        self._pending: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._worker_tasks: List[asyncio.Task] = []
+        self._handler_stats: Dict[str, _HandlerStats] = {}
+        self._scoped: Dict[str, Dict[EventType, SessionScopedHandler]] = {}
+        self._coalescers: Dict[EventType, _Coalescer] = {}
+        self._sinks: List[Callable[[Event], None]] = []
+        self._coalescing: Dict[tuple, Event] = {}
+        self._wheel = TimerWheel(0.05)
+        self._wheel_driver: Optional[asyncio.Task] = None
     
     def subscribe(self, event_type: EventType, handler: Callable[[Event], Any]) -> None:
         """
@@ -82,6 +270,45 @@ class EventBus:
         
         self._subscribers[event_type].append(handler)
         logger.debug(f"Subscribed handler to {event_type.value}")
+
+    def subscribe_scoped(
+        self,
+        event_type: EventType,
+        handler: Callable[[AsyncSession, Event], Awaitable[Any]],
+        session_factory: Optional[async_sessionmaker[AsyncSession]] = None,
+        batch_size: int = 1,
+        batch_window: float = 0.0,
+        owner: Optional[str] = None,
+    ) -> SessionScopedHandler:
+        """
+        Subscribe a handler that receives a fresh session per dispatch.
+        
+        Args:
+            event_type: The type of event to subscribe to
+            handler: Async function accepting ``(session, event)``
+            session_factory: Factory for the sessions, defaults to the application one
+            batch_size: Events handled per session and transaction
+            batch_window: Maximum seconds an event waits for its batch to fill
+            owner: Optional name under which the subscription is recorded,
+                see :meth:`get_scoped_subscriptions`
+            
+        Returns:
+            SessionScopedHandler: The subscribed wrapper, pass it to ``unsubscribe``
+        """
+        scoped = SessionScopedHandler(handler, session_factory, batch_size, batch_window)
+        self.subscribe(event_type, scoped)
+        if owner is not None:
+            self._scoped.setdefault(owner, {})[event_type] = scoped
+        return scoped
+
+    def get_scoped_subscriptions(self, owner: str) -> Dict[EventType, SessionScopedHandler]:
+        """
+        Get the session-scoped subscriptions recorded under ``owner``.
+        
+        Services that build a new instance per update use it to subscribe only
+        once per process. Removing entries from the returned dict forgets them.
+        """
+        return self._scoped.setdefault(owner, {})
     
     def unsubscribe(self, event_type: EventType, handler: Callable[[Event], Any]) -> bool:
         """
@@ -102,6 +329,125 @@ class EventBus:
             except ValueError:
                 pass
         return False
+
+    def set_overflow_policy(
+        self, event_type: EventType, policy: OverflowPolicy, maxsize: Optional[int] = None
+    ) -> None:
+        """
+        Set the overflow policy, and optionally the queue size, of one event type.
+        
+        Args:
+            event_type: The event type to configure
+            policy: What to do when its queue is full
+            maxsize: Maximum queued events, defaults to ``queue_size``
+        """
+        queue = self._queue(event_type)
+        queue.policy = policy
+        if maxsize is not None:
+            queue.maxsize = max(1, maxsize)
+
+    def add_sink(self, sink: Callable[[Event], None]) -> None:
+        """
+        Register a synchronous callable receiving every published event.
+        
+        Sinks run inside ``publish``, so they must only buffer the event
+        (see ``EventJournal.append``).
+        """
+        self._sinks.append(sink)
+
+    async def redeliver(self, event: Event) -> bool:
+        """
+        Deliver an already published event to the current subscribers.
+        
+        Used to replay journaled events: they skip the history, the sinks and
+        the coalescing stage, and wait for room in a full queue instead of
+        applying its overflow policy. Returns False if nobody subscribes to
+        the event type.
+        """
+        if not self._subscribers.get(event.event_type):
+            return False
+        await self._enqueue(event, OverflowPolicy.BLOCK)
+        return True
+
+    def enable_coalescing(
+        self,
+        event_type: EventType,
+        window: float,
+        merge: Optional[Callable[[Dict[str, Any], Dict[str, Any]], None]] = None,
+    ) -> None:
+        """
+        Merge the events of ``event_type`` published for the same user within ``window`` seconds.
+        
+        Subscribers receive one event whose ``data`` is the first event's data
+        merged with the following ones by ``merge(data, new_data)``, plus
+        ``coalesced`` with the number of events merged.
+        
+        Args:
+            event_type: The event type to coalesce
+            window: Seconds the first event of a burst waits for more
+            merge: Merge function, defaults to the one in ``DEFAULT_MERGERS``
+        """
+        merge = merge or DEFAULT_MERGERS.get(event_type)
+        if merge is None:
+            raise ValueError(f"No merge function for {event_type.value}")
+        self._coalescers[event_type] = _Coalescer(window, merge)
+
+    def _coalesce(self, event: Event, coalescer: _Coalescer) -> None:
+        key = (event.event_type, event.user_id)
+        pending = self._coalescing.get(key)
+        if pending is not None:
+            coalescer.merge(pending.data, event.data)
+            pending.data["coalesced"] += 1
+            coalescer.merged += 1
+            return
+        # Copia: el diccionario del publicador no se modifica al fusionar
+        self._coalescing[key] = Event(
+            event_type=event.event_type,
+            user_id=event.user_id,
+            data={**event.data, "coalesced": 1},
+            timestamp=event.timestamp,
+            source=event.source,
+            correlation_id=event.correlation_id,
+        )
+        self._wheel.schedule(key, coalescer.window)
+        if self._wheel_driver is None or self._wheel_driver.done():
+            self._wheel_driver = asyncio.create_task(self._run_wheel(), name="event_bus_coalescing")
+
+    async def _run_wheel(self) -> None:
+        while len(self._wheel):
+            await asyncio.sleep(self._wheel.tick)
+            for key in self._wheel.advance():
+                await self._release(key)
+
+    async def _release(self, key: tuple) -> None:
+        event = self._coalescing.pop(key, None)
+        if event is None:
+            return
+        self._coalescers[event.event_type].emitted += 1
+        await self._enqueue(event)
+
+    def _queue(self, event_type: EventType) -> _TypeQueue:
+        queue = self._queues.get(event_type)
+        if queue is None:
+            queue = _TypeQueue(self.queue_size, self.overflow)
+            self._queues[event_type] = queue
+            self._order.append(event_type)
+        return queue
+
+    def _ensure_workers(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Workers y semáforo de otro bucle (p. ej. entre tests) no sirven aquí
+            self._loop = loop
+            self._worker_tasks = []
+            self._pending = asyncio.Semaphore(sum(len(q.items) for q in self._queues.values()))
+            for queue in self._queues.values():
+                queue.space = asyncio.Event()
+        self._worker_tasks = [task for task in self._worker_tasks if not task.done()]
+        for index in range(len(self._worker_tasks), self.workers):
+            self._worker_tasks.append(
+                asyncio.create_task(self._run_worker(), name=f"event_bus_worker_{index}")
+            )
     
     async def publish(self, event_type: EventType, user_id: int, data: Dict[str, Any], 
                      source: Optional[str] = None, correlation_id: Optional[str] = None) -> Event:
@@ -128,26 +474,73 @@ class EventBus:
             correlation_id=correlation_id
         )
         
-        # Add to history (thread-safe)
-        async with self._lock:
-            self._event_history.append(event)
-            if len(self._event_history) > self._max_history:
-                self._event_history.pop(0)
-        
-        # Get subscribers for this event type
-        subscribers = self._subscribers.get(event_type, [])
+        self._event_history.append(event)
+        for sink in self._sinks:
+            try:
+                sink(event)
+            except Exception as e:
+                logger.error(f"Error in event sink {sink}: {e}")
         
-        if subscribers:
-            logger.debug(f"Publishing {event_type.value} to {len(subscribers)} subscribers")
-            
-            # Call all subscribers asynchronously, but don't wait for them
-            # This prevents event handling from blocking the main workflow
-            for handler in subscribers:
-                asyncio.create_task(self._safe_call_handler(handler, event))
-        else:
+        if not self._subscribers.get(event_type):
             logger.debug(f"No subscribers for event {event_type.value}")
-        
+            return event
+
+        coalescer = self._coalescers.get(event_type)
+        if coalescer is not None:
+            self._coalesce(event, coalescer)
+            return event
+
+        # Handlers run on the worker pool; publishing never waits for them
+        await self._enqueue(event)
         return event
+
+    async def _enqueue(self, event: Event, policy: Optional[OverflowPolicy] = None) -> None:
+        self._ensure_workers()
+        queue = self._queue(event.event_type)
+        queue.published += 1
+        policy = policy or queue.policy
+        if policy == OverflowPolicy.BLOCK and _in_worker.get():
+            # Un manejador que espera hueco en una cola llena puede bloquear a todos los workers
+            policy = OverflowPolicy.DROP_OLDEST
+        while len(queue.items) >= queue.maxsize:
+            if policy == OverflowPolicy.BLOCK:
+                queue.space.clear()
+                await queue.space.wait()
+                continue
+            if policy == OverflowPolicy.COALESCE:
+                for index, queued in enumerate(queue.items):
+                    if queued.user_id == event.user_id:
+                        queue.items[index] = event
+                        queue.coalesced += 1
+                        return
+            queue.items.popleft()
+            queue.dropped += 1
+            queue.items.append(event)
+            return
+        queue.items.append(event)
+        self._pending.release()
+
+    def _take(self) -> Optional[Event]:
+        """Pop the next event, taking event types in turn."""
+        for offset in range(len(self._order)):
+            index = (self._next + offset) % len(self._order)
+            queue = self._queues[self._order[index]]
+            if queue.items:
+                self._next = index + 1
+                event = queue.items.popleft()
+                queue.space.set()
+                return event
+        return None
+
+    async def _run_worker(self) -> None:
+        _in_worker.set(True)
+        while True:
+            await self._pending.acquire()
+            event = self._take()
+            if event is None:
+                continue
+            for handler in list(self._subscribers.get(event.event_type, [])):
+                await self._safe_call_handler(handler, event)
     
     async def _safe_call_handler(self, handler: Callable[[Event], Any], event: Event) -> None:
         """
@@ -157,12 +550,17 @@ class EventBus:
             handler: The handler function to call
             event: The event to pass to the handler
         """
+        name = getattr(handler, "__qualname__", None) or str(handler)
+        stats = self._handler_stats.get(name)
+        if stats is None:
+            stats = self._handler_stats[name] = _HandlerStats()
+        started = time.monotonic()
         try:
-            if asyncio.iscoroutinefunction(handler):
-                await handler(event)
-            else:
-                handler(event)
+            result = handler(event)
+            if inspect.isawaitable(result):
+                await result
         except Exception as e:
+            stats.errors += 1
             logger.exception(f"Error in event handler for {event.event_type.value}: {e}")
             
             # Publish error event for system monitoring
@@ -179,6 +577,32 @@ class EventBus:
                     source="event_bus",
                     correlation_id=event.correlation_id
                 )
+        finally:
+            elapsed = time.monotonic() - started
+            stats.calls += 1
+            stats.total_time += elapsed
+            stats.max_time = max(stats.max_time, elapsed)
+
+    async def shutdown(self, timeout: float = 5.0) -> None:
+        """
+        Deliver the queued events, waiting up to ``timeout`` seconds, stop the
+        workers and flush the batches of session-scoped handlers.
+        """
+        for key in list(self._coalescing):
+            self._wheel.cancel(key)
+            await self._release(key)
+        deadline = time.monotonic() + timeout
+        while any(queue.items for queue in self._queues.values()) and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        for task in self._worker_tasks:
+            task.cancel()
+        if self._worker_tasks:
+            await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+        for handlers in self._subscribers.values():
+            for handler in handlers:
+                if isinstance(handler, SessionScopedHandler):
+                    await handler.close()
     
     def get_subscribers_count(self, event_type: EventType) -> int:
         """
@@ -202,12 +626,51 @@ class EventBus:
         Returns:
             List[Event]: Recent events, most recent first
         """
-        return self._event_history[-limit:]
+        return list(self._event_history)[-limit:]
     
     def clear_history(self) -> None:
         """Clear the event history. Useful for testing."""
         self._event_history.clear()
 
+    def get_metrics(self) -> Dict[str, Any]:
+        """
+        Get queue and handler metrics.
+        
+        Returns:
+            Dict[str, Any]: Per event type queued, published, dropped and coalesced
+            counts, and per handler calls, errors and average/maximum latency
+        """
+        return {
+            "workers": len([task for task in self._worker_tasks if not task.done()]),
+            "queues": {
+                event_type.value: {
+                    "queued": len(queue.items),
+                    "published": queue.published,
+                    "dropped": queue.dropped,
+                    "coalesced": queue.coalesced,
+                    "policy": queue.policy.value,
+                }
+                for event_type, queue in self._queues.items()
+            },
+            "coalescing": {
+                event_type.value: {
+                    "pending": sum(1 for key in self._coalescing if key[0] == event_type),
+                    "merged": coalescer.merged,
+                    "emitted": coalescer.emitted,
+                }
+                for event_type, coalescer in self._coalescers.items()
+            },
+            "handlers": {
+                name: {
+                    "calls": stats.calls,
+                    "errors": stats.errors,
+                    "avg_time": round(stats.total_time / stats.calls, 4) if stats.calls else 0.0,
+                    "max_time": round(stats.max_time, 4),
+                }
+                for name, stats in self._handler_stats.items()
+            },
+        }
+
 # Global event bus instance for use across the application
 # This follows the same singleton pattern used by other global services
 _event_bus_instance = None
@@ -222,7 +685,14 @@ def get_event_bus() -> EventBus:
     """
     global _event_bus_instance
     if _event_bus_instance is None:
-        _event_bus_instance = EventBus()
+        _event_bus_instance = EventBus(
+            workers=Config.EVENT_BUS_WORKERS,
+            queue_size=Config.EVENT_BUS_QUEUE_SIZE,
+            overflow=OverflowPolicy(Config.EVENT_BUS_OVERFLOW),
+        )
+        if Config.EVENT_COALESCE_WINDOW > 0:
+            for event_type in DEFAULT_MERGERS:
+                _event_bus_instance.enable_coalescing(event_type, Config.EVENT_COALESCE_WINDOW)
     return _event_bus_instance
 
 def reset_event_bus() -> None:
@@ -0,0 +1,322 @@
+"""
+Append-only journal of the events published on the EventBus.
+
+:class:`EventJournal` is registered as a sink of the bus: ``append`` only
+encodes the event as one JSON line and buffers it, a writer task flushes the
+buffer every ``EVENT_JOURNAL_FLUSH_INTERVAL`` seconds in a worker thread.
+Lines go to numbered segments (``events-00000001.jsonl``) rotated at
+``EVENT_JOURNAL_SEGMENT_MB``; when a segment is closed a sidecar
+``.idx.json`` is written with its time range and the byte offsets of the
+events of each ``user_id`` and ``correlation_id``.
+
+:func:`read_events` reads a time range back, using the indexes to skip
+segments and to seek straight to one user's events, and :func:`replay` feeds
+them to the current subscribers (see ``scripts/replay_events.py``).
+"""
+import asyncio
+import json
+import logging
+import os
+import re
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from services.event_bus import Event, EventBus, EventType
+from utils.config import Config
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_PATTERN = re.compile(r"^events-(\d{8})\.jsonl$")
+# Líneas en el búfer a partir de las que se escribe sin esperar al intervalo
+MAX_BUFFERED = 5000
+
+
+def encode_event(event: Event) -> bytes:
+    record = {
+        "t": event.timestamp.isoformat(),
+        "e": event.event_type.value,
+        "u": event.user_id,
+        "d": event.data,
+    }
+    if event.event_id:
+        record["id"] = event.event_id
+    if event.source:
+        record["s"] = event.source
+    if event.correlation_id:
+        record["c"] = event.correlation_id
+    return (json.dumps(record, separators=(",", ":"), default=str, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+def decode_event(line: bytes) -> Event:
+    record = json.loads(line)
+    return Event(
+        event_type=EventType(record["e"]),
+        user_id=record["u"],
+        data=record["d"],
+        timestamp=datetime.fromisoformat(record["t"]),
+        event_id=record.get("id"),
+        source=record.get("s"),
+        correlation_id=record.get("c"),
+    )
+
+
+def _index_path(segment: Path) -> Path:
+    return segment.with_suffix(".idx.json")
+
+
+class _SegmentIndex:
+    def __init__(self):
+        self.first: Optional[str] = None
+        self.last: Optional[str] = None
+        self.count = 0
+        self.users: Dict[str, List[int]] = defaultdict(list)
+        self.correlations: Dict[str, List[int]] = defaultdict(list)
+
+    def add(self, offset: int, timestamp: str, user_id: int, correlation_id: Optional[str]) -> None:
+        if self.first is None or timestamp < self.first:
+            self.first = timestamp
+        if self.last is None or timestamp > self.last:
+            self.last = timestamp
+        self.count += 1
+        self.users[str(user_id)].append(offset)
+        if correlation_id:
+            self.correlations[correlation_id].append(offset)
+
+    def save(self, path: Path) -> None:
+        data = {
+            "first": self.first,
+            "last": self.last,
+            "count": self.count,
+            "users": self.users,
+            "correlations": self.correlations,
+        }
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(data, separators=(",", ":")))
+        os.replace(tmp, path)
+
+
+class EventJournal:
+    """Buffered writer of event segments with per-segment indexes."""
+
+    def __init__(self, directory: str, segment_bytes: int, flush_interval: float):
+        self.directory = Path(directory)
+        self.segment_bytes = segment_bytes
+        self.flush_interval = flush_interval
+        self._buffer: List[Tuple[bytes, str, int, Optional[str]]] = []
+        self._wakeup = asyncio.Event()
+        self._writer: Optional[asyncio.Task] = None
+        self._write_lock = asyncio.Lock()
+        self._segment: Optional[Path] = None
+        self._index: Optional[_SegmentIndex] = None
+        self._size = 0
+        self._closing = False
+        self.written = 0
+        self.segments = 0
+
+    def append(self, event: Event) -> None:
+        """Buffer ``event``; used as an EventBus sink."""
+        self._buffer.append(
+            (encode_event(event), event.timestamp.isoformat(), event.user_id, event.correlation_id)
+        )
+        if self._writer is None or self._writer.done():
+            self._writer = asyncio.create_task(self._run_writer(), name="event_journal_writer")
+        if len(self._buffer) >= MAX_BUFFERED:
+            self._wakeup.set()
+
+    async def _run_writer(self) -> None:
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Error writing event journal: {e}", exc_info=True)
+
+    async def flush(self) -> None:
+        """Write the buffered events to disk."""
+        async with self._write_lock:
+            lines, self._buffer = self._buffer, []
+            if lines:
+                await asyncio.to_thread(self._write, lines)
+
+    def _next_segment(self) -> Path:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        numbers = [int(m.group(1)) for m in (SEGMENT_PATTERN.match(p.name) for p in self.directory.iterdir()) if m]
+        return self.directory / f"events-{max(numbers, default=0) + 1:08d}.jsonl"
+
+    def _rotate(self) -> None:
+        if self._segment is not None and self._index is not None:
+            self._index.save(_index_path(self._segment))
+        # Cada proceso empieza un segmento nuevo: nunca se añade a uno ya indexado
+        self._segment = self._next_segment()
+        self._index = _SegmentIndex()
+        self._size = 0
+        self.segments += 1
+
+    def _write(self, lines: List[Tuple[bytes, str, int, Optional[str]]]) -> None:
+        f = None
+        try:
+            for line, timestamp, user_id, correlation_id in lines:
+                # Se rota antes de escribir: nunca queda un segmento vacío sin índice
+                if self._segment is None or self._size >= self.segment_bytes:
+                    if f is not None:
+                        f.close()
+                    self._rotate()
+                    f = None
+                if f is None:
+                    f = open(self._segment, "ab")
+                self._index.add(self._size, timestamp, user_id, correlation_id)
+                f.write(line)
+                self._size += len(line)
+                self.written += 1
+        finally:
+            if f is not None:
+                f.close()
+
+    async def close(self) -> None:
+        """Stop the writer, flush the buffer and write the index of the open segment."""
+        # Sin cancelar: una escritura a medias en el hilo se solaparía con la final
+        self._closing = True
+        self._wakeup.set()
+        if self._writer is not None:
+            await asyncio.gather(self._writer, return_exceptions=True)
+            self._writer = None
+        await self.flush()
+        if self._segment is not None and self._index is not None and self._index.count:
+            await asyncio.to_thread(self._index.save, _index_path(self._segment))
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {
+            "buffered": len(self._buffer),
+            "written": self.written,
+            "segments": self.segments,
+            "segment": self._segment.name if self._segment else None,
+        }
+
+
+def _segments(directory: Path) -> List[Path]:
+    if not directory.is_dir():
+        return []
+    return sorted(p for p in directory.iterdir() if SEGMENT_PATTERN.match(p.name))
+
+
+def _load_index(segment: Path) -> Optional[Dict[str, Any]]:
+    path = _index_path(segment)
+    if not path.exists():
+        # Segmento abierto o de un proceso que no cerró: se recorre entero
+        return None
+    try:
+        return json.loads(path.read_text())
+    except ValueError:
+        return None
+
+
+def read_events(
+    directory: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    event_types: Optional[Iterable[EventType]] = None,
+    user_id: Optional[int] = None,
+    correlation_id: Optional[str] = None,
+) -> Iterator[Event]:
+    """Yield the journaled events matching the filters, oldest first."""
+    types = set(event_types) if event_types else None
+    for segment in _segments(Path(directory)):
+        index = _load_index(segment)
+        offsets: Optional[List[int]] = None
+        if index is not None:
+            if index["first"] is None:
+                continue
+            if end and datetime.fromisoformat(index["first"]) > end:
+                continue
+            if start and datetime.fromisoformat(index["last"]) < start:
+                continue
+            if user_id is not None:
+                offsets = index["users"].get(str(user_id), [])
+            if correlation_id is not None:
+                by_correlation = index["correlations"].get(correlation_id, [])
+                offsets = sorted(set(offsets) & set(by_correlation)) if offsets is not None else by_correlation
+        with open(segment, "rb") as f:
+            lines = _read_at(f, offsets) if offsets is not None else f
+            for line in lines:
+                if not line.strip():
+                    continue
+                try:
+                    event = decode_event(line)
+                except (ValueError, KeyError):
+                    # Última línea incompleta de un proceso interrumpido
+                    continue
+                if start and event.timestamp < start:
+                    continue
+                if end and event.timestamp > end:
+                    continue
+                if types and event.event_type not in types:
+                    continue
+                if user_id is not None and event.user_id != user_id:
+                    continue
+                if correlation_id is not None and event.correlation_id != correlation_id:
+                    continue
+                yield event
+
+
+def _read_at(f, offsets: List[int]) -> Iterator[bytes]:
+    for offset in offsets:
+        f.seek(offset)
+        yield f.readline()
+
+
+async def replay(bus: EventBus, events: Iterable[Event], speed: float = 0.0) -> int:
+    """
+    Deliver ``events`` to the current subscribers of ``bus``.
+
+    With ``speed > 0`` the original spacing between events is kept, divided
+    by ``speed``; with 0 they are delivered as fast as the bus accepts them
+    (a full queue makes the replay wait, nothing is dropped). Returns the
+    number of events handed to subscribers.
+    """
+    count = 0
+    previous: Optional[datetime] = None
+    for event in events:
+        if speed > 0 and previous is not None:
+            gap = (event.timestamp - previous).total_seconds() / speed
+            if gap > 0:
+                await asyncio.sleep(gap)
+        previous = event.timestamp
+        if await bus.redeliver(event):
+            count += 1
+    return count
+
+
+# Global journal instance, same singleton pattern as the leaderboard
+_journal_instance = None
+
+
+def get_event_journal() -> EventJournal:
+    """
+    Get the global EventJournal instance.
+
+    Returns:
+        EventJournal: The global event journal
+    """
+    global _journal_instance
+    if _journal_instance is None:
+        _journal_instance = EventJournal(
+            Config.EVENT_JOURNAL_DIR,
+            int(Config.EVENT_JOURNAL_SEGMENT_MB * 1024 * 1024),
+            Config.EVENT_JOURNAL_FLUSH_INTERVAL,
+        )
+    return _journal_instance
+
+
+def reset_event_journal() -> None:
+    """
+    Reset the global EventJournal instance.
+    Primarily used for testing purposes.
+    """
+    global _journal_instance
+    _journal_instance = None
@@ -17,7 +17,7 @@ from aiogram.types import (
     InputMediaDocument,
     InputMediaAudio
 )
-from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError
+from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError, TelegramRetryAfter
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
 
@@ -25,6 +25,7 @@ from database.models import PendingChannelRequest, User, BotConfig
 from services.config_service import ConfigService
 from services.message_registry import store_message
 from utils.text_utils import sanitize_text
+from utils.user_roles import clear_role_cache
 
 logger = logging.getLogger(__name__)
 
@@ -69,6 +70,8 @@ class FreeChannelService:
                 config.free_channel_wait_time_minutes = minutes
             
             await self.session.commit()
+            from services.join_request_pipeline import get_join_request_pipeline
+            get_join_request_pipeline().request_resync()
             logger.info(f"Wait time set to {minutes} minutes")
             return True
         except Exception as e:
@@ -119,6 +122,14 @@ class FreeChannelService:
             self.session.add(pending_request)
             await self.session.commit()
             
+            # Programar la aprobación para cuando termine el tiempo de espera
+            from services.join_request_pipeline import get_join_request_pipeline
+            wait_minutes = await self.get_wait_time_minutes()
+            get_join_request_pipeline().schedule(
+                pending_request.id,
+                pending_request.request_timestamp + timedelta(minutes=wait_minutes),
+            )
+            
             # 1. ENVIAR MENSAJE DE REDES SOCIALES INMEDIATAMENTE
             social_sent = await self._send_social_media_message(user_id, user_name)
             if social_sent:
@@ -126,8 +137,6 @@ class FreeChannelService:
                 await self.session.commit()
             
             # 2. ENVIAR NOTIFICACIÓN SOBRE EL TIEMPO DE ESPERA
-            wait_minutes = await self.get_wait_time_minutes()
-            
             if wait_minutes > 0:
                 wait_text = f"{wait_minutes} minutos"
                 if wait_minutes >= 60:
@@ -183,67 +192,89 @@ class FreeChannelService:
         threshold_time = datetime.utcnow() - timedelta(minutes=wait_minutes)
         
         # Obtener solicitudes que han cumplido el tiempo de espera
-        stmt = select(PendingChannelRequest).where(
+        stmt = select(PendingChannelRequest.id).where(
             PendingChannelRequest.approved == False,
             PendingChannelRequest.request_timestamp <= threshold_time
         )
         
         result = await self.session.execute(stmt)
-        pending_requests = result.scalars().all()
+        request_ids = result.scalars().all()
         
+        # Mismo límite de aprobaciones por segundo que el pipeline en segundo plano
+        from services.join_request_pipeline import get_join_request_pipeline
+        limiter = get_join_request_pipeline().limiter
         processed_count = 0
         
-        for request in pending_requests:
+        for request_id in request_ids:
+            await limiter.acquire()
+            try:
+                # Se relee cada fila: el rollback de una solicitud fallida expira las cargadas
+                request = await self.session.get(PendingChannelRequest, request_id)
+                if request is None or request.approved:
+                    continue
+                if await self.approve_request(request):
+                    processed_count += 1
+            except TelegramRetryAfter as e:
+                await self.session.rollback()
+                limiter.pause(e.retry_after)
+                logger.warning(f"Flood wait of {e.retry_after}s approving join request {request_id}")
+            except Exception as e:
+                await self.session.rollback()
+                logger.error(f"Error processing join request {request_id}: {e}")
+        
+        if processed_count > 0:
+            logger.info(f"Processed {processed_count} pending join requests")
+        
+        return processed_count
+
+    async def approve_request(self, request: PendingChannelRequest) -> bool:
+        """
+        Aprobar una solicitud pendiente y confirmarla en la BD.
+
+        Es idempotente: una solicitud ya aprobada sólo completa el mensaje de
+        bienvenida pendiente, y si Telegram indica que ya fue aprobada se marca
+        como procesada. Retorna True si la solicitud quedó aprobada ahora.
+        ``TelegramRetryAfter`` se propaga para que el llamador reintente.
+        """
+        approved_now = False
+        send_welcome = True
+        if not request.approved:
             try:
                 # Aprobar la solicitud en Telegram
                 await self.bot.approve_chat_join_request(
                     request.chat_id, 
                     request.user_id
                 )
-                
-                # Marcar como aprobada en la base de datos con timestamp
-                request.approved = True
-                request.approval_timestamp = datetime.utcnow()
-                
-                # VERIFICAR Y ASIGNAR ROL CORRECTO (NO DEGRADAR VIP)
-                await self._ensure_user_free_role(request.user_id)
-                
-                # Enviar mensaje de bienvenida si no se ha enviado
-                if not request.welcome_message_sent:
-                    welcome_sent = await self._send_welcome_message(request.user_id)
-                    if welcome_sent:
-                        request.welcome_message_sent = True
-                
-                processed_count += 1
                 logger.info(f"Approved join request for user {request.user_id} in channel {request.chat_id}")
-                
             except TelegramBadRequest as e:
                 if "USER_ALREADY_PARTICIPANT" in str(e):
                     # Usuario ya está en el canal, marcar como aprobado
-                    request.approved = True
-                    request.approval_timestamp = datetime.utcnow()
-                    # VERIFICAR Y ASIGNAR ROL CORRECTO (NO DEGRADAR VIP)
-                    await self._ensure_user_free_role(request.user_id)
-                    processed_count += 1
                     logger.info(f"User {request.user_id} already in channel {request.chat_id}")
-                elif "CHAT_JOIN_REQUEST_NOT_FOUND" in str(e):
+                    send_welcome = False
+                elif "CHAT_JOIN_REQUEST_NOT_FOUND" in str(e) or "HIDE_REQUESTER_MISSING" in str(e):
                     # La solicitud ya no existe, marcar como procesada
-                    request.approved = True
-                    request.approval_timestamp = datetime.utcnow()
-                    # VERIFICAR Y ASIGNAR ROL CORRECTO (NO DEGRADAR VIP)
-                    await self._ensure_user_free_role(request.user_id)
-                    processed_count += 1
                     logger.info(f"Join request not found for user {request.user_id}, marking as processed")
+                    send_welcome = False
                 else:
                     logger.error(f"Error approving join request for user {request.user_id}: {e}")
-            except Exception as e:
-                logger.error(f"Error processing join request for user {request.user_id}: {e}")
-        
-        if processed_count > 0:
+                    return False
+
+            # Marcar como aprobada en la base de datos con timestamp
+            request.approved = True
+            request.approval_timestamp = datetime.utcnow()
             await self.session.commit()
-            logger.info(f"Processed {processed_count} pending join requests")
-        
-        return processed_count
+            approved_now = True
+
+            # VERIFICAR Y ASIGNAR ROL CORRECTO (NO DEGRADAR VIP)
+            await self._ensure_user_free_role(request.user_id)
+
+        # Enviar mensaje de bienvenida si no se ha enviado
+        if send_welcome and not request.welcome_message_sent:
+            if await self._send_welcome_message(request.user_id):
+                request.welcome_message_sent = True
+                await self.session.commit()
+
+        return approved_now
     
     async def _send_welcome_message(self, user_id: int) -> bool:
         """
@@ -419,6 +450,7 @@ class FreeChannelService:
                 if not user.is_admin:
                     user.is_admin = True
                     await self.session.commit()
+                    clear_role_cache(user_id)
                     logger.info(f"Confirmed admin role for user {user_id}")
                 return True
             
@@ -3,17 +3,40 @@ Event Coordinator for setting up cross-module event subscriptions.
 Enhances module coordination by establishing event-driven communication patterns.
 """
 import logging
-from typing import Dict, Any
-from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, Any, Optional
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
 from services.event_bus import get_event_bus, EventType, Event
 from services.point_service import PointService
 from services.badge_service import BadgeService
 from services.user_service import UserService
 from services.reconciliation_service import ReconciliationService
+from utils.config import Config
 
 logger = logging.getLogger(__name__)
 
+# Manejador de cada tipo de evento; se ejecuta con un coordinador creado sobre la sesión del despacho
+_EVENT_HANDLERS = {
+    EventType.POINTS_AWARDED: "_handle_points_awarded",
+    EventType.NARRATIVE_DECISION: "_handle_narrative_decision",
+    EventType.CHANNEL_ENGAGEMENT: "_handle_channel_engagement",
+    EventType.USER_DAILY_CHECKIN: "_handle_daily_checkin",
+    EventType.VIP_ACCESS_REQUIRED: "_handle_vip_access_required",
+    EventType.ERROR_OCCURRED: "_handle_error_occurred",
+    EventType.CONSISTENCY_CHECK: "_handle_consistency_check",
+}
+
+# Nombre con el que se registran las suscripciones en el bus, una sola vez por proceso
+SUBSCRIPTION_OWNER = "event_coordinator"
+
+
+def _session_handler(name: str):
+    async def handler(session: AsyncSession, event: Event) -> None:
+        await getattr(EventCoordinator(session), name)(event)
+
+    handler.__qualname__ = f"EventCoordinator.{name}"
+    return handler
+
 class EventCoordinator:
     """
     Coordinates event subscriptions across modules to improve integration.
@@ -42,49 +65,43 @@ class EventCoordinator:
         self.reconciliation_service = ReconciliationService(session)
         
         # Track if subscriptions have been set up
-        self._subscriptions_active = False
+        self._subscriptions_active = bool(self.event_bus.get_scoped_subscriptions(SUBSCRIPTION_OWNER))
     
-    async def setup_cross_module_subscriptions(self) -> Dict[str, int]:
+    async def setup_cross_module_subscriptions(
+        self, session_factory: Optional[async_sessionmaker[AsyncSession]] = None
+    ) -> Dict[str, int]:
         """
         Set up event subscriptions that enable better coordination between modules.
         
+        Handlers do not use the session of this coordinator: each dispatch
+        gets a fresh session from ``session_factory`` (the application one by
+        default), batched as configured by ``EVENT_HANDLER_BATCH_SIZE``.
+        
+        Args:
+            session_factory: Factory for the sessions the handlers run on
+        
         Returns:
             Dict[str, int]: Summary of subscriptions set up by event type
         """
-        if self._subscriptions_active:
+        subscriptions = self.event_bus.get_scoped_subscriptions(SUBSCRIPTION_OWNER)
+        if subscriptions:
             logger.warning("Event subscriptions already active")
+            self._subscriptions_active = True
             return {}
         
         subscription_count = {}
         
         try:
-            # 1. Points and Achievement Integration
-            self.event_bus.subscribe(EventType.POINTS_AWARDED, self._handle_points_awarded)
-            subscription_count[EventType.POINTS_AWARDED.value] = 1
-            
-            # 2. Narrative Progress Monitoring
-            self.event_bus.subscribe(EventType.NARRATIVE_DECISION, self._handle_narrative_decision)
-            subscription_count[EventType.NARRATIVE_DECISION.value] = 1
-            
-            # 3. Channel Engagement Tracking
-            self.event_bus.subscribe(EventType.CHANNEL_ENGAGEMENT, self._handle_channel_engagement)
-            subscription_count[EventType.CHANNEL_ENGAGEMENT.value] = 1
-            
-            # 4. User Activity Monitoring
-            self.event_bus.subscribe(EventType.USER_DAILY_CHECKIN, self._handle_daily_checkin)
-            subscription_count[EventType.USER_DAILY_CHECKIN.value] = 1
-            
-            # 5. VIP Access Tracking
-            self.event_bus.subscribe(EventType.VIP_ACCESS_REQUIRED, self._handle_vip_access_required)
-            subscription_count[EventType.VIP_ACCESS_REQUIRED.value] = 1
-            
-            # 6. Error Monitoring and Auto-Recovery
-            self.event_bus.subscribe(EventType.ERROR_OCCURRED, self._handle_error_occurred)
-            subscription_count[EventType.ERROR_OCCURRED.value] = 1
-            
-            # 7. Consistency Check Responses
-            self.event_bus.subscribe(EventType.CONSISTENCY_CHECK, self._handle_consistency_check)
-            subscription_count[EventType.CONSISTENCY_CHECK.value] = 1
+            for event_type, name in _EVENT_HANDLERS.items():
+                self.event_bus.subscribe_scoped(
+                    event_type,
+                    _session_handler(name),
+                    session_factory,
+                    batch_size=Config.EVENT_HANDLER_BATCH_SIZE,
+                    batch_window=Config.EVENT_HANDLER_BATCH_WINDOW,
+                    owner=SUBSCRIPTION_OWNER,
+                )
+                subscription_count[event_type.value] = 1
             
             self._subscriptions_active = True
             logger.info(f"Cross-module event subscriptions set up: {sum(subscription_count.values())} total")
@@ -291,7 +308,7 @@ class EventCoordinator:
             Dict with subscription status information
         """
         status = {
-            "subscriptions_active": self._subscriptions_active,
+            "subscriptions_active": bool(self.event_bus.get_scoped_subscriptions(SUBSCRIPTION_OWNER)),
             "total_subscribers": {}
         }
         
@@ -309,21 +326,14 @@ class EventCoordinator:
         """
         try:
             # Unsubscribe from all events
-            event_handlers = [
-                (EventType.POINTS_AWARDED, self._handle_points_awarded),
-                (EventType.NARRATIVE_DECISION, self._handle_narrative_decision),
-                (EventType.CHANNEL_ENGAGEMENT, self._handle_channel_engagement),
-                (EventType.USER_DAILY_CHECKIN, self._handle_daily_checkin),
-                (EventType.VIP_ACCESS_REQUIRED, self._handle_vip_access_required),
-                (EventType.ERROR_OCCURRED, self._handle_error_occurred),
-                (EventType.CONSISTENCY_CHECK, self._handle_consistency_check),
-            ]
-            
-            for event_type, handler in event_handlers:
+            subscriptions = self.event_bus.get_scoped_subscriptions(SUBSCRIPTION_OWNER)
+            for event_type, handler in list(subscriptions.items()):
                 self.event_bus.unsubscribe(event_type, handler)
+                await handler.close()
+            subscriptions.clear()
             
             self._subscriptions_active = False
             logger.info("Event subscriptions torn down")
             
         except Exception as e:
-            logger.exception(f"Error tearing down subscriptions: {e}")
\ No newline at end of file
+            logger.exception(f"Error tearing down subscriptions: {e}")
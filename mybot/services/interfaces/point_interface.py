@@ -103,7 +103,7 @@ class IPointService(ABC):
         pass
     
     @abstractmethod
-    async def deduct_points(self, user_id: int, points: int) -> Optional[User]:
+    async def deduct_points(self, user_id: int, points: int) -> Optional[float]:
         """
         Resta puntos a un usuario.
         
@@ -112,7 +112,8 @@ class IPointService(ABC):
             points (int): Cantidad de puntos a restar
             
         Returns:
-            Optional[User]: Usuario actualizado o None si no se pudieron restar los puntos
+            Optional[float]: Nuevo saldo o None si no se pudieron restar los puntos.
+            Un saldo de 0.0 también es falso: compruebe el resultado con ``is None``.
         """
         pass
     
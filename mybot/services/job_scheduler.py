@@ -0,0 +1,310 @@
+"""
+Unified background job scheduler.
+
+Jobs are declared as :class:`JobSpec` entries and run on APScheduler's
+``AsyncIOScheduler``:
+
+- *Interval jobs* run every ``interval`` seconds (optionally read from a
+  ``ConfigService`` key) with random jitter. Missed runs are coalesced into
+  one and dropped once older than ``SCHEDULER_MISFIRE_GRACE``.
+- *Long-running jobs* (``interval=None``) are coroutines that run until
+  cancelled, such as the VIP expiry queue or the auction clock. They are
+  restarted if they stop.
+
+With ``SCHEDULER_LEADER_LOCK`` enabled each job is guarded by a lease in
+``scheduler_leases``, so with several bot replicas every job runs on exactly
+one of them. Leases last ``SCHEDULER_LEASE_TTL`` and the holder renews them
+every third of that, also while a run is in progress, so a dead leader is
+replaced within one TTL whatever the job interval.
+
+In-memory queues fed by long-running jobs (the auction clock, the VIP expiry
+queue and the join request pipeline) therefore only run on the replica
+holding the job's lease. Elsewhere arming or scheduling an entry is a no-op,
+so their heaps do not grow with deadlines nobody pops; the leader picks the
+change up on its next reload, or on the full load it does when it takes the
+lease over.
+
+Run count, duration and start lag are kept per job. Messages sent by jobs are
+queued with ``Priority.BULK``, behind replies to users.
+"""
+import asyncio
+import logging
+import os
+import socket
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from uuid import uuid4
+
+from aiogram import Bot
+from apscheduler.events import EVENT_JOB_MISSED, EVENT_JOB_SUBMITTED, JobEvent
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from apscheduler.triggers.interval import IntervalTrigger
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from database.leases import acquire_lease, release_lease
+from services.config_service import ConfigService
+from services.outbound_dispatcher import Priority, outbound_priority
+from utils.config import Config
+
+logger = logging.getLogger(__name__)
+
+JobFunc = Callable[[Bot, async_sessionmaker[AsyncSession]], Awaitable[Any]]
+
+
+@dataclass
+class JobSpec:
+    """Declarative description of a background job."""
+
+    name: str
+    func: JobFunc
+    # Segundos entre ejecuciones; None = tarea de larga duración
+    interval: Optional[float] = None
+    # Clave de ConfigService que, si existe, sustituye a ``interval``
+    interval_key: Optional[str] = None
+    jitter: Optional[float] = None
+    leader_only: bool = True
+
+
+@dataclass
+class JobMetrics:
+    runs: int = 0
+    failures: int = 0
+    skipped: int = 0
+    missed: int = 0
+    last_duration: float = 0.0
+    max_duration: float = 0.0
+    total_duration: float = 0.0
+    last_lag: float = 0.0
+    max_lag: float = 0.0
+    last_run_at: Optional[datetime] = None
+
+    def record_run(self, duration: float, failed: bool) -> None:
+        self.runs += 1
+        if failed:
+            self.failures += 1
+        self.last_duration = duration
+        self.max_duration = max(self.max_duration, duration)
+        self.total_duration += duration
+        self.last_run_at = datetime.utcnow()
+
+    def record_lag(self, lag: float) -> None:
+        self.last_lag = lag
+        self.max_lag = max(self.max_lag, lag)
+
+    def snapshot(self) -> dict:
+        return {
+            "runs": self.runs,
+            "failures": self.failures,
+            "skipped": self.skipped,
+            "missed": self.missed,
+            "last_duration": round(self.last_duration, 3),
+            "avg_duration": round(self.total_duration / self.runs, 3) if self.runs else 0.0,
+            "max_duration": round(self.max_duration, 3),
+            "last_lag": round(self.last_lag, 3),
+            "max_lag": round(self.max_lag, 3),
+            "last_run_at": self.last_run_at.isoformat() if self.last_run_at else None,
+        }
+
+
+@dataclass
+class _LongRunning:
+    spec: JobSpec
+    task: Optional[asyncio.Task] = None
+    started_at: float = 0.0
+    starts: int = 0
+
+
+class JobScheduler:
+    """Run :class:`JobSpec` jobs on one replica at a time."""
+
+    def __init__(
+        self,
+        bot: Bot,
+        session_factory: async_sessionmaker[AsyncSession],
+        jobs: List[JobSpec],
+        *,
+        leader_lock: bool = True,
+        lease_ttl: float = 60,
+        default_jitter: float = 0,
+        misfire_grace_time: int = 300,
+    ):
+        self.bot = bot
+        self.session_factory = session_factory
+        self.jobs = {spec.name: spec for spec in jobs}
+        self.leader_lock = leader_lock
+        self.lease_ttl = lease_ttl
+        self.default_jitter = default_jitter
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid4().hex[:8]}"
+        self.metrics: Dict[str, JobMetrics] = {name: JobMetrics() for name in self.jobs}
+        self._intervals: Dict[str, float] = {}
+        self._long_running: Dict[str, _LongRunning] = {}
+        self._scheduler = AsyncIOScheduler(
+            timezone=timezone.utc,
+            job_defaults={
+                "coalesce": True,
+                "max_instances": 1,
+                "misfire_grace_time": misfire_grace_time,
+            },
+        )
+        self._scheduler.add_listener(self._on_event, EVENT_JOB_SUBMITTED | EVENT_JOB_MISSED)
+
+    def start(self) -> None:
+        """Register every job and start the scheduler (needs a running loop)."""
+        now = datetime.now(timezone.utc)
+        for spec in self.jobs.values():
+            if spec.interval is None:
+                self._long_running[spec.name] = _LongRunning(spec)
+                self._scheduler.add_job(
+                    self._keep_long_running,
+                    IntervalTrigger(seconds=max(1.0, self.lease_ttl / 3)),
+                    id=f"{spec.name}:keeper",
+                    args=[spec.name],
+                    next_run_time=now,
+                )
+            else:
+                self._intervals[spec.name] = spec.interval
+                if self.leader_lock and spec.leader_only:
+                    self._scheduler.add_job(
+                        self._renew_lease,
+                        IntervalTrigger(seconds=max(1.0, self.lease_ttl / 3)),
+                        id=f"{spec.name}:lease",
+                        args=[spec.name],
+                    )
+                self._scheduler.add_job(
+                    self._run_interval_job,
+                    self._trigger(spec, spec.interval),
+                    id=spec.name,
+                    args=[spec.name],
+                    next_run_time=now,
+                )
+        self._scheduler.start()
+        logger.info(f"Job scheduler started with {len(self.jobs)} jobs as {self.owner}")
+
+    async def shutdown(self) -> None:
+        """Stop scheduling, cancel long-running jobs and release held leases."""
+        if self._scheduler.running:
+            self._scheduler.shutdown(wait=False)
+        tasks = [state.task for state in self._long_running.values() if state.task and not state.task.done()]
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        if self.leader_lock:
+            try:
+                async with self.session_factory() as session:
+                    for name in self.jobs:
+                        await release_lease(session, name, self.owner)
+            except Exception as e:
+                logger.warning(f"Could not release scheduler leases: {e}")
+
+    def get_metrics(self) -> Dict[str, dict]:
+        """Return run, duration and lag metrics of every job."""
+        stats = {}
+        for name, metrics in self.metrics.items():
+            stats[name] = metrics.snapshot()
+            state = self._long_running.get(name)
+            if state is not None:
+                stats[name]["starts"] = state.starts
+                stats[name]["running"] = bool(state.task and not state.task.done())
+            else:
+                stats[name]["interval"] = self._intervals.get(name)
+        return stats
+
+    def _trigger(self, spec: JobSpec, interval: float) -> IntervalTrigger:
+        jitter = spec.jitter if spec.jitter is not None else self.default_jitter
+        return IntervalTrigger(seconds=interval, jitter=min(jitter, interval / 2) or None)
+
+    def _on_event(self, event: JobEvent) -> None:
+        metrics = self.metrics.get(event.job_id)
+        if metrics is None:
+            return
+        if event.code == EVENT_JOB_MISSED:
+            metrics.missed += 1
+            logger.warning(f"Job {event.job_id} missed its run at {event.scheduled_run_time}")
+            return
+        scheduled = max(event.scheduled_run_times)
+        metrics.record_lag((datetime.now(timezone.utc) - scheduled).total_seconds())
+        if len(event.scheduled_run_times) > 1:
+            metrics.missed += len(event.scheduled_run_times) - 1
+
+    async def _holds_lease(self, session: AsyncSession, name: str, ttl: float) -> bool:
+        if not self.leader_lock or not self.jobs[name].leader_only:
+            return True
+        return await acquire_lease(session, name, self.owner, ttl)
+
+    async def _run_interval_job(self, name: str) -> None:
+        spec = self.jobs[name]
+        metrics = self.metrics[name]
+        interval = self._intervals[name]
+        async with self.session_factory() as session:
+            if not await self._holds_lease(session, name, self.lease_ttl):
+                metrics.skipped += 1
+                return
+            if spec.interval_key:
+                configured = await ConfigService(session).get_float(spec.interval_key, spec.interval)
+                if configured and configured != interval:
+                    self._intervals[name] = configured
+                    self._scheduler.reschedule_job(name, trigger=self._trigger(spec, configured))
+                    logger.info(f"Job {name} rescheduled every {configured}s")
+
+        started = time.monotonic()
+        failed = False
+        try:
+            with outbound_priority(Priority.BULK):
+                await spec.func(self.bot, self.session_factory)
+        except Exception as e:
+            failed = True
+            logger.error(f"Error in job {name}: {e}", exc_info=True)
+        finally:
+            metrics.record_run(time.monotonic() - started, failed)
+
+    async def _renew_lease(self, name: str) -> None:
+        # Mantiene el lease entre ejecuciones y durante ellas; si el líder cae, caduca en un TTL
+        try:
+            async with self.session_factory() as session:
+                await self._holds_lease(session, name, self.lease_ttl)
+        except Exception as e:
+            logger.error(f"Error renewing lease for job {name}: {e}")
+
+    async def _keep_long_running(self, name: str) -> None:
+        state = self._long_running[name]
+        running = state.task is not None and not state.task.done()
+        try:
+            async with self.session_factory() as session:
+                holds = await self._holds_lease(session, name, self.lease_ttl)
+        except Exception as e:
+            logger.error(f"Error renewing lease for job {name}: {e}")
+            holds = running
+        if not holds:
+            if running:
+                logger.warning(f"Lost lease for job {name}, stopping it on this replica")
+                state.task.cancel()
+            self.metrics[name].skipped += 1
+            return
+        if running:
+            return
+        if state.task is not None:
+            failed = not state.task.cancelled() and state.task.exception() is not None
+            self.metrics[name].record_run(time.monotonic() - state.started_at, failed)
+            logger.warning(f"Job {name} stopped, restarting it")
+        state.starts += 1
+        state.started_at = time.monotonic()
+        with outbound_priority(Priority.BULK):
+            state.task = asyncio.create_task(state.spec.func(self.bot, self.session_factory), name=name)
+
+
+def build_job_scheduler(
+    bot: Bot, session_factory: async_sessionmaker[AsyncSession], jobs: List[JobSpec]
+) -> JobScheduler:
+    """Create a JobScheduler configured from ``Config``."""
+    return JobScheduler(
+        bot,
+        session_factory,
+        jobs,
+        leader_lock=Config.SCHEDULER_LEADER_LOCK,
+        lease_ttl=Config.SCHEDULER_LEASE_TTL,
+        default_jitter=Config.SCHEDULER_JITTER,
+        misfire_grace_time=Config.SCHEDULER_MISFIRE_GRACE,
+    )
@@ -0,0 +1,253 @@
+"""
+Due-time pipeline for free channel join requests.
+
+Pending requests are kept in a min-heap keyed by the moment their wait time
+ends. A dispatcher sleeps until the next one is due and hands it to a pool of
+``JOIN_APPROVAL_CONCURRENCY`` workers. Each worker approves one request with
+its own session and commit, so a crash only loses in-flight requests, and
+those are picked up again on the next load. Telegram calls go through a
+shared token bucket of ``JOIN_APPROVAL_RATE`` approvals per second that
+pauses everything on ``retry_after``.
+
+The pipeline is leader-only under the ``channel_requests`` lease, see
+:mod:`services.job_scheduler`; its periodic reload runs every
+``JOIN_QUEUE_RESYNC_INTERVAL`` seconds.
+"""
+import asyncio
+import heapq
+import logging
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Deque, Dict, List, Set, Tuple
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramRetryAfter
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from database.models import BotConfig, PendingChannelRequest
+from services.free_channel_service import FreeChannelService
+from utils.config import Config
+from utils.rate_limiter import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+MAX_RETRIES = 5
+THROUGHPUT_WINDOW = 60.0
+
+
+class JoinRequestPipeline:
+    """Approve pending join requests as soon as their wait time ends."""
+
+    def __init__(self, concurrency: int, rate: float, resync_interval: float):
+        self.concurrency = max(1, concurrency)
+        self.resync_interval = resync_interval
+        self.limiter = TokenBucket(rate)
+        self._heap: List[Tuple[datetime, int]] = []
+        self._due: Dict[int, datetime] = {}
+        self._wakeup = asyncio.Event()
+        self._resync = False
+        self.running = False
+        self._active: Set[int] = set()
+        self._approved_at: Deque[float] = deque()
+        self.approved = 0
+        self.failed = 0
+        self.retries = 0
+        self.total_lag = 0.0
+        self.in_flight = 0
+
+    def __len__(self) -> int:
+        return len(self._due)
+
+    def schedule(self, request_id: int, due_at: datetime) -> None:
+        """Approve ``request_id`` at ``due_at``."""
+        if not self.running or self._due.get(request_id) == due_at:
+            return
+        self._due[request_id] = due_at
+        heapq.heappush(self._heap, (due_at, request_id))
+        self._wakeup.set()
+
+    def request_resync(self) -> None:
+        """Reload pending requests, e.g. after the wait time changed."""
+        self._resync = True
+        self._wakeup.set()
+
+    def _pop_due(self, now: datetime) -> List[Tuple[int, datetime]]:
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            due_at, request_id = heapq.heappop(self._heap)
+            if self._due.get(request_id) != due_at:
+                continue
+            del self._due[request_id]
+            due.append((request_id, due_at))
+        return due
+
+    def _next_due(self) -> datetime | None:
+        while self._heap and self._due.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+        return self._heap[0][0] if self._heap else None
+
+    async def seed(self, session_factory: async_sessionmaker[AsyncSession]) -> bool:
+        """Load every unapproved request. Returns False if auto-approval is disabled."""
+        async with session_factory() as session:
+            config = await session.get(BotConfig, 1)
+            if config and not config.auto_approval_enabled:
+                self._heap.clear()
+                self._due.clear()
+                return False
+            wait_minutes = (config.free_channel_wait_time_minutes or 0) if config else 0
+            rows = (
+                await session.execute(
+                    select(PendingChannelRequest.id, PendingChannelRequest.request_timestamp).where(
+                        PendingChannelRequest.approved == False
+                    )
+                )
+            ).all()
+        self._heap.clear()
+        self._due.clear()
+        wait = timedelta(minutes=wait_minutes)
+        for request_id, requested_at in rows:
+            # Las que ya están en cola o en proceso no se vuelven a programar
+            if request_id not in self._active:
+                self.schedule(request_id, (requested_at or datetime.utcnow()) + wait)
+        logger.info(f"Join request pipeline loaded {len(self)} pending requests")
+        return True
+
+    async def run(self, bot: Bot, session_factory: async_sessionmaker[AsyncSession]) -> None:
+        """Dispatch due requests to the worker pool until cancelled."""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        workers = [
+            asyncio.create_task(self._worker(bot, session_factory, queue))
+            for _ in range(self.concurrency)
+        ]
+        loop = asyncio.get_running_loop()
+        self.running = True
+        try:
+            enabled = await self.seed(session_factory)
+            resync_at = loop.time() + self.resync_interval
+            while True:
+                if self._resync or loop.time() >= resync_at:
+                    self._resync = False
+                    enabled = await self.seed(session_factory)
+                    resync_at = loop.time() + self.resync_interval
+                now = datetime.utcnow()
+                for item in self._pop_due(now) if enabled else []:
+                    self._active.add(item[0])
+                    # La cola acotada frena al despachador si los workers van atrasados
+                    await queue.put(item)
+                next_due = self._next_due() if enabled else None
+                timeout = max(0.0, resync_at - loop.time())
+                if next_due is not None:
+                    timeout = min(timeout, max(0.0, (next_due - datetime.utcnow()).total_seconds()))
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self.running = False
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            self._heap.clear()
+            self._due.clear()
+            self._active.clear()
+
+    async def _worker(
+        self, bot: Bot, session_factory: async_sessionmaker[AsyncSession], queue: asyncio.Queue
+    ) -> None:
+        while True:
+            request_id, due_at = await queue.get()
+            self.in_flight += 1
+            try:
+                await self._approve(bot, session_factory, request_id, due_at)
+            finally:
+                self.in_flight -= 1
+                self._active.discard(request_id)
+                queue.task_done()
+
+    async def _approve(
+        self,
+        bot: Bot,
+        session_factory: async_sessionmaker[AsyncSession],
+        request_id: int,
+        due_at: datetime,
+    ) -> None:
+        for _ in range(MAX_RETRIES):
+            await self.limiter.acquire()
+            try:
+                async with session_factory() as session:
+                    request = await session.get(PendingChannelRequest, request_id)
+                    if request is None or request.approved:
+                        return
+                    approved = await FreeChannelService(session, bot).approve_request(request)
+            except TelegramRetryAfter as e:
+                self.retries += 1
+                self.limiter.pause(e.retry_after)
+                logger.warning(f"Flood wait of {e.retry_after}s approving join requests")
+                continue
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"Error approving join request {request_id}: {e}", exc_info=True)
+                return
+            if approved:
+                self._record_approval((datetime.utcnow() - due_at).total_seconds())
+            else:
+                self.failed += 1
+            return
+        self.failed += 1
+        logger.error(f"Giving up on join request {request_id} after {MAX_RETRIES} flood waits")
+
+    def _record_approval(self, lag: float) -> None:
+        now = time.monotonic()
+        self.approved += 1
+        self.total_lag += max(0.0, lag)
+        self._approved_at.append(now)
+        while self._approved_at and now - self._approved_at[0] > THROUGHPUT_WINDOW:
+            self._approved_at.popleft()
+
+    def get_metrics(self) -> dict:
+        """Return queue depth, outcome counters, average lag and approvals per minute."""
+        now = time.monotonic()
+        while self._approved_at and now - self._approved_at[0] > THROUGHPUT_WINDOW:
+            self._approved_at.popleft()
+        return {
+            "queued": len(self),
+            "in_flight": self.in_flight,
+            "approved": self.approved,
+            "failed": self.failed,
+            "retries": self.retries,
+            "avg_lag": round(self.total_lag / self.approved, 3) if self.approved else 0.0,
+            "approved_last_minute": len(self._approved_at),
+        }
+
+
+# Global pipeline instance, same singleton pattern as the leaderboard
+_pipeline_instance = None
+
+
+def get_join_request_pipeline() -> JoinRequestPipeline:
+    """
+    Get the global JoinRequestPipeline instance.
+
+    Returns:
+        JoinRequestPipeline: The global join request pipeline
+    """
+    global _pipeline_instance
+    if _pipeline_instance is None:
+        _pipeline_instance = JoinRequestPipeline(
+            Config.JOIN_APPROVAL_CONCURRENCY,
+            Config.JOIN_APPROVAL_RATE,
+            Config.JOIN_QUEUE_RESYNC_INTERVAL,
+        )
+    return _pipeline_instance
+
+
+def reset_join_request_pipeline() -> None:
+    """
+    Reset the global JoinRequestPipeline instance.
+    Primarily used for testing purposes.
+    """
+    global _pipeline_instance
+    _pipeline_instance = None
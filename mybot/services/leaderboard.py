@@ -0,0 +1,280 @@
+"""
+In-memory points leaderboard.
+
+Users are kept in an indexable skip list ordered by ``(-points, user_id)``, so
+top-N, rank-of-user and neighbours-of-user are answered in O(log n) without
+touching the database. The structure is seeded at startup, updated when a
+session that changed points commits, and periodically reconciled with the
+``users`` table to correct anything that was missed.
+"""
+import asyncio
+import logging
+import random
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm import Session
+
+from database.models import User
+
+logger = logging.getLogger(__name__)
+
+PENDING_UPDATES_KEY = "leaderboard_updates"
+
+_MAX_LEVEL = 32
+
+Key = Tuple[float, int]
+
+
+class _Node:
+    __slots__ = ("key", "next", "width")
+
+    def __init__(self, key: Optional[Key], level: int):
+        self.key = key
+        self.next: List[Optional["_Node"]] = [None] * level
+        self.width: List[int] = [1] * level
+
+
+class IndexableSkipList:
+    """Sorted set of keys with O(log n) insert, remove, rank and positional access."""
+
+    def __init__(self):
+        self._head = _Node(None, _MAX_LEVEL)
+        self._level = 1
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @staticmethod
+    def _random_level() -> int:
+        level = 1
+        while level < _MAX_LEVEL and random.random() < 0.5:
+            level += 1
+        return level
+
+    def _find_path(self, key: Key) -> Tuple[List[_Node], List[int]]:
+        """Last node before ``key`` on every level and its 0-based position."""
+        update = [self._head] * _MAX_LEVEL
+        positions = [-1] * _MAX_LEVEL
+        node = self._head
+        position = -1
+        for lvl in range(self._level - 1, -1, -1):
+            while node.next[lvl] is not None and node.next[lvl].key < key:
+                position += node.width[lvl]
+                node = node.next[lvl]
+            update[lvl] = node
+            positions[lvl] = position
+        return update, positions
+
+    def insert(self, key: Key) -> None:
+        update, positions = self._find_path(key)
+        level = self._random_level()
+        if level > self._level:
+            for lvl in range(self._level, level):
+                update[lvl] = self._head
+                positions[lvl] = -1
+                self._head.width[lvl] = self._size + 1
+            self._level = level
+
+        new_node = _Node(key, level)
+        insert_at = positions[0] + 1
+        for lvl in range(level):
+            prev = update[lvl]
+            new_node.next[lvl] = prev.next[lvl]
+            prev.next[lvl] = new_node
+            # El ancho se reparte entre el nodo previo y el nuevo
+            new_node.width[lvl] = prev.width[lvl] - (insert_at - positions[lvl]) + 1
+            prev.width[lvl] = insert_at - positions[lvl]
+        for lvl in range(level, self._level):
+            update[lvl].width[lvl] += 1
+        self._size += 1
+
+    def remove(self, key: Key) -> bool:
+        update, _ = self._find_path(key)
+        node = update[0].next[0]
+        if node is None or node.key != key:
+            return False
+        for lvl in range(self._level):
+            prev = update[lvl]
+            if prev.next[lvl] is node:
+                prev.width[lvl] += node.width[lvl] - 1
+                prev.next[lvl] = node.next[lvl]
+            else:
+                prev.width[lvl] -= 1
+        while self._level > 1 and self._head.next[self._level - 1] is None:
+            self._level -= 1
+        self._size -= 1
+        return True
+
+    def index(self, key: Key) -> Optional[int]:
+        """0-based position of ``key`` or None if absent."""
+        update, positions = self._find_path(key)
+        node = update[0].next[0]
+        if node is None or node.key != key:
+            return None
+        return positions[0] + 1
+
+    def slice(self, start: int, stop: int) -> List[Key]:
+        """Keys at positions ``start`` (inclusive) to ``stop`` (exclusive)."""
+        start = max(start, 0)
+        stop = min(stop, self._size)
+        if start >= stop:
+            return []
+        node = self._head
+        position = -1
+        for lvl in range(self._level - 1, -1, -1):
+            while node.next[lvl] is not None and position + node.width[lvl] <= start:
+                position += node.width[lvl]
+                node = node.next[lvl]
+        keys = []
+        while node is not None and len(keys) < stop - start:
+            keys.append(node.key)
+            node = node.next[0]
+        return keys
+
+
+class Leaderboard:
+    """Points ranking backed by an :class:`IndexableSkipList`."""
+
+    def __init__(self):
+        self._points: Dict[int, float] = {}
+        self._ranking = IndexableSkipList()
+        self.loaded = False
+
+    def __len__(self) -> int:
+        return len(self._points)
+
+    def update(self, user_id: int, points: float) -> None:
+        points = float(points or 0)
+        current = self._points.get(user_id)
+        if current == points:
+            return
+        if current is not None:
+            self._ranking.remove((-current, user_id))
+        self._points[user_id] = points
+        self._ranking.insert((-points, user_id))
+
+    def remove(self, user_id: int) -> None:
+        current = self._points.pop(user_id, None)
+        if current is not None:
+            self._ranking.remove((-current, user_id))
+
+    def points_of(self, user_id: int) -> Optional[float]:
+        return self._points.get(user_id)
+
+    def top(self, limit: int = 10) -> List[Tuple[int, float]]:
+        """The ``limit`` users with most points as ``(user_id, points)``."""
+        return [(uid, -neg) for neg, uid in self._ranking.slice(0, limit)]
+
+    def rank_of(self, user_id: int) -> Optional[int]:
+        """1-based rank of ``user_id`` or None if the user is not ranked."""
+        points = self._points.get(user_id)
+        if points is None:
+            return None
+        return self._ranking.index((-points, user_id)) + 1
+
+    def neighbours(self, user_id: int, radius: int = 2) -> List[Tuple[int, int, float]]:
+        """Users around ``user_id`` as ``(rank, user_id, points)``, the user included."""
+        rank = self.rank_of(user_id)
+        if rank is None:
+            return []
+        start = max(rank - 1 - radius, 0)
+        keys = self._ranking.slice(start, rank + radius)
+        return [(start + i + 1, uid, -neg) for i, (neg, uid) in enumerate(keys)]
+
+    def load(self, rows) -> None:
+        """Replace the whole ranking with ``(user_id, points)`` rows."""
+        self._points = {}
+        self._ranking = IndexableSkipList()
+        for user_id, points in rows:
+            self.update(user_id, points)
+        self.loaded = True
+
+    async def seed(self, session_factory: async_sessionmaker[AsyncSession]) -> None:
+        """Load every user's points from the database."""
+        async with session_factory() as session:
+            rows = (await session.execute(select(User.id, User.points))).all()
+        self.load(rows)
+        logger.info(f"Leaderboard seeded with {len(self)} users")
+
+    async def reconcile(self, session_factory: async_sessionmaker[AsyncSession]) -> int:
+        """Fix entries that drifted from the database. Returns the number of fixes."""
+        async with session_factory() as session:
+            rows = (await session.execute(select(User.id, User.points))).all()
+        seen = set()
+        fixes = 0
+        for user_id, points in rows:
+            seen.add(user_id)
+            if self._points.get(user_id) != float(points or 0):
+                self.update(user_id, points)
+                fixes += 1
+        for user_id in [uid for uid in self._points if uid not in seen]:
+            self.remove(user_id)
+            fixes += 1
+        self.loaded = True
+        if fixes:
+            logger.warning(f"Leaderboard reconciliation corrected {fixes} entries")
+        return fixes
+
+    async def run_reconciler(self, session_factory: async_sessionmaker[AsyncSession], interval: int) -> None:
+        """Seed the ranking and reconcile it every ``interval`` seconds."""
+        if not self.loaded:
+            await self.seed(session_factory)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.reconcile(session_factory)
+            except Exception as e:
+                logger.error(f"Error reconciling leaderboard: {e}", exc_info=True)
+
+
+def stage_points_update(session: AsyncSession, user_id: int, points: float) -> None:
+    """Apply ``points`` to the leaderboard once ``session`` commits."""
+    session.info.setdefault(PENDING_UPDATES_KEY, {})[user_id] = points
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_staged_updates(session: Session) -> None:
+    updates = session.info.pop(PENDING_UPDATES_KEY, None)
+    if not updates:
+        return
+    leaderboard = get_leaderboard()
+    if not leaderboard.loaded:
+        return
+    for user_id, points in updates.items():
+        leaderboard.update(user_id, points)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _discard_staged_updates(session: Session, transaction) -> None:
+    # after_rollback también salta al deshacer un SAVEPOINT; sólo cuenta el de fuera
+    if transaction.parent is None:
+        session.info.pop(PENDING_UPDATES_KEY, None)
+
+
+# Global leaderboard instance, same singleton pattern as the event bus
+_leaderboard_instance = None
+
+
+def get_leaderboard() -> Leaderboard:
+    """
+    Get the global Leaderboard instance.
+
+    Returns:
+        Leaderboard: The global leaderboard
+    """
+    global _leaderboard_instance
+    if _leaderboard_instance is None:
+        _leaderboard_instance = Leaderboard()
+    return _leaderboard_instance
+
+
+def reset_leaderboard() -> None:
+    """
+    Reset the global Leaderboard instance.
+    Primarily used for testing purposes.
+    """
+    global _leaderboard_instance
+    _leaderboard_instance = None
@@ -1,8 +1,15 @@
+import time
+from bisect import bisect_right
+
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
 from aiogram import Bot
 
+from database.base import detached_copy
 from database.models import User, Level, LorePiece, UserLorePiece
+from database.unit_of_work import commit_or_flush, refresh_if_committed, savepoint
+from services.outbound_dispatcher import notify_after_commit
 from utils.messages import BOT_MESSAGES
 import logging
 
@@ -46,6 +53,36 @@ LEVELS = [
     (10, 5000),
 ]
 
+LEVEL_CATALOG_TTL_SECONDS = 300
+
+
+class LevelCatalog:
+    """Levels sorted by ``min_points`` with bisect lookups."""
+
+    def __init__(self, levels: list[Level], version: int):
+        self.version = version
+        self.loaded_at = time.monotonic()
+        self.levels = sorted(levels, key=lambda lvl: lvl.min_points)
+        self.thresholds = [lvl.min_points for lvl in self.levels]
+        self.by_id = {lvl.level_id: lvl for lvl in self.levels}
+
+    def for_points(self, points: float) -> Level:
+        index = bisect_right(self.thresholds, points) - 1
+        return self.levels[max(index, 0)]
+
+
+# Catálogo compartido por todo el proceso; la versión evita instalar uno obsoleto
+_level_catalog: LevelCatalog | None = None
+_level_catalog_version = 0
+
+
+def invalidate_level_catalog() -> None:
+    """Drop the cached level catalog after levels change."""
+    global _level_catalog, _level_catalog_version
+    _level_catalog_version += 1
+    _level_catalog = None
+
+
 class LevelService:
     def __init__(self, session: AsyncSession):
         self.session = session
@@ -56,12 +93,24 @@ class LevelService:
             return
         for level_id, name, min_points, reward in DEFAULT_LEVELS:
             self.session.add(Level(level_id=level_id, name=name, min_points=min_points, reward=reward))
-        await self.session.commit()
+        await commit_or_flush(self.session)
 
-    async def _get_levels(self) -> list[Level]:
+    async def _get_catalog(self) -> LevelCatalog:
+        global _level_catalog
+        catalog = _level_catalog
+        if catalog is not None and time.monotonic() - catalog.loaded_at <= LEVEL_CATALOG_TTL_SECONDS:
+            return catalog
+        version = _level_catalog_version
         await self._init_levels()
         result = await self.session.execute(select(Level).order_by(Level.min_points))
-        return result.scalars().all()
+        levels = [detached_copy(lvl) for lvl in result.scalars()]
+        catalog = LevelCatalog(levels, version)
+        if version == _level_catalog_version:
+            _level_catalog = catalog
+        return catalog
+
+    async def _get_levels(self) -> list[Level]:
+        return (await self._get_catalog()).levels
 
     async def list_levels(self) -> list[Level]:
         """Return all levels ordered by their number."""
@@ -84,6 +133,7 @@ class LevelService:
         self.session.add(new_level)
         await self.session.commit()
         await self.session.refresh(new_level)
+        invalidate_level_catalog()
         return new_level
 
     async def update_level(
@@ -107,6 +157,7 @@ class LevelService:
         if reward is not None:
             level.reward = reward
         await self.session.commit()
+        invalidate_level_catalog()
         return True
 
     async def delete_level(self, level_id: int) -> bool:
@@ -115,44 +166,35 @@ class LevelService:
             return False
         await self.session.delete(level)
         await self.session.commit()
+        invalidate_level_catalog()
         return True
 
     async def get_level_threshold(self, level_id: int) -> int:
-        levels = await self._get_levels()
-        for lvl in levels:
-            if lvl.level_id == level_id:
-                return lvl.min_points
-        return float("inf")
+        level = (await self._get_catalog()).by_id.get(level_id)
+        return level.min_points if level else float("inf")
 
     async def get_level_for_points(self, points: float) -> Level:
-        levels = await self._get_levels()
-        current = levels[0]
-        for lvl in levels:
-            if points >= lvl.min_points:
-                current = lvl
-            else:
-                break
-        return current
+        return (await self._get_catalog()).for_points(points)
 
     async def check_for_level_up(self, user: User, *, bot: Bot | None = None) -> bool:
         new_level = await self.get_level_for_points(user.points)
         if new_level.level_id != user.level:
             user.level = new_level.level_id
-            await self.session.commit()
-            await self.session.refresh(user)
+            await commit_or_flush(self.session)
+            await refresh_if_committed(self.session, user)
             if bot:
                 msg = BOT_MESSAGES["level_up_notification"].format(
                     level=new_level.level_id,
                     level_name=new_level.name,
                     reward=new_level.reward or "",
                 )
-                await bot.send_message(user.id, msg)
+                await notify_after_commit(self.session, bot, user.id, msg)
                 if new_level.level_id in {5, 10, 15, 20}:
                     special_msg = BOT_MESSAGES["special_level_reward"].format(
                         level=new_level.level_id,
                         reward=new_level.reward or "",
                     )
-                    await bot.send_message(user.id, special_msg)
+                    await notify_after_commit(self.session, bot, user.id, special_msg)
 
             # Desbloquear pistas de lore asociadas al nivel alcanzado
             unlock_code = getattr(new_level, "unlocks_lore_piece_code", None)
@@ -166,10 +208,16 @@ class LevelService:
                     )
                     exists = (await self.session.execute(check_stmt)).scalar_one_or_none()
                     if not exists:
-                        self.session.add(UserLorePiece(user_id=user.id, lore_piece_id=lore_piece.id))
-                        await self.session.commit()
+                        try:
+                            async with savepoint(self.session):
+                                self.session.add(UserLorePiece(user_id=user.id, lore_piece_id=lore_piece.id))
+                                await commit_or_flush(self.session)
+                        except IntegrityError:
+                            # Otra actualización concurrente ya desbloqueó la pista
+                            logger.info(f"Lore piece {unlock_code} already unlocked for user {user.id}")
+                            return True
                         if bot:
-                            await bot.send_message(user.id, f"Has desbloqueado una nueva pista: {lore_piece.title}")
+                            await notify_after_commit(self.session, bot, user.id, f"Has desbloqueado una nueva pista: {lore_piece.title}")
                         logger.info(
                             f"User {user.id} unlocked lore piece {unlock_code} via level {new_level.level_id}"
                         )
@@ -17,6 +17,8 @@ from .channel_service import ChannelService
 from database.models import ButtonReaction
 from keyboards.inline_post_kb import get_reaction_kb
 from services.message_registry import store_message
+from services.reaction_counters import get_reaction_counters
+from services.reaction_markup import get_reaction_markup_updater
 from utils.config import VIP_CHANNEL_ID, FREE_CHANNEL_ID
 
 logger = logging.getLogger(__name__)
@@ -150,6 +152,8 @@ class MessageService:
         self.session.add(reaction)
         await self.session.commit()
         await self.session.refresh(reaction)
+        get_reaction_counters().record(user_id, reaction.created_at)
+        get_reaction_markup_updater().record(message_id, reaction_type, reaction.id)
 
         from services.mission_service import MissionService
         from services.level_service import LevelService
@@ -172,51 +176,47 @@ class MessageService:
 
         return reaction
 
-    async def get_reaction_counts(self, message_id: int) -> dict[str, int]:
-        """Return reaction counts for the given message."""
+    async def get_reaction_counts(self, message_id: int, up_to_id: int | None = None) -> dict[str, int]:
+        """Return reaction counts for the given message, optionally up to a reaction id."""
         stmt = (
             select(ButtonReaction.reaction_type, func.count(ButtonReaction.id))
             .where(ButtonReaction.message_id == message_id)
             .group_by(ButtonReaction.reaction_type)
         )
+        if up_to_id is not None:
+            stmt = stmt.where(ButtonReaction.id <= up_to_id)
         result = await self.session.execute(stmt)
         return {row[0]: row[1] for row in result.all()}
 
     async def update_reaction_markup(self, chat_id: int, message_id: int) -> None:
-        """Update inline keyboard of an interactive post with current counts."""
-        chat_id_str = str(chat_id)
-
-        counts = await self.get_reaction_counts(message_id)
+        """Update inline keyboard of an interactive post with current counts.
 
+        The edit is debounced by :class:`ReactionMarkupUpdater`; counts are
+        read from the database only the first time a post is updated.
+        """
+        updater = get_reaction_markup_updater()
+        if not updater.is_seeded(message_id):
+            await updater.seed(message_id, chat_id, lambda: self._load_reaction_state(chat_id, message_id))
+        updater.schedule(self.bot, message_id)
+
+    async def _load_reaction_state(
+        self, chat_id: int, message_id: int
+    ) -> tuple[list[str], dict[str, int], int]:
+        # Primero el id máximo y luego los conteos hasta él: una reacción guardada entre
+        # las dos consultas queda por encima de max_id y la suma ReactionMarkupUpdater.record
+        max_id = await self.session.scalar(
+            select(func.max(ButtonReaction.id)).where(ButtonReaction.message_id == message_id)
+        ) or 0
+        counts = await self.get_reaction_counts(message_id, up_to_id=max_id)
         raw_reactions, _ = await self.channel_service.get_reactions_and_points(chat_id)
-
-        try:
-            markup_to_edit = get_reaction_kb(
-                reactions=raw_reactions,
-                current_counts=counts,
-                message_id=message_id,
-                channel_id=chat_id,
-            )
-            logger.debug(f"Markup being sent for update: {markup_to_edit}")
-
-            await self.bot.edit_message_reply_markup(
-                chat_id=chat_id_str,
-                message_id=message_id,
-                reply_markup=markup_to_edit,
-            )
-        except TelegramBadRequest as e:
-            logger.error(
-                f"Failed to update reaction markup for chat {chat_id}, message {message_id}: {e}",
-                exc_info=True,
-            )
-        except TelegramAPIError as e:
-            logger.error(
-                f"Unexpected API error updating reaction markup for chat {chat_id}, message {message_id}: {e}",
-                exc_info=True,
-            )
+        return raw_reactions, counts, max_id
 
     async def get_weekly_reaction_ranking(self, limit: int = 3) -> list[tuple[int, int]]:
         """Return a list of (user_id, count) for reactions in last 7 days."""
+        counters = get_reaction_counters()
+        if counters.loaded:
+            return counters.top(limit)
+
         since = datetime.datetime.utcnow() - datetime.timedelta(days=7)
         stmt = (
             select(ButtonReaction.user_id, func.count(ButtonReaction.id))
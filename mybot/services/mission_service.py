@@ -256,7 +256,7 @@ class MissionService:
         _skip_notification=False,
     ) -> None:
         missions = await self.get_active_missions(mission_type=mission_type)
-        
+        completed_any = False
         for mission in missions:
             stmt = select(UserMissionEntry).where(
                 UserMissionEntry.user_id == user_id,
@@ -285,6 +285,7 @@ class MissionService:
             if progress >= mission.target_value:
                 record.completed = True
                 record.completed_at = datetime.utcnow()
+                completed_any = True
                 
                 # Añadir puntos sin notificación
                 await self.point_service.add_points(user_id, mission.reward_points, bot=bot, skip_notification=True)
@@ -319,6 +320,9 @@ class MissionService:
                             reply_markup=get_mission_completed_keyboard(),
                         )
                         
+        if completed_any:
+            # Las insignias de misiones cuentan las entradas completadas de este usuario
+            await self.point_service.achievement_service.award_unlocked_badges(user_id, ["missions"], bot=bot)
         await self.session.commit()
 
     async def delete_mission(self, mission_id: str) -> bool:
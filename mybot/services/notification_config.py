@@ -21,6 +21,15 @@ class NotificationConfig:
     
     # Tiempo máximo de espera para cualquier notificación
     max_wait_time: float = 2.0
+
+    # Usuarios con notificaciones pendientes antes de adelantar el envío de los más antiguos
+    max_pending_users: int = 5000
+
+    # Claves de duplicados recordadas como máximo (se descartan las más antiguas)
+    max_dedup_entries: int = 50000
+
+    # Resolución (segundos) de la rueda de temporizadores de envío
+    wheel_tick: float = 0.05
     
     # Configuración de formato de mensajes
     message_format: Dict[str, bool] = None
@@ -61,6 +70,9 @@ class NotificationConfig:
             'duplicate_window': self.duplicate_window,
             'enable_aggregation': self.enable_aggregation,
             'max_wait_time': self.max_wait_time,
+            'max_pending_users': self.max_pending_users,
+            'max_dedup_entries': self.max_dedup_entries,
+            'wheel_tick': self.wheel_tick,
             'message_format': self.message_format
         }
         
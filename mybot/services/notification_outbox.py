@@ -0,0 +1,251 @@
+"""
+Drainer for the durable notification outbox.
+
+``NotificationService`` writes each notification to ``notification_outbox``
+in the same transaction as the reward, with ``available_at`` set to the end of
+its aggregation window. The drainer claims due rows in batches, groups them
+per user into one message built by ``NotificationAggregator.build_message`` and
+marks the whole batch sent with a single commit.
+
+Claiming is safe with several drainers: due rows are selected with
+``FOR UPDATE SKIP LOCKED`` on PostgreSQL (SQLite ignores it and serialises the
+claim through its single writer) and the claim itself is a conditional
+``UPDATE``. A claim expires after ``NOTIFICATION_OUTBOX_CLAIM_TTL`` seconds, so
+rows claimed by a replica that died are sent again: delivery is at least once.
+"""
+import asyncio
+import logging
+import os
+import socket
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List
+from uuid import uuid4
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramForbiddenError
+from sqlalchemy import delete, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from database.models import NotificationOutbox
+from services.notification_service import NotificationData, get_notification_aggregator
+from services.outbound_dispatcher import Priority, outbound_priority
+from utils.config import Config
+from utils.message_safety import safe_send_message
+
+logger = logging.getLogger(__name__)
+
+# Cada cuánto se borran las filas ya enviadas más antiguas que la retención
+PURGE_INTERVAL = 3600
+
+
+async def claim_due(
+    session: AsyncSession, owner: str, batch_size: int, claim_ttl: float
+) -> List[NotificationOutbox]:
+    """Claim every unsent row of the users that have a due row.
+
+    ``owner`` must be unique per batch; the claimed rows are returned.
+    """
+    now = datetime.utcnow()
+    claimable = or_(NotificationOutbox.claimed_until.is_(None), NotificationOutbox.claimed_until < now)
+    due_users = (
+        await session.execute(
+            select(NotificationOutbox.user_id)
+            .where(
+                NotificationOutbox.sent_at.is_(None),
+                NotificationOutbox.available_at <= now,
+                claimable,
+            )
+            .order_by(NotificationOutbox.available_at)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        )
+    ).scalars().all()
+    if not due_users:
+        await session.rollback()
+        return []
+    # Se reclaman también las filas aún en ventana del mismo usuario para enviarlas juntas;
+    # SKIP LOCKED evita esperar (o un deadlock) con otro drenador que tenga filas del usuario
+    ids = (
+        await session.execute(
+            select(NotificationOutbox.id)
+            .where(
+                NotificationOutbox.user_id.in_(set(due_users)),
+                NotificationOutbox.sent_at.is_(None),
+                claimable,
+            )
+            .with_for_update(skip_locked=True)
+        )
+    ).scalars().all()
+    await session.execute(
+        update(NotificationOutbox)
+        .where(NotificationOutbox.id.in_(ids), NotificationOutbox.sent_at.is_(None), claimable)
+        .values(claimed_by=owner, claimed_until=now + timedelta(seconds=claim_ttl))
+        .execution_options(synchronize_session=False)
+    )
+    await session.commit()
+    rows = (
+        await session.execute(
+            select(NotificationOutbox)
+            .where(NotificationOutbox.claimed_by == owner, NotificationOutbox.sent_at.is_(None))
+            .order_by(NotificationOutbox.id)
+        )
+    ).scalars().all()
+    # Cerrar la transacción de lectura: no se retiene la conexión durante los envíos
+    await session.commit()
+    return list(rows)
+
+
+class OutboxDrainer:
+    """Send claimed outbox rows, one aggregated message per user."""
+
+    def __init__(
+        self,
+        batch_size: int,
+        poll_interval: float,
+        claim_ttl: float,
+        max_attempts: int,
+        retention_hours: float,
+    ):
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.claim_ttl = claim_ttl
+        self.max_attempts = max_attempts
+        self.retention = timedelta(hours=retention_hours)
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid4().hex[:8]}"
+        self.claimed = 0
+        self.sent_messages = 0
+        self.merged = 0
+        self.retried = 0
+        self.dropped = 0
+
+    async def drain_once(self, bot: Bot, session_factory: async_sessionmaker[AsyncSession]) -> int:
+        """Claim and send one batch. Returns how many rows were claimed."""
+        async with session_factory() as session:
+            token = f"{self.owner}:{uuid4().hex[:8]}"
+            rows = await claim_due(session, token, self.batch_size, self.claim_ttl)
+            if not rows:
+                return 0
+            self.claimed += len(rows)
+            by_user: Dict[int, List[NotificationOutbox]] = defaultdict(list)
+            for row in rows:
+                by_user[row.user_id].append(row)
+
+            results = await asyncio.gather(
+                *(self._send(bot, user_id, user_rows) for user_id, user_rows in by_user.items())
+            )
+
+            now = datetime.utcnow()
+            for (user_id, user_rows), outcome in zip(by_user.items(), results):
+                for row in user_rows:
+                    row.claimed_by = None
+                    if outcome == "sent" or outcome == "drop":
+                        row.sent_at = now
+                        continue
+                    row.attempts += 1
+                    if row.attempts >= self.max_attempts:
+                        row.sent_at = now
+                        self.dropped += 1
+                    else:
+                        # Reintento con espera creciente
+                        row.claimed_until = now + timedelta(seconds=2 ** row.attempts)
+                        self.retried += 1
+            # Un solo commit por lote en lugar de uno por notificación
+            await session.commit()
+            return len(rows)
+
+    async def _send(self, bot: Bot, user_id: int, rows: List[NotificationOutbox]) -> str:
+        notifications = [
+            NotificationData(row.notification_type, row.data or {}, row.priority, row.created_at)
+            for row in rows
+        ]
+        message = await get_notification_aggregator().build_message(notifications)
+        if not message:
+            return "drop"
+        try:
+            with outbound_priority(Priority.NOTIFICATION):
+                await safe_send_message(bot, user_id, message, parse_mode="Markdown")
+        except TelegramForbiddenError:
+            # El usuario bloqueó al bot: reintentar no sirve
+            logger.info(f"User {user_id} blocked the bot, dropping {len(rows)} notifications")
+            self.dropped += len(rows)
+            return "drop"
+        except Exception as e:
+            logger.warning(f"Error sending outbox notifications to user {user_id}: {e}")
+            return "retry"
+        self.sent_messages += 1
+        self.merged += len(rows) - 1
+        return "sent"
+
+    async def purge(self, session_factory: async_sessionmaker[AsyncSession]) -> int:
+        """Delete rows sent before the retention window."""
+        async with session_factory() as session:
+            result = await session.execute(
+                delete(NotificationOutbox).where(
+                    NotificationOutbox.sent_at.is_not(None),
+                    NotificationOutbox.sent_at < datetime.utcnow() - self.retention,
+                )
+            )
+            await session.commit()
+            return result.rowcount or 0
+
+    async def run(self, bot: Bot, session_factory: async_sessionmaker[AsyncSession]) -> None:
+        """Drain the outbox until cancelled."""
+        loop = asyncio.get_running_loop()
+        purge_at = loop.time()
+        while True:
+            try:
+                if loop.time() >= purge_at:
+                    purged = await self.purge(session_factory)
+                    if purged:
+                        logger.info(f"Purged {purged} sent outbox notifications")
+                    purge_at = loop.time() + PURGE_INTERVAL
+                claimed = await self.drain_once(bot, session_factory)
+            except Exception as e:
+                logger.error(f"Error draining notification outbox: {e}", exc_info=True)
+                claimed = 0
+            # Lote lleno: probablemente hay más pendientes, seguir sin esperar
+            if claimed < self.batch_size:
+                await asyncio.sleep(self.poll_interval)
+
+    def get_metrics(self) -> Dict[str, int]:
+        """Return claimed, sent, merged, retried and dropped counters."""
+        return {
+            "claimed": self.claimed,
+            "sent_messages": self.sent_messages,
+            "merged": self.merged,
+            "retried": self.retried,
+            "dropped": self.dropped,
+        }
+
+
+# Global drainer instance, same singleton pattern as the leaderboard
+_drainer_instance = None
+
+
+def get_outbox_drainer() -> OutboxDrainer:
+    """
+    Get the global OutboxDrainer instance.
+
+    Returns:
+        OutboxDrainer: The global outbox drainer
+    """
+    global _drainer_instance
+    if _drainer_instance is None:
+        _drainer_instance = OutboxDrainer(
+            Config.NOTIFICATION_OUTBOX_BATCH_SIZE,
+            Config.NOTIFICATION_OUTBOX_POLL_INTERVAL,
+            Config.NOTIFICATION_OUTBOX_CLAIM_TTL,
+            Config.NOTIFICATION_OUTBOX_MAX_ATTEMPTS,
+            Config.NOTIFICATION_OUTBOX_RETENTION_HOURS,
+        )
+    return _drainer_instance
+
+
+def reset_outbox_drainer() -> None:
+    """
+    Reset the global OutboxDrainer instance.
+    Primarily used for testing purposes.
+    """
+    global _drainer_instance
+    _drainer_instance = None
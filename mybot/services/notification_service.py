@@ -1,12 +1,20 @@
 import asyncio
+import json
 import logging
+import time
 from datetime import datetime, timedelta
-from typing import Dict, List, Any, Optional, Set
+from typing import Dict, List, Any, Optional, Set, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
 from aiogram import Bot
-from collections import defaultdict
+from collections import OrderedDict, defaultdict
 
+from database.models import NotificationOutbox
+from database.unit_of_work import commit_or_flush
+from services.notification_config import NotificationConfig, get_notification_config
+from services.outbound_dispatcher import Priority, outbound_priority
+from utils.config import Config
 from utils.message_safety import safe_send_message
+from utils.timer_wheel import TimerWheel
 
 logger = logging.getLogger(__name__)
 
@@ -30,11 +38,8 @@ class NotificationData:
         self.hash = self._generate_hash()
     
     def _generate_hash(self) -> str:
-        """Genera un hash único para evitar duplicados."""
+        """Genera una clave para descartar duplicados dentro de ``duplicate_window``."""
         key_parts = [self.type]
-        
-        # Add timestamp minute to improve duplicate detection for frequent notifications
-        minute_str = str(self.timestamp.minute)
 
         if self.type == "points":
             # Include point amount and add source if available
@@ -47,9 +52,7 @@ class NotificationData:
             if "mission_id" in self.data:
                 key_parts.append(str(self.data.get("mission_id", "")))
         elif self.type == "mission_completed":
-            key_parts.append(self.data.get("mission_id", ""))
-            # Add timestamp for better uniqueness
-            key_parts.append(minute_str)
+            key_parts.append(str(self.data.get("mission_id", "")))
         elif self.type == "achievement":
             key_parts.append(self.data.get("name", ""))
             # Add achievement_id if available for better uniqueness
@@ -58,152 +61,186 @@ class NotificationData:
         elif self.type == "badge":
             # Better badge duplicate detection
             key_parts.append(self.data.get("name", ""))
-        
-        # For all notification types, add the minute timestamp for short-term deduplication
-        key_parts.append(minute_str)
 
         return "_".join(key_parts)
 
-class NotificationService:
+
+class NotificationAggregator:
     """
-    Servicio centralizado para manejo de notificaciones con agregación temporal inteligente.
-    Consolida notificaciones relacionadas en un solo mensaje para mejorar la experiencia.
+    Agregador de notificaciones compartido por todo el proceso.
+
+    Todas las instancias de ``NotificationService`` escriben aquí, de modo que
+    las notificaciones de eventos distintos del mismo usuario se combinan en
+    un único mensaje. Una sola ``TimerWheel`` lleva el momento de envío de
+    cada usuario en lugar de una tarea asyncio por notificación. Los
+    duplicados se recuerdan ``duplicate_window`` segundos y la memoria está
+    acotada por ``max_pending_users`` y ``max_dedup_entries``.
     """
-    
-    def __init__(self, session: AsyncSession, bot: Bot):
-        self.session = session
-        self.bot = bot
-        self.pending_notifications: Dict[int, List[NotificationData]] = defaultdict(list)
-        self.scheduled_tasks: Dict[int, asyncio.Task] = {}
-        self.processed_hashes: Dict[int, Set[str]] = defaultdict(set)
-        
-        # Configuración de delays por prioridad
-        self.aggregation_delays = {
-            NotificationPriority.CRITICAL: 0.1,  # Casi inmediato
-            NotificationPriority.HIGH: 0.5,      # Medio segundo
-            NotificationPriority.MEDIUM: 1.0,    # Un segundo
-            NotificationPriority.LOW: 1.5        # Segundo y medio
-        }
-        
-        # Límite de notificaciones en cola antes de forzar envío
-        self.max_queue_size = 10
-        
-    async def add_notification(self, user_id: int, notification_type: str, 
-                              data: Dict[str, Any], 
-                              priority: int = NotificationPriority.MEDIUM) -> None:
-        """
-        Añade una notificación a la cola con detección de duplicados.
-        
-        Args:
-            user_id: ID del usuario de Telegram
-            notification_type: Tipo de notificación
-            data: Datos específicos de la notificación
-            priority: Prioridad de la notificación
-        """
-        try:
-            notification = NotificationData(notification_type, data, priority)
-            
-            # Verificar duplicados
-            if notification.hash in self.processed_hashes[user_id]:
-                logger.debug(f"Skipping duplicate notification {notification.hash} for user {user_id}")
-                return
-            
-            # Añadir a procesados
-            self.processed_hashes[user_id].add(notification.hash)
-            
-            # Añadir a la cola
-            self.pending_notifications[user_id].append(notification)
-            
-            # Verificar si debemos enviar inmediatamente
-            should_send_now = (
-                len(self.pending_notifications[user_id]) >= self.max_queue_size or
-                priority == NotificationPriority.CRITICAL
-            )
-            
-            if should_send_now:
-                # Enviar inmediatamente si es crítico o la cola está llena
-                await self._send_notifications_now(user_id)
-            else:
-                # Programar envío con delay según prioridad
-                await self._schedule_send_with_priority(user_id, priority)
-            
-            logger.debug(f"Added {notification_type} notification for user {user_id} with priority {priority}")
-            
-        except Exception as e:
-            logger.exception(f"Error adding notification for user {user_id}: {e}")
-    
-    async def _schedule_send_with_priority(self, user_id: int, priority: int) -> None:
-        """Programa el envío con delay basado en prioridad."""
-        # Cancelar tarea anterior si existe
-        if user_id in self.scheduled_tasks:
-            self.scheduled_tasks[user_id].cancel()
-        
-        # Obtener delay según prioridad
-        delay = self.aggregation_delays.get(priority, 1.0)
-        
-        # Programar nueva tarea
-        self.scheduled_tasks[user_id] = asyncio.create_task(
-            self._delayed_send(user_id, delay)
-        )
-    
-    async def _delayed_send(self, user_id: int, delay: float) -> None:
-        """Envía notificaciones después del delay especificado."""
+
+    def __init__(self, config: Optional[NotificationConfig] = None):
+        self.config = config or get_notification_config()
+        self.pending_notifications: Dict[int, List[NotificationData]] = {}
+        # Momento de la primera notificación pendiente, en orden de llegada
+        self._first_pending: Dict[int, float] = {}
+        self._recent: "OrderedDict[Tuple[int, str], float]" = OrderedDict()
+        self._wheel = TimerWheel(self.config.wheel_tick)
+        self._driver: Optional[asyncio.Task] = None
+        self._bot: Optional[Bot] = None
+        self.received = 0
+        self.duplicates = 0
+        self.merged = 0
+        self.sent_messages = 0
+        self.forced_flushes = 0
+        self.failed = 0
+
+    def _is_duplicate(self, user_id: int, key: str, now: float) -> bool:
+        while self._recent:
+            oldest, expires_at = next(iter(self._recent.items()))
+            if expires_at > now:
+                break
+            del self._recent[oldest]
+        if (user_id, key) in self._recent:
+            return True
+        self._recent[(user_id, key)] = now + self.config.duplicate_window
+        if len(self._recent) > self.config.max_dedup_entries:
+            self._recent.popitem(last=False)
+        return False
+
+    def accept(self, user_id: int, notification: NotificationData) -> bool:
+        """Cuenta ``notification`` y devuelve False si es un duplicado reciente."""
+        if self._is_duplicate(user_id, notification.hash, time.monotonic()):
+            self.duplicates += 1
+            logger.debug(f"Skipping duplicate notification {notification.hash} for user {user_id}")
+            return False
+        self.received += 1
+        return True
+
+    async def add(self, bot: Bot, user_id: int, notification: NotificationData) -> bool:
+        """Encola ``notification``. Devuelve False si era un duplicado."""
+        self._bot = bot
+        if not self.accept(user_id, notification):
+            return False
+
+        now = time.monotonic()
+        queue = self.pending_notifications.setdefault(user_id, [])
+        queue.append(notification)
+
+        if (
+            not self.config.enable_aggregation
+            or len(queue) >= self.config.max_queue_size
+            or notification.priority == NotificationPriority.CRITICAL
+        ):
+            await self.flush(user_id, bot)
+            return True
+
+        first = self._first_pending.setdefault(user_id, now)
+        delay = self.config.aggregation_delays.get(notification.priority, 1.0)
+        # Cada notificación aplaza el envío, pero nunca más allá de max_wait_time
+        self._wheel.schedule_at(user_id, min(now + delay, first + self.config.max_wait_time))
+        if self._driver is None or self._driver.done():
+            self._driver = asyncio.create_task(self._run_wheel(), name="notification_wheel")
+
+        # Por encima del límite se adelanta el envío de los usuarios más antiguos
+        while len(self.pending_notifications) > self.config.max_pending_users:
+            oldest = next(iter(self._first_pending), None)
+            if oldest is None:
+                break
+            self.forced_flushes += 1
+            await self.flush(oldest)
+        return True
+
+    async def _run_wheel(self) -> None:
+        while len(self._wheel):
+            await asyncio.sleep(self._wheel.tick)
+            due = self._wheel.advance()
+            if due:
+                await asyncio.gather(*(self.flush(user_id) for user_id in due))
+
+    async def flush(self, user_id: int, bot: Optional[Bot] = None) -> bool:
+        """Envía en un solo mensaje todo lo pendiente de ``user_id``."""
+        self._wheel.cancel(user_id)
+        self._first_pending.pop(user_id, None)
+        notifications = self.pending_notifications.pop(user_id, None)
+        if not notifications:
+            return False
         try:
-            await asyncio.sleep(delay)
-            await self._send_notifications_now(user_id)
-        except asyncio.CancelledError:
-            pass
-        except Exception as e:
-            logger.exception(f"Error in delayed send for user {user_id}: {e}")
-    
-    async def _send_notifications_now(self, user_id: int) -> None:
-        """Envía todas las notificaciones pendientes inmediatamente."""
-        try:
-            if user_id not in self.pending_notifications:
-                return
-            
-            notifications = self.pending_notifications.pop(user_id, [])
-            
-            if not notifications:
-                return
-            
-            # Limpiar tarea programada
-            if user_id in self.scheduled_tasks:
-                del self.scheduled_tasks[user_id]
-            
-            # Ordenar por prioridad
-            notifications.sort(key=lambda n: (n.priority, n.timestamp))
-            
-            # Agrupar por tipo
-            grouped = self._group_notifications_by_type(notifications)
-            
-            # Construir mensaje unificado
-            message = await self._build_enhanced_unified_message(grouped)
-            
-            if message:
-                await safe_send_message(self.bot, user_id, message, parse_mode="Markdown")
-                logger.info(f"Sent unified notification to user {user_id}: {len(notifications)} items")
-            
-            # Limpiar hashes procesados después de un tiempo
-            asyncio.create_task(self._cleanup_processed_hashes(user_id))
-            
+            message = await self.build_message(notifications)
+            if not message:
+                return False
+            with outbound_priority(Priority.NOTIFICATION):
+                await safe_send_message(bot or self._bot, user_id, message, parse_mode="Markdown")
         except Exception as e:
+            self.failed += len(notifications)
             logger.exception(f"Error sending notifications for user {user_id}: {e}")
-    
-    async def _cleanup_processed_hashes(self, user_id: int, delay: int = 30) -> None:
-        """Limpia los hashes procesados después de un tiempo."""
-        await asyncio.sleep(delay)
-        if user_id in self.processed_hashes:
-            self.processed_hashes[user_id].clear()
-    
-    def _group_notifications_by_type(self, notifications: List[NotificationData]) -> Dict[str, List[Dict[str, Any]]]:
+            return False
+        self.sent_messages += 1
+        self.merged += len(notifications) - 1
+        logger.info(f"Sent unified notification to user {user_id}: {len(notifications)} items")
+        return True
+
+    def recent_hashes(self, user_id: int) -> Set[str]:
+        """Claves de duplicados de ``user_id`` aún dentro de ``duplicate_window``."""
+        now = time.monotonic()
+        return {key for (uid, key), expires_at in self._recent.items() if uid == user_id and expires_at > now}
+
+    def recent_hashes_by_user(self) -> Dict[int, Set[str]]:
+        """Claves de duplicados vigentes agrupadas por usuario."""
+        now = time.monotonic()
+        hashes: Dict[int, Set[str]] = defaultdict(set)
+        for (user_id, key), expires_at in self._recent.items():
+            if expires_at > now:
+                hashes[user_id].add(key)
+        return hashes
+
+    def forget_recent(self, user_id: int) -> None:
+        """Olvida las claves de duplicados de ``user_id``."""
+        for key in [key for key in self._recent if key[0] == user_id]:
+            del self._recent[key]
+
+    def is_scheduled(self, user_id: int) -> bool:
+        return user_id in self._wheel
+
+    def discard(self, user_id: int) -> None:
+        """Olvida lo pendiente de ``user_id`` sin enviarlo."""
+        self._wheel.cancel(user_id)
+        self._first_pending.pop(user_id, None)
+        self.pending_notifications.pop(user_id, None)
+        self.forget_recent(user_id)
+
+    async def shutdown(self) -> None:
+        """Envía todo lo pendiente y detiene la rueda."""
+        if self._driver is not None and not self._driver.done():
+            self._driver.cancel()
+            await asyncio.gather(self._driver, return_exceptions=True)
+        await asyncio.gather(*(self.flush(user_id) for user_id in list(self.pending_notifications)))
+
+    def get_metrics(self) -> Dict[str, int]:
+        """Contadores de notificaciones recibidas, combinadas y enviadas."""
+        return {
+            "pending_users": len(self.pending_notifications),
+            "pending": sum(len(items) for items in self.pending_notifications.values()),
+            "received": self.received,
+            "duplicates": self.duplicates,
+            "merged": self.merged,
+            "sent_messages": self.sent_messages,
+            "forced_flushes": self.forced_flushes,
+            "failed": self.failed,
+            "dedup_entries": len(self._recent),
+        }
+
+    async def build_message(self, notifications: List[NotificationData]) -> str:
+        """Mensaje unificado con ``notifications``, ordenadas por prioridad y antigüedad."""
+        notifications = sorted(notifications, key=lambda n: (n.priority, n.timestamp))
+        return await self.build_grouped_message(self.group_by_type(notifications))
+
+    def group_by_type(self, notifications: List[NotificationData]) -> Dict[str, List[Dict[str, Any]]]:
         """Agrupa notificaciones por tipo para consolidación."""
         grouped = defaultdict(list)
         for notification in notifications:
             grouped[notification.type].append(notification.data)
         return dict(grouped)
     
-    async def _build_enhanced_unified_message(self, grouped: Dict[str, List[Dict[str, Any]]]) -> str:
+    async def build_grouped_message(self, grouped: Dict[str, List[Dict[str, Any]]]) -> str:
         """
         Construye un mensaje unificado mejorado con formato atractivo.
         
@@ -378,65 +415,157 @@ class NotificationService:
             logger.exception(f"Error building enhanced message: {e}")
             # Mensaje de fallback
             return "💋 *Diana te envía una sonrisa misteriosa...*\n\nHas progresado en tu viaje. ¡Continúa explorando!"
-    
-    async def send_immediate_notification(self, user_id: int, message: str, 
+
+
+class NotificationService:
+    """
+    Servicio centralizado para manejo de notificaciones con agregación temporal inteligente.
+    Consolida notificaciones relacionadas en un solo mensaje para mejorar la experiencia.
+
+    Puede instanciarse por sesión o por llamada: el estado vive en el
+    ``NotificationAggregator`` global del proceso. Con ``NOTIFICATION_OUTBOX``
+    las notificaciones se escriben en ``notification_outbox`` con la sesión
+    del llamador y las envía ``OutboxDrainer``, así sobreviven a un reinicio.
+    """
+
+    def __init__(self, session: AsyncSession, bot: Bot,
+                 aggregator: Optional[NotificationAggregator] = None):
+        self.session = session
+        self.bot = bot
+        self.aggregator = aggregator or get_notification_aggregator()
+
+    @property
+    def pending_notifications(self) -> Dict[int, List[NotificationData]]:
+        return self.aggregator.pending_notifications
+
+    @property
+    def processed_hashes(self) -> Dict[int, Set[str]]:
+        """Claves de duplicados vigentes por usuario (copia de lo que guarda el agregador)."""
+        return self.aggregator.recent_hashes_by_user()
+
+    @property
+    def scheduled_tasks(self) -> Set[int]:
+        """Usuarios con un envío programado en la rueda."""
+        return {user_id for user_id in self.aggregator.pending_notifications if self.aggregator.is_scheduled(user_id)}
+
+    async def _cleanup_processed_hashes(self, user_id: int, delay: float = 30) -> None:
+        """Olvida los duplicados recordados de ``user_id`` tras ``delay`` segundos."""
+        await asyncio.sleep(delay)
+        self.aggregator.forget_recent(user_id)
+
+    def _group_notifications_by_type(self, notifications: List[NotificationData]) -> Dict[str, List[Dict[str, Any]]]:
+        return self.aggregator.group_by_type(notifications)
+
+    async def _build_enhanced_unified_message(self, grouped: Dict[str, List[Dict[str, Any]]]) -> str:
+        return await self.aggregator.build_grouped_message(grouped)
+
+    async def add_notification(self, user_id: int, notification_type: str,
+                              data: Dict[str, Any],
+                              priority: int = NotificationPriority.MEDIUM) -> None:
+        """
+        Añade una notificación a la cola con detección de duplicados.
+
+        Args:
+            user_id: ID del usuario de Telegram
+            notification_type: Tipo de notificación
+            data: Datos específicos de la notificación
+            priority: Prioridad de la notificación
+        """
+        try:
+            notification = NotificationData(notification_type, data, priority)
+            if self.session is not None and Config.NOTIFICATION_OUTBOX:
+                added = await self._write_outbox(user_id, notification)
+            else:
+                added = await self.aggregator.add(self.bot, user_id, notification)
+            if added:
+                logger.debug(f"Added {notification_type} notification for user {user_id} with priority {priority}")
+        except Exception as e:
+            logger.exception(f"Error adding notification for user {user_id}: {e}")
+
+    async def _write_outbox(self, user_id: int, notification: NotificationData) -> bool:
+        """Guarda la notificación en el outbox, en la misma transacción que la recompensa."""
+        if not self.aggregator.accept(user_id, notification):
+            return False
+        now = datetime.utcnow()
+        delay = self.aggregator.config.aggregation_delays.get(notification.priority, 1.0)
+        self.session.add(
+            NotificationOutbox(
+                user_id=user_id,
+                notification_type=notification.type,
+                # Ida y vuelta por JSON para que fechas u objetos no rompan el flush
+                data=json.loads(json.dumps(notification.data, default=str)),
+                priority=notification.priority,
+                created_at=now,
+                available_at=now + timedelta(seconds=delay),
+            )
+        )
+        await commit_or_flush(self.session)
+        return True
+
+    async def send_immediate_notification(self, user_id: int, message: str,
                                          priority: int = NotificationPriority.HIGH) -> None:
         """
         Envía una notificación inmediata sin agregación.
         Útil para notificaciones críticas o de error.
         """
         try:
-            # Cancelar cualquier envío programado
-            if user_id in self.scheduled_tasks:
-                self.scheduled_tasks[user_id].cancel()
-            
             # Enviar notificaciones pendientes primero si existen
-            if user_id in self.pending_notifications and self.pending_notifications[user_id]:
-                await self._send_notifications_now(user_id)
-            
+            await self.aggregator.flush(user_id, self.bot)
+
             # Enviar la notificación inmediata
             await safe_send_message(self.bot, user_id, message, parse_mode="Markdown")
             logger.info(f"Sent immediate notification to user {user_id}")
-            
+
         except Exception as e:
             logger.exception(f"Error sending immediate notification to user {user_id}: {e}")
-    
+
     async def flush_pending_notifications(self, user_id: int) -> None:
         """
         Fuerza el envío inmediato de todas las notificaciones pendientes.
         Útil para asegurar que el usuario reciba todo antes de una desconexión.
         """
         try:
-            if user_id in self.scheduled_tasks:
-                self.scheduled_tasks[user_id].cancel()
-            
-            await self._send_notifications_now(user_id)
+            await self.aggregator.flush(user_id, self.bot)
             logger.info(f"Flushed all pending notifications for user {user_id}")
-            
+
         except Exception as e:
             logger.exception(f"Error flushing notifications for user {user_id}: {e}")
-    
+
     def get_pending_count(self, user_id: int) -> int:
         """Obtiene el número de notificaciones pendientes para un usuario."""
-        return len(self.pending_notifications.get(user_id, []))
-    
+        return len(self.aggregator.pending_notifications.get(user_id, []))
+
     async def cleanup_user(self, user_id: int) -> None:
         """Limpia todos los datos relacionados con un usuario."""
         try:
-            # Cancelar tareas
-            if user_id in self.scheduled_tasks:
-                self.scheduled_tasks[user_id].cancel()
-                del self.scheduled_tasks[user_id]
-            
-            # Limpiar notificaciones pendientes
-            if user_id in self.pending_notifications:
-                del self.pending_notifications[user_id]
-            
-            # Limpiar hashes procesados
-            if user_id in self.processed_hashes:
-                del self.processed_hashes[user_id]
-            
+            self.aggregator.discard(user_id)
             logger.info(f"Cleaned up notification data for user {user_id}")
-            
+
         except Exception as e:
-            logger.exception(f"Error cleaning up user {user_id}: {e}")
\ No newline at end of file
+            logger.exception(f"Error cleaning up user {user_id}: {e}")
+
+
+# Global aggregator instance, same singleton pattern as the leaderboard
+_aggregator_instance = None
+
+
+def get_notification_aggregator() -> NotificationAggregator:
+    """
+    Get the global NotificationAggregator instance.
+
+    Returns:
+        NotificationAggregator: The global notification aggregator
+    """
+    global _aggregator_instance
+    if _aggregator_instance is None:
+        _aggregator_instance = NotificationAggregator()
+    return _aggregator_instance
+
+
+def reset_notification_aggregator() -> None:
+    """
+    Reset the global NotificationAggregator instance.
+    Primarily used for testing purposes.
+    """
+    global _aggregator_instance
+    _aggregator_instance = None
@@ -0,0 +1,350 @@
+"""
+Central dispatcher for outgoing Telegram messages.
+
+``OutboundMiddleware`` is installed on ``bot.session``, so every send, copy,
+forward and edit made with the bot (``safe_send_message``, ``PointService``,
+``LevelService``, auction notifications, schedulers...) waits for a permit
+from :class:`OutboundDispatcher` before reaching Telegram:
+
+- a global token bucket of ``OUTBOUND_GLOBAL_RATE`` messages per second;
+- one bucket per chat, ``OUTBOUND_CHAT_RATE`` for private chats and
+  ``OUTBOUND_GROUP_RATE`` for groups and channels;
+- waiting messages are served by priority: replies to the user first, then
+  notifications, then bulk jobs. The priority comes from the context, see
+  :func:`outbound_priority`;
+- on ``retry_after`` the chat is paused and the request retried up to
+  ``MAX_RETRIES`` times before the error reaches the caller.
+
+Rewards announced from inside a unit of work use :func:`notify_after_commit`,
+which holds the message until the session commits and drops it on rollback.
+
+Other API calls (``get_chat_member``, ``approve_chat_join_request``...) are not
+throttled here. Join approvals all target the same channel, so the per-chat
+group bucket would cap them at ``OUTBOUND_GROUP_RATE``; they are limited by
+the ``JOIN_APPROVAL_RATE`` bucket of ``JoinRequestPipeline`` instead.
+"""
+import asyncio
+import contextvars
+import enum
+import logging
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Deque, Dict, Iterator, Optional, Set, Tuple
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import (
+    BaseRequestMiddleware,
+    NextRequestMiddlewareType,
+)
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import TelegramMethod
+from aiogram.methods.base import Response, TelegramType
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from database.unit_of_work import in_unit_of_work
+
+from utils.config import Config
+from utils.rate_limiter import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+MAX_RETRIES = 3
+# Esperas más largas no se absorben: el error llega al llamador
+MAX_RETRY_AFTER = 60
+# Tickets examinados por prioridad al buscar un chat con permiso disponible
+SCAN_LIMIT = 100
+THROTTLED_PREFIXES = ("send", "copy", "forward", "edit")
+PENDING_SENDS_KEY = "outbound_after_commit"
+
+
+class Priority(enum.IntEnum):
+    INTERACTIVE = 0
+    NOTIFICATION = 1
+    BULK = 2
+
+
+_priority: contextvars.ContextVar[Priority] = contextvars.ContextVar(
+    "outbound_priority", default=Priority.INTERACTIVE
+)
+
+
+@contextmanager
+def outbound_priority(priority: Priority) -> Iterator[None]:
+    """Send every message made inside the block with ``priority``.
+
+    Tasks created inside the block inherit it as well.
+    """
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority() -> Priority:
+    return _priority.get()
+
+
+async def send_notification(bot: Bot, chat_id: int, text: str, **kwargs):
+    """``bot.send_message`` queued behind interactive replies."""
+    with outbound_priority(Priority.NOTIFICATION):
+        return await bot.send_message(chat_id, text, **kwargs)
+
+
+# Referencias a los envíos tras commit en curso para que no se recojan a medias
+_after_commit_tasks: Set[asyncio.Task] = set()
+
+
+async def notify_after_commit(session: AsyncSession, bot: Bot, chat_id: int, text: str, **kwargs) -> None:
+    """:func:`send_notification` once the write announced by ``text`` is committed.
+
+    Inside a unit of work with an open transaction the message is held in
+    ``session.info`` and sent after the commit, or dropped on rollback.
+    Otherwise the write was already committed and the message is sent now.
+    """
+    if in_unit_of_work(session) and session.in_transaction():
+        session.info.setdefault(PENDING_SENDS_KEY, []).append((bot, chat_id, text, kwargs))
+        return
+    await send_notification(bot, chat_id, text, **kwargs)
+
+
+async def _send_staged(sends) -> None:
+    # En orden y de uno en uno: varios mensajes al mismo usuario no se adelantan
+    for bot, chat_id, text, kwargs in sends:
+        try:
+            await send_notification(bot, chat_id, text, **kwargs)
+        except Exception as e:
+            logger.error(f"Error sending notification to {chat_id} after commit: {e}")
+
+
+@event.listens_for(Session, "after_commit")
+def _start_staged_sends(session: Session) -> None:
+    sends = session.info.pop(PENDING_SENDS_KEY, None)
+    if not sends:
+        return
+    task = asyncio.get_running_loop().create_task(_send_staged(sends))
+    _after_commit_tasks.add(task)
+    task.add_done_callback(_after_commit_tasks.discard)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _discard_staged_sends(session: Session, transaction) -> None:
+    # after_rollback también salta al deshacer un SAVEPOINT; sólo cuenta el de fuera
+    if transaction.parent is None:
+        session.info.pop(PENDING_SENDS_KEY, None)
+
+
+@dataclass
+class _Ticket:
+    chat_id: Optional[int]
+    enqueued_at: float
+    future: asyncio.Future = field(repr=False)
+
+
+@dataclass
+class _PriorityStats:
+    sent: int = 0
+    total_wait: float = 0.0
+    max_wait: float = 0.0
+
+    def record(self, wait: float) -> None:
+        self.sent += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+
+
+class OutboundDispatcher:
+    """Hand out send permits under global and per-chat rate limits."""
+
+    def __init__(
+        self,
+        global_rate: float,
+        chat_rate: float,
+        group_rate: float,
+        chat_burst: float,
+        max_chats: int = 10000,
+    ):
+        self.global_bucket = TokenBucket(global_rate)
+        self.chat_rate = chat_rate
+        self.group_rate = group_rate
+        self.chat_burst = chat_burst
+        self.max_chats = max_chats
+        self._chats: "OrderedDict[int, TokenBucket]" = OrderedDict()
+        self._queues: Dict[Priority, Deque[_Ticket]] = {p: deque() for p in Priority}
+        self._stats: Dict[Priority, _PriorityStats] = {p: _PriorityStats() for p in Priority}
+        self._wakeup = asyncio.Event()
+        self._pump: Optional[asyncio.Task] = None
+        self.retries = 0
+        self.gave_up = 0
+
+    def __len__(self) -> int:
+        return sum(len(queue) for queue in self._queues.values())
+
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            # chat_id negativo = grupo o canal, con un límite más estricto
+            rate = self.group_rate if chat_id < 0 else self.chat_rate
+            bucket = TokenBucket(rate, max(1.0, self.chat_burst))
+            self._chats[chat_id] = bucket
+            if len(self._chats) > self.max_chats:
+                self._chats.popitem(last=False)
+        else:
+            self._chats.move_to_end(chat_id)
+        return bucket
+
+    def _ready(self, chat_id: Optional[int]) -> float:
+        """Seconds until ``chat_id`` may send, ignoring the global bucket."""
+        return self._chat_bucket(chat_id).delay() if chat_id is not None else 0.0
+
+    def _take(self, chat_id: Optional[int]) -> None:
+        self.global_bucket.try_acquire()
+        if chat_id is not None:
+            self._chat_bucket(chat_id).try_acquire()
+
+    async def acquire(self, chat_id: Optional[int], priority: Priority) -> None:
+        """Wait until a message to ``chat_id`` may be sent."""
+        if not len(self) and self.global_bucket.delay() <= 0 and self._ready(chat_id) <= 0:
+            self._take(chat_id)
+            self._stats[priority].record(0.0)
+            return
+        ticket = _Ticket(chat_id, time.monotonic(), asyncio.get_running_loop().create_future())
+        self._queues[priority].append(ticket)
+        if self._pump is None or self._pump.done():
+            self._pump = asyncio.create_task(self._run_pump(), name="outbound_pump")
+        self._wakeup.set()
+        try:
+            await ticket.future
+        except asyncio.CancelledError:
+            try:
+                self._queues[priority].remove(ticket)
+            except ValueError:
+                pass
+            raise
+
+    def backoff(self, chat_id: Optional[int], retry_after: float) -> None:
+        """Honour a ``retry_after`` received for ``chat_id``."""
+        if chat_id is None:
+            self.global_bucket.pause(retry_after)
+        else:
+            self._chat_bucket(chat_id).pause(retry_after)
+
+    def _next_ticket(self) -> Tuple[Optional[Tuple[Priority, _Ticket]], float]:
+        """Pop the first ticket, by priority, whose chat may send now."""
+        min_wait = float("inf")
+        for priority, queue in self._queues.items():
+            for index in range(min(len(queue), SCAN_LIMIT)):
+                ticket = queue[index]
+                wait = self._ready(ticket.chat_id)
+                if wait <= 0:
+                    del queue[index]
+                    return (priority, ticket), 0.0
+                min_wait = min(min_wait, wait)
+        return None, min_wait
+
+    async def _run_pump(self) -> None:
+        while len(self):
+            timeout = self.global_bucket.delay()
+            if timeout <= 0:
+                found, timeout = self._next_ticket()
+                if found is not None:
+                    priority, ticket = found
+                    self._take(ticket.chat_id)
+                    self._stats[priority].record(time.monotonic() - ticket.enqueued_at)
+                    if not ticket.future.done():
+                        ticket.future.set_result(None)
+                    continue
+            # Un mensaje nuevo puede ir a un chat libre: despertar antes del plazo
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def get_metrics(self) -> dict:
+        """Return queue depth and wait times per priority plus retry counters."""
+        metrics = {}
+        for priority in Priority:
+            stats = self._stats[priority]
+            metrics[priority.name.lower()] = {
+                "queued": len(self._queues[priority]),
+                "sent": stats.sent,
+                "avg_wait": round(stats.total_wait / stats.sent, 3) if stats.sent else 0.0,
+                "max_wait": round(stats.max_wait, 3),
+            }
+        metrics["queued"] = len(self)
+        metrics["retries"] = self.retries
+        metrics["gave_up"] = self.gave_up
+        return metrics
+
+
+class OutboundMiddleware(BaseRequestMiddleware):
+    """Route outgoing messages of a ``Bot`` through an :class:`OutboundDispatcher`."""
+
+    def __init__(self, dispatcher: "OutboundDispatcher"):
+        self.dispatcher = dispatcher
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        if not method.__api_method__.startswith(THROTTLED_PREFIXES):
+            return await make_request(bot, method)
+
+        chat_id = getattr(method, "chat_id", None)
+        if not isinstance(chat_id, int):
+            # @username de un canal: sólo cuenta para el límite global
+            chat_id = None
+        priority = current_priority()
+        attempt = 0
+        while True:
+            await self.dispatcher.acquire(chat_id, priority)
+            try:
+                return await make_request(bot, method)
+            except TelegramRetryAfter as e:
+                if attempt >= MAX_RETRIES or e.retry_after > MAX_RETRY_AFTER:
+                    self.dispatcher.gave_up += 1
+                    raise
+                attempt += 1
+                self.dispatcher.retries += 1
+                self.dispatcher.backoff(chat_id, e.retry_after)
+                logger.warning(
+                    f"Flood wait of {e.retry_after}s on {method.__api_method__} to {chat_id}, retrying"
+                )
+
+
+# Global dispatcher instance, same singleton pattern as the leaderboard
+_dispatcher_instance = None
+
+
+def get_outbound_dispatcher() -> OutboundDispatcher:
+    """
+    Get the global OutboundDispatcher instance.
+
+    Returns:
+        OutboundDispatcher: The global outbound dispatcher
+    """
+    global _dispatcher_instance
+    if _dispatcher_instance is None:
+        _dispatcher_instance = OutboundDispatcher(
+            Config.OUTBOUND_GLOBAL_RATE,
+            Config.OUTBOUND_CHAT_RATE,
+            Config.OUTBOUND_GROUP_RATE,
+            Config.OUTBOUND_CHAT_BURST,
+        )
+    return _dispatcher_instance
+
+
+def reset_outbound_dispatcher() -> None:
+    """
+    Reset the global OutboundDispatcher instance.
+    Primarily used for testing purposes.
+    """
+    global _dispatcher_instance
+    _dispatcher_instance = None
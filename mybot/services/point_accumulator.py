@@ -0,0 +1,379 @@
+"""
+Write-behind accumulator for high-frequency point awards.
+
+Message and reaction awards are worth 1 and 0.5 points and arrive on every
+update, so writing a transaction and a ledger row for each one dominates the
+database load during traffic spikes. When ``POINTS_WRITE_BEHIND`` is enabled
+the accumulator keeps per-user deltas in memory and flushes them every
+``POINTS_FLUSH_INTERVAL_MS`` or every ``POINTS_FLUSH_MAX_EVENTS`` awards with a
+single UPDATE per table and one aggregated ledger row per user and source.
+
+Cooldowns are evaluated against in-memory timestamps that are seeded from
+``UserStats`` the first time a user is seen, so the 30 s / 5 s windows stay
+exactly the same as in the synchronous path.
+"""
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+from aiogram import Bot
+from sqlalchemy import case, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from database.models import User, UserStats
+from database.transaction_models import PointTransaction
+from database.unit_of_work import unit_of_work
+from services.leaderboard import stage_points_update
+from services.outbound_dispatcher import notify_after_commit
+from utils.config import Config
+
+logger = logging.getLogger(__name__)
+
+MESSAGE_POINTS = 1
+REACTION_POINTS = 0.5
+MESSAGE_COOLDOWN_SECONDS = 30
+REACTION_COOLDOWN_SECONDS = 5
+
+
+@dataclass
+class _Activity:
+    """Last award timestamps known for a user."""
+    last_activity_at: Optional[datetime] = None
+    last_reaction_at: Optional[datetime] = None
+
+
+@dataclass
+class _PendingDelta:
+    """Points and counters not yet written to the database."""
+    points: float = 0.0
+    by_source: Dict[str, Tuple[float, int]] = field(default_factory=dict)
+    messages_sent: int = 0
+    last_activity_at: Optional[datetime] = None
+    last_reaction_at: Optional[datetime] = None
+
+    def add(self, points: float, source: str, now: datetime) -> None:
+        self.points += points
+        amount, count = self.by_source.get(source, (0.0, 0))
+        self.by_source[source] = (amount + points, count + 1)
+        self.last_activity_at = now
+
+    def merge(self, other: "_PendingDelta") -> None:
+        self.points += other.points
+        for source, (amount, count) in other.by_source.items():
+            current_amount, current_count = self.by_source.get(source, (0.0, 0))
+            self.by_source[source] = (current_amount + amount, current_count + count)
+        self.messages_sent += other.messages_sent
+        self.last_activity_at = _latest(self.last_activity_at, other.last_activity_at)
+        self.last_reaction_at = _latest(self.last_reaction_at, other.last_reaction_at)
+
+
+def _latest(a: Optional[datetime], b: Optional[datetime]) -> Optional[datetime]:
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return max(a, b)
+
+
+def _latest_per_user(column, values: Dict[int, Optional[datetime]]):
+    """SQL expression that only moves a timestamp column forward, per user."""
+    values = {uid: when for uid, when in values.items() if when is not None}
+    if not values:
+        return column
+    return case(
+        *[
+            (UserStats.user_id == uid, case((column.is_(None), when), (column < when, when), else_=column))
+            for uid, when in values.items()
+        ],
+        else_=column,
+    )
+
+
+class PointAccumulator:
+    """Aggregates message/reaction awards in memory and writes them in batches."""
+
+    def __init__(self, flush_interval_ms: int = 1000, max_events: int = 500):
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_events = max_events
+        self._pending: Dict[int, _PendingDelta] = {}
+        self._activity: Dict[int, _Activity] = {}
+        self._pending_events = 0
+        self._flush_lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._session_factory: Optional[async_sessionmaker[AsyncSession]] = None
+        self._bot: Optional[Bot] = None
+        self.stats = {"events": 0, "flushes": 0, "rows_written": 0, "failed_flushes": 0}
+
+    @property
+    def enabled(self) -> bool:
+        """True once the flush loop is running and awards can be deferred."""
+        return self._session_factory is not None
+
+    async def _get_activity(self, session: AsyncSession, user_id: int) -> _Activity:
+        activity = self._activity.get(user_id)
+        if activity is None:
+            # Si aún no hay UserStats, la fila la crea el propio flush
+            stats = await session.get(UserStats, user_id)
+            if stats is None:
+                activity = _Activity()
+            else:
+                activity = _Activity(stats.last_activity_at, stats.last_reaction_at)
+            self._activity[user_id] = activity
+        return activity
+
+    def note_activity(self, user_id: int, when: datetime) -> None:
+        """Record an award written through the synchronous path."""
+        activity = self._activity.get(user_id)
+        if activity is not None:
+            activity.last_activity_at = _latest(activity.last_activity_at, when)
+
+    def _record(self, user_id: int, points: float, source: str, now: datetime) -> _PendingDelta:
+        pending = self._pending.setdefault(user_id, _PendingDelta())
+        pending.add(points, source, now)
+        self._pending_events += 1
+        self.stats["events"] += 1
+        if self._pending_events >= self.max_events:
+            self._wakeup.set()
+        return pending
+
+    async def award_message(self, session: AsyncSession, user_id: int) -> bool:
+        """Queue a message award. Returns False if the user is still in cooldown."""
+        activity = await self._get_activity(session, user_id)
+        now = datetime.utcnow()
+        if activity.last_activity_at and (now - activity.last_activity_at).total_seconds() < MESSAGE_COOLDOWN_SECONDS:
+            return False
+        activity.last_activity_at = now
+        pending = self._record(user_id, MESSAGE_POINTS, "message", now)
+        pending.messages_sent += 1
+        return True
+
+    async def award_reaction(self, session: AsyncSession, user_id: int) -> bool:
+        """Queue a reaction award. Returns False if the user is still in cooldown."""
+        activity = await self._get_activity(session, user_id)
+        now = datetime.utcnow()
+        if activity.last_reaction_at and (now - activity.last_reaction_at).total_seconds() < REACTION_COOLDOWN_SECONDS:
+            return False
+        activity.last_reaction_at = now
+        activity.last_activity_at = now
+        pending = self._record(user_id, REACTION_POINTS, "reaction", now)
+        pending.last_reaction_at = now
+        return True
+
+    def pending_points(self, user_id: int) -> float:
+        """Points awarded to ``user_id`` that are not yet in the database."""
+        pending = self._pending.get(user_id)
+        return pending.points if pending else 0.0
+
+    async def run(self, bot: Bot, session_factory: async_sessionmaker[AsyncSession]) -> None:
+        """Flush loop, started through ``BackgroundTaskManager``."""
+        self._bot = bot
+        self._session_factory = session_factory
+        logger.info(
+            f"Point accumulator started (interval={self.flush_interval}s, max_events={self.max_events})"
+        )
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Error flushing accumulated points: {e}", exc_info=True)
+
+    async def shutdown(self) -> None:
+        """Write whatever is still pending and stop deferring awards."""
+        try:
+            await self.flush()
+        finally:
+            self._session_factory = None
+
+    async def flush(self) -> int:
+        """Write pending deltas to the database. Returns the number of users flushed."""
+        async with self._flush_lock:
+            if not self._pending or self._session_factory is None:
+                return 0
+            batch, self._pending = self._pending, {}
+            self._pending_events = 0
+            try:
+                balances = await self._write_batch(batch)
+            except BaseException:
+                # Nada se pierde: se reintenta en el siguiente ciclo
+                for user_id, delta in batch.items():
+                    self._pending.setdefault(user_id, _PendingDelta()).merge(delta)
+                self._pending_events += sum(
+                    count for delta in batch.values() for _, count in delta.by_source.values()
+                )
+                self.stats["failed_flushes"] += 1
+                raise
+            self.stats["flushes"] += 1
+            self._prune_activity()
+        await self._run_progress_checks(batch, balances)
+        return len(batch)
+
+    async def _write_batch(self, batch: Dict[int, _PendingDelta]) -> Dict[int, float]:
+        user_ids = list(batch)
+        async with self._session_factory() as session:
+            async with unit_of_work(session):
+                result = await session.execute(
+                    update(User)
+                    .where(User.id.in_(user_ids))
+                    .values(points=User.points + case(
+                        {uid: batch[uid].points for uid in user_ids}, value=User.id, else_=0
+                    ))
+                    .returning(User.id, User.points)
+                    .execution_options(synchronize_session=False)
+                )
+                balances = {row.id: row.points for row in result}
+                for uid in user_ids:
+                    if uid not in balances:
+                        logger.warning(f"Accumulated points for non-existent user {uid}. Creating new user.")
+                        session.add(User(id=uid, points=batch[uid].points))
+                        balances[uid] = batch[uid].points
+                for uid, balance in balances.items():
+                    stage_points_update(session, uid, balance)
+
+                existing = set((await session.execute(
+                    select(UserStats.user_id).where(UserStats.user_id.in_(user_ids))
+                )).scalars())
+                for uid in user_ids:
+                    if uid not in existing:
+                        session.add(UserStats(user_id=uid, messages_sent=0))
+                await session.flush()
+
+                messages = {uid: d.messages_sent for uid, d in batch.items() if d.messages_sent}
+                await session.execute(
+                    update(UserStats)
+                    .where(UserStats.user_id.in_(user_ids))
+                    .values(
+                        messages_sent=UserStats.messages_sent + case(
+                            messages, value=UserStats.user_id, else_=0
+                        ) if messages else UserStats.messages_sent,
+                        last_activity_at=_latest_per_user(
+                            UserStats.last_activity_at,
+                            {uid: d.last_activity_at for uid, d in batch.items()},
+                        ),
+                        last_reaction_at=_latest_per_user(
+                            UserStats.last_reaction_at,
+                            {uid: d.last_reaction_at for uid, d in batch.items()},
+                        ),
+                    )
+                    .execution_options(synchronize_session=False)
+                )
+
+                rows = []
+                for uid, delta in batch.items():
+                    balance_after = balances[uid] - delta.points
+                    for source, (amount, count) in delta.by_source.items():
+                        balance_after += amount
+                        rows.append({
+                            "user_id": uid,
+                            "amount": amount,
+                            "balance_after": balance_after,
+                            "source": source,
+                            "description": f"Aggregated {count} {source} awards",
+                            "created_at": delta.last_activity_at or datetime.utcnow(),
+                        })
+                await session.execute(insert(PointTransaction), rows)
+        self.stats["rows_written"] += len(rows)
+        return balances
+
+    def _prune_activity(self) -> None:
+        """Forget users whose cooldowns expired; they are re-read from UserStats."""
+        now = datetime.utcnow()
+        stale = [
+            uid for uid, activity in self._activity.items()
+            if uid not in self._pending
+            and (activity.last_activity_at is None
+                 or (now - activity.last_activity_at).total_seconds() >= MESSAGE_COOLDOWN_SECONDS)
+            and (activity.last_reaction_at is None
+                 or (now - activity.last_reaction_at).total_seconds() >= REACTION_COOLDOWN_SECONDS)
+        ]
+        for uid in stale:
+            del self._activity[uid]
+
+    async def _run_progress_checks(self, batch: Dict[int, _PendingDelta], balances: Dict[int, float]) -> None:
+        """Level-ups and badges for the users whose balance just changed."""
+        from services.achievement_service import AchievementService
+        from services.level_service import LevelService
+
+        bot = self._bot
+        # Una sola consulta por lote decide quién necesita comprobaciones
+        async with self._session_factory() as session:
+            level_service = LevelService(session)
+            rows = (await session.execute(
+                select(User.id, User.level, UserStats.messages_sent)
+                .outerjoin(UserStats, UserStats.user_id == User.id)
+                .where(User.id.in_(list(batch)))
+            )).all()
+            candidates = []
+            for uid, level, messages_sent in rows:
+                delta = batch[uid]
+                balance = balances.get(uid)
+                levels_up = (
+                    balance is None
+                    or (await level_service.get_level_for_points(balance)).level_id != level
+                )
+                if levels_up or (delta.messages_sent and messages_sent is not None):
+                    candidates.append(uid)
+
+        # Una sesión por usuario: el rollback de uno no expira los objetos de los demás
+        for uid in candidates:
+            try:
+                async with self._session_factory() as session:
+                    achievement_service = AchievementService(session)
+                    async with unit_of_work(session):
+                        user = await session.get(User, uid)
+                        await LevelService(session).check_for_level_up(user, bot=bot)
+                        # Las reacciones sólo suman puntos; las insignias dependen del contador de mensajes
+                        new_badges = []
+                        stats = await session.get(UserStats, uid)
+                        if batch[uid].messages_sent and stats is not None:
+                            await achievement_service.check_message_achievements(
+                                uid, stats.messages_sent, bot=bot
+                            )
+                            new_badges = await achievement_service.check_user_badges(uid, ["messages"])
+                        for badge in new_badges:
+                            if await achievement_service.award_badge(uid, badge.id) and bot:
+                                await notify_after_commit(
+                                    session,
+                                    bot,
+                                    uid,
+                                    f"🏅 Has obtenido la insignia {badge.icon or ''} {badge.name}!",
+                                )
+            except Exception as e:
+                logger.error(f"Error checking progress for user {uid} after flush: {e}")
+        for uid, delta in batch.items():
+            logger.debug(f"User {uid} gained {delta.points} accumulated points. Total: {balances.get(uid)}")
+
+
+# Global accumulator instance, same singleton pattern as the event bus
+_point_accumulator_instance = None
+
+
+def get_point_accumulator() -> PointAccumulator:
+    """
+    Get the global PointAccumulator instance.
+
+    Returns:
+        PointAccumulator: The global accumulator
+    """
+    global _point_accumulator_instance
+    if _point_accumulator_instance is None:
+        _point_accumulator_instance = PointAccumulator(
+            flush_interval_ms=Config.POINTS_FLUSH_INTERVAL_MS,
+            max_events=Config.POINTS_FLUSH_MAX_EVENTS,
+        )
+    return _point_accumulator_instance
+
+
+def reset_point_accumulator() -> None:
+    """
+    Reset the global PointAccumulator instance.
+    Primarily used for testing purposes.
+    """
+    global _point_accumulator_instance
+    _point_accumulator_instance = None
@@ -1,15 +1,20 @@
 from typing import List, Optional, Tuple, Any, Dict
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, update, func, or_, and_
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.orm.util import identity_key
 from database.models import User, UserStats
 from database.transaction_models import PointTransaction
+from database.unit_of_work import in_unit_of_work
 from utils.user_roles import get_points_multiplier
 from aiogram import Bot
 from services.interfaces import IPointService, INotificationService
 from services.level_service import LevelService
 from services.achievement_service import AchievementService
 from services.event_service import EventService
-import datetime
+from services.point_accumulator import get_point_accumulator
+from services.leaderboard import get_leaderboard, stage_points_update
+from services.outbound_dispatcher import notify_after_commit
 import logging
 from datetime import datetime
 
@@ -72,21 +77,28 @@ class PointService(IPointService):
         Returns:
             Optional[UserStats]: Progreso actualizado o None si no se otorgaron puntos
         """
+        accumulator = get_point_accumulator()
+        if accumulator.enabled:
+            # Write-behind: el punto se escribe en el siguiente flush por lotes
+            await accumulator.award_message(self.session, user_id)
+            return None
+
         progress = await self._get_or_create_progress(user_id)
-        now = datetime.datetime.utcnow()
+        now = datetime.utcnow()
         if progress.last_activity_at and (now - progress.last_activity_at).total_seconds() < 30:
             return None
         
         # Omitir notificación ya que la información se enviará a través del sistema unificado
-        progress = await self.add_points(user_id, 1, bot=bot, skip_notification=True)
+        progress = await self.add_points(user_id, 1, bot=bot, skip_notification=True, source="message")
         progress.messages_sent += 1
         
         # Solo hacer commit si no estamos en una transacción externa
         if not self.session.in_transaction():
             await self.session.commit()
         
-        new_badges = await self.achievement_service.check_message_achievements(user_id, progress.messages_sent, bot=bot)
-        new_badges.extend(await self.achievement_service.check_user_badges(user_id))
+        await self.achievement_service.check_message_achievements(user_id, progress.messages_sent, bot=bot)
+        # Sólo cambió el contador de mensajes: basta con evaluar sus insignias
+        new_badges = await self.achievement_service.check_user_badges(user_id, ["messages"])
         
         # Usar el sistema unificado de notificaciones para las insignias si está disponible
         for badge in new_badges:
@@ -108,7 +120,9 @@ class PointService(IPointService):
                 except Exception as e:
                     # Fallback al método anterior
                     logger.error(f"Error sending badge notification: {e}")
-                    await bot.send_message(
+                    await notify_after_commit(
+                        self.session,
+                        bot,
                         user_id,
                         f"🏅 Has obtenido la insignia {badge.icon or ''} {badge.name}!",
                     )
@@ -127,9 +141,15 @@ class PointService(IPointService):
         Returns:
             Optional[UserStats]: Progreso actualizado o None si no se otorgaron puntos
         """
+        accumulator = get_point_accumulator()
+        if accumulator.enabled:
+            # Write-behind: el punto se escribe en el siguiente flush por lotes
+            await accumulator.award_reaction(self.session, user.id)
+            return None
+
         # First check if we already processed this reaction
         progress = await self._get_or_create_progress(user.id)
-        now = datetime.datetime.utcnow()
+        now = datetime.utcnow()
         
         if progress.last_reaction_at and (now - progress.last_reaction_at).total_seconds() < 5:
             return None  # Skip if same reaction within 5 seconds
@@ -141,35 +161,7 @@ class PointService(IPointService):
             await self.session.commit()
         
         # Only then award points - Omitir notificación para usar sistema unificado
-        progress = await self.add_points(user.id, 0.5, bot=bot, skip_notification=True)
-        
-        new_badges = await self.achievement_service.check_user_badges(user.id)
-        
-        # Usar el sistema unificado de notificaciones para las insignias si está disponible
-        for badge in new_badges:
-            await self.achievement_service.award_badge(user.id, badge.id)
-            if bot and self.notification_service:
-                try:
-                    await self.notification_service.add_notification(
-                        user.id,
-                        "badge",
-                        {
-                            "name": badge.name,
-                            "icon": badge.icon or "🏅",
-                            "description": getattr(badge, 'description', '')
-                        },
-                        priority=2  # MEDIUM
-                    )
-                    
-                    logger.debug(f"Sent unified badge notification to user {user.id}")
-                except Exception as e:
-                    # Fallback al método anterior
-                    logger.error(f"Error sending badge notification: {e}")
-                    await bot.send_message(
-                        user.id,
-                        f"🏅 Has obtenido la insignia {badge.icon or ''} {badge.name}!",
-                    )
-        return progress
+        return await self.add_points(user.id, 0.5, bot=bot, skip_notification=True, source="reaction")
 
     async def award_poll(self, user_id: int, bot: Bot) -> UserStats:
         """
@@ -183,35 +175,7 @@ class PointService(IPointService):
             UserStats: Progreso actualizado
         """
         # Omitir notificación ya que la información se enviará a través del sistema unificado
-        progress = await self.add_points(user_id, 2, bot=bot, skip_notification=True)
-        
-        new_badges = await self.achievement_service.check_user_badges(user_id)
-        
-        # Usar el sistema unificado de notificaciones para las insignias si está disponible
-        for badge in new_badges:
-            await self.achievement_service.award_badge(user_id, badge.id)
-            if bot and self.notification_service:
-                try:
-                    await self.notification_service.add_notification(
-                        user_id,
-                        "badge",
-                        {
-                            "name": badge.name,
-                            "icon": badge.icon or "🏅",
-                            "description": getattr(badge, 'description', '')
-                        },
-                        priority=2  # MEDIUM
-                    )
-                    
-                    logger.debug(f"Sent unified badge notification to user {user_id}")
-                except Exception as e:
-                    # Fallback al método anterior
-                    logger.error(f"Error sending badge notification: {e}")
-                    await bot.send_message(
-                        user_id,
-                        f"🏅 Has obtenido la insignia {badge.icon or ''} {badge.name}!",
-                    )
-        return progress
+        return await self.add_points(user_id, 2, bot=bot, skip_notification=True)
 
     async def daily_checkin(self, user_id: int, bot: Bot) -> Tuple[bool, UserStats]:
         """
@@ -225,7 +189,7 @@ class PointService(IPointService):
             Tuple[bool, UserStats]: (Éxito, Progreso actualizado)
         """
         progress = await self._get_or_create_progress(user_id)
-        now = datetime.datetime.utcnow()
+        now = datetime.utcnow()
         if progress.last_checkin_at and (now - progress.last_checkin_at).total_seconds() < 86400:
             return False, progress
             
@@ -260,7 +224,8 @@ class PointService(IPointService):
                 logger.error(f"Error sending checkin notification: {e}")
         
         await self.achievement_service.check_checkin_achievements(user_id, progress.checkin_streak, bot=bot)
-        new_badges = await self.achievement_service.check_user_badges(user_id)
+        # Sólo cambió la racha de check-in: basta con evaluar sus insignias
+        new_badges = await self.achievement_service.check_user_badges(user_id, ["login_streak"])
         
         # Usar el sistema unificado de notificaciones para las insignias
         for badge in new_badges:
@@ -282,7 +247,9 @@ class PointService(IPointService):
                 except Exception as e:
                     # Fallback al método anterior
                     logger.error(f"Error sending badge notification: {e}")
-                    await bot.send_message(
+                    await notify_after_commit(
+                        self.session,
+                        bot,
                         user_id,
                         f"🏅 Has obtenido la insignia {badge.icon or ''} {badge.name}!",
                     )
@@ -304,7 +271,7 @@ class PointService(IPointService):
             UserStats: Progreso actualizado
         """
         # Verificar si ya hay una transacción activa en la sesión
-        in_transaction = self.session.in_transaction()
+        in_transaction = self.session.in_transaction() or in_unit_of_work(self.session)
         
         # Solo iniciar una nueva transacción si no hay una activa
         if not in_transaction:
@@ -317,17 +284,18 @@ class PointService(IPointService):
     async def _add_points_internal(self, user_id: int, points: float, bot: Optional[Bot], 
                                skip_notification: bool, source: str) -> UserStats:
         """Implementación interna de add_points sin manejo de transacciones"""
-        user = await self.session.get(User, user_id)
-        if not user:
+        # Incremento atómico en SQL: no se pierden actualizaciones concurrentes
+        applied = await self._apply_points_delta(user_id, points)
+        if applied is None:
             logger.warning(
                 f"Attempted to add points to non-existent user {user_id}. Creating new user."
             )
-            user = User(id=user_id, points=0)
+            user = User(id=user_id, points=points)
             self.session.add(user)
-        
-        # Calcular nuevo balance
-        old_balance = user.points
-        new_balance = old_balance + points
+            new_balance, level = points, user.level
+            stage_points_update(self.session, user_id, new_balance)
+        else:
+            new_balance, level = applied
         
         # Crear registro de transacción
         transaction = PointTransaction(
@@ -339,12 +307,10 @@ class PointService(IPointService):
         )
         self.session.add(transaction)
         
-        # Actualizar usuario
-        user.points = new_balance
-        
         # Actualizar progreso
         progress = await self._get_or_create_progress(user_id)
         progress.last_activity_at = datetime.utcnow()
+        get_point_accumulator().note_activity(user_id, progress.last_activity_at)
         
         # Commit solo si no estamos dentro de una transacción externa
         is_transaction_owner = not self.session.in_transaction()
@@ -352,21 +318,15 @@ class PointService(IPointService):
             await self.session.commit()
             # Solo hacemos refresh si somos dueños de la transacción y acabamos de hacer commit
             await self.session.refresh(progress)
-            await self.session.refresh(user)
             
-        # Fuera de la transacción para evitar deadlock
-        await self.level_service.check_for_level_up(user, bot=bot)
+        # Fuera de la transacción para evitar deadlock; el usuario sólo se carga si sube de nivel
+        if (await self.level_service.get_level_for_points(new_balance)).level_id != level:
+            user = await self.session.get(User, user_id)
+            await self.level_service.check_for_level_up(user, bot=bot)
 
-        new_badges = await self.achievement_service.check_user_badges(user_id)
-        for badge in new_badges:
-            await self.achievement_service.award_badge(user_id, badge.id)
-            if bot:
-                await bot.send_message(
-                    user_id,
-                    f"🏅 Has obtenido la insignia {badge.icon or ''} {badge.name}!",
-                )
+        # Ninguna insignia depende del saldo: quien cambia una estadística evalúa sus tipos
         logger.info(
-            f"User {user_id} gained {points} points. Total: {user.points}"
+            f"User {user_id} gained {points} points. Total: {new_balance}"
         )
         
         # Solo enviar notificaciones de puntos cuando:
@@ -381,7 +341,7 @@ class PointService(IPointService):
         notification_needed = False
         if last_notified is None:
             notification_needed = True
-        elif user.points - last_notified >= 5:
+        elif new_balance - last_notified >= 5:
             notification_needed = True
             
         if not skip_notification and bot and notification_needed:
@@ -392,7 +352,7 @@ class PointService(IPointService):
                         "points",
                         {
                             "points": points,
-                            "total": user.points
+                            "total": new_balance
                         },
                         priority=3  # LOW
                     )
@@ -401,29 +361,33 @@ class PointService(IPointService):
                 except Exception as e:
                     # Fallback al método anterior
                     logger.error(f"Error sending points notification: {e}")
-                    await bot.send_message(
+                    await notify_after_commit(
+                        self.session,
+                        bot,
                         user_id,
-                        f"Has acumulado {user.points:.1f} puntos en total",
+                        f"Has acumulado {new_balance:.1f} puntos en total",
                     )
             else:
                 # Fallback sin sistema de notificaciones
-                await bot.send_message(
+                await notify_after_commit(
+                    self.session,
+                    bot,
                     user_id,
-                    f"Has acumulado {user.points:.1f} puntos en total",
+                    f"Has acumulado {new_balance:.1f} puntos en total",
                 )
             
             # Añadir dinámicamente el atributo si no existe
             if not hasattr(progress, "last_notified_points"):
-                progress.last_notified_points = user.points
+                progress.last_notified_points = new_balance
             else:
-                progress.last_notified_points = user.points
+                progress.last_notified_points = new_balance
             
             # Solo hacer commit si no estamos en una transacción externa
             if not self.session.in_transaction():
                 await self.session.commit()
         return progress
 
-    async def deduct_points(self, user_id: int, points: int) -> Optional[User]:
+    async def deduct_points(self, user_id: int, points: int) -> Optional[float]:
         """
         Resta puntos a un usuario.
         
@@ -432,10 +396,11 @@ class PointService(IPointService):
             points (int): Cantidad de puntos a restar
             
         Returns:
-            Optional[User]: Usuario actualizado o None si no se pudieron restar los puntos
+            Optional[float]: Nuevo saldo o None si no se pudieron restar los puntos.
+            Un saldo de 0.0 también es falso: compruebe el resultado con ``is None``.
         """
         # Verificar si ya hay una transacción activa en la sesión
-        in_transaction = self.session.in_transaction()
+        in_transaction = self.session.in_transaction() or in_unit_of_work(self.session)
         
         # Solo iniciar una nueva transacción si no hay una activa
         if not in_transaction:
@@ -445,13 +410,12 @@ class PointService(IPointService):
             # Si ya hay una transacción activa, ejecutar sin iniciar una nueva
             return await self._deduct_points_internal(user_id, points)
     
-    async def _deduct_points_internal(self, user_id: int, points: int) -> Optional[User]:
+    async def _deduct_points_internal(self, user_id: int, points: int) -> Optional[float]:
         """Implementación interna de deduct_points sin manejo de transacciones"""
-        user = await self.session.get(User, user_id)
-        if user and user.points >= points:
-            # Calcular nuevo balance
-            old_balance = user.points
-            new_balance = old_balance - points
+        # El guard points >= cost evita saldos negativos sin bloquear la fila
+        applied = await self._apply_points_delta(user_id, -points, min_balance=points)
+        if applied is not None:
+            new_balance, _ = applied
             
             # Crear registro de transacción
             transaction = PointTransaction(
@@ -463,22 +427,62 @@ class PointService(IPointService):
             )
             self.session.add(transaction)
             
-            # Actualizar usuario
-            user.points = new_balance
-            
             # Commit solo si no estamos dentro de una transacción externa
             is_transaction_owner = not self.session.in_transaction()
             if is_transaction_owner:
                 await self.session.commit()
-                # Solo hacemos refresh si somos dueños de la transacción y acabamos de hacer commit
-                await self.session.refresh(user)
                 
-            logger.info(f"User {user_id} lost {points} points. Total: {user.points}")
-            return user
+            logger.info(f"User {user_id} lost {points} points. Total: {new_balance}")
+            return new_balance
             
         logger.warning(f"Failed to deduct {points} points from user {user_id}. Not enough points or user not found.")
         return None
 
+    async def _apply_points_delta(self, user_id: int, delta: float,
+                                  *, min_balance: Optional[float] = None) -> Optional[Tuple[float, int]]:
+        """
+        Aplica ``points = points + delta`` en la base de datos y devuelve el nuevo saldo y el nivel.
+        
+        Args:
+            user_id (int): ID del usuario
+            delta (float): Puntos a sumar (negativo para restar)
+            min_balance (Optional[float]): Saldo mínimo requerido antes de aplicar el cambio
+            
+        Returns:
+            Optional[Tuple[float, int]]: Nuevo saldo y nivel actual, o None si el usuario
+            no existe o no cumple el mínimo
+        """
+        stmt = (
+            update(User)
+            .where(User.id == user_id)
+            .values(points=User.points + delta)
+            .execution_options(synchronize_session=False)
+        )
+        if min_balance is not None:
+            stmt = stmt.where(User.points >= min_balance)
+
+        if self.session.get_bind().dialect.update_returning:
+            row = (await self.session.execute(stmt.returning(User.points, User.level))).one_or_none()
+        else:
+            # Sin RETURNING: la fila ya quedó bloqueada por el UPDATE
+            result = await self.session.execute(stmt)
+            if result.rowcount == 0:
+                return None
+            row = (await self.session.execute(
+                select(User.points, User.level).where(User.id == user_id)
+            )).one()
+
+        if row is None:
+            return None
+        new_balance, level = row
+        stage_points_update(self.session, user_id, new_balance)
+
+        # Sincronizar la instancia en memoria sin otra consulta
+        cached_user = self.session.identity_map.get(identity_key(User, user_id))
+        if cached_user is not None:
+            set_committed_value(cached_user, "points", new_balance)
+        return new_balance, level
+
     async def get_balance(self, user_id: int) -> float:
         """
         Obtiene el balance de puntos de un usuario.
@@ -492,7 +496,8 @@ class PointService(IPointService):
         # Opción 1: Desde User.points (rápido)
         # Opción 2: Desde último PointTransaction (auditable)
         user = await self.session.get(User, user_id)
-        return user.points if user else 0
+        pending = get_point_accumulator().pending_points(user_id)
+        return (user.points if user else 0) + pending
 
     async def get_transaction_history(self, user_id: int) -> List[PointTransaction]:
         """
@@ -521,7 +526,8 @@ class PointService(IPointService):
             int: Puntos del usuario
         """
         user = await self.session.get(User, user_id)
-        return user.points if user else 0
+        pending = get_point_accumulator().pending_points(user_id)
+        return (user.points if user else 0) + pending
 
     async def get_top_users(self, limit: int = 10) -> List[User]:
         """
@@ -533,7 +539,79 @@ class PointService(IPointService):
         Returns:
             List[User]: Lista de usuarios
         """
-        stmt = select(User).order_by(User.points.desc()).limit(limit)
+        leaderboard = get_leaderboard()
+        if leaderboard.loaded:
+            user_ids = [user_id for user_id, _ in leaderboard.top(limit)]
+            if not user_ids:
+                return []
+            result = await self.session.execute(select(User).where(User.id.in_(user_ids)))
+            users = {user.id: user for user in result.scalars()}
+            return [users[user_id] for user_id in user_ids if user_id in users]
+
+        stmt = select(User).order_by(User.points.desc(), User.id).limit(limit)
         result = await self.session.execute(stmt)
         top_users = result.scalars().all()
-        return top_users
\ No newline at end of file
+        return top_users
+
+    async def get_user_rank(self, user_id: int) -> Optional[int]:
+        """
+        Obtiene la posición de un usuario en el ranking de puntos.
+        
+        Args:
+            user_id (int): ID del usuario
+            
+        Returns:
+            Optional[int]: Posición (1 = primero) o None si el usuario no existe
+        """
+        leaderboard = get_leaderboard()
+        if leaderboard.loaded:
+            return leaderboard.rank_of(user_id)
+
+        user = await self.session.get(User, user_id)
+        if not user:
+            return None
+        points = user.points or 0
+        stmt = select(func.count()).select_from(User).where(
+            or_(
+                User.points > points,
+                and_(User.points == points, User.id < user_id),
+            )
+        )
+        return (await self.session.execute(stmt)).scalar() + 1
+
+    async def get_user_neighbours(self, user_id: int, radius: int = 2) -> List[Tuple[int, User]]:
+        """
+        Obtiene los usuarios que rodean a un usuario en el ranking.
+        
+        Args:
+            user_id (int): ID del usuario
+            radius (int): Número de posiciones por encima y por debajo
+            
+        Returns:
+            List[Tuple[int, User]]: Pares (posición, usuario), incluido el propio usuario
+        """
+        leaderboard = get_leaderboard()
+        if leaderboard.loaded:
+            entries = leaderboard.neighbours(user_id, radius)
+        else:
+            rank = await self.get_user_rank(user_id)
+            if rank is None:
+                return []
+            start = max(rank - 1 - radius, 0)
+            stmt = (
+                select(User.id)
+                .order_by(User.points.desc(), User.id)
+                .offset(start)
+                .limit(rank + radius - start)
+            )
+            entries = [
+                (start + i + 1, uid, None)
+                for i, uid in enumerate((await self.session.execute(stmt)).scalars())
+            ]
+        if not entries:
+            return []
+        result = await self.session.execute(
+            select(User).where(User.id.in_([uid for _, uid, _ in entries]))
+        )
+        users = {user.id: user for user in result.scalars()}
+        return [(rank, users[uid]) for rank, uid, _ in entries if uid in users]
\ No newline at end of file
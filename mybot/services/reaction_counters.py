@@ -0,0 +1,181 @@
+"""
+Rolling window counters for the weekly reaction ranking.
+
+Each user gets a ring of hourly buckets stored in a compact ``array`` that
+covers the ranking window (168 hours by default). Buckets are recycled as
+hours pass, so expired reactions drop out without rescanning
+``button_reactions``. Window totals are indexed in a :class:`Leaderboard` so
+the top users are read in O(log n) no matter how many reactions there are.
+
+Only reactions handled by this process are recorded live, so with several
+replicas the counters are rebuilt every ``REACTION_COUNTERS_RESEED_INTERVAL``
+seconds to include the others. The rebuild reads per-user hourly counts
+aggregated by the database, not the reaction rows themselves.
+"""
+import asyncio
+import calendar
+import logging
+from array import array
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from database.models import ButtonReaction
+from services.leaderboard import Leaderboard
+
+logger = logging.getLogger(__name__)
+
+WEEK_HOURS = 7 * 24
+
+
+def _hour_of(when: datetime) -> int:
+    """Hours since the epoch; naive datetimes are taken as UTC."""
+    return calendar.timegm(when.utctimetuple()) // 3600
+
+
+def _hour_bucket(dialect_name: str):
+    """``created_at`` truncated to the hour in SQL."""
+    if dialect_name == "postgresql":
+        return func.date_trunc("hour", ButtonReaction.created_at)
+    # SQLite no tiene date_trunc: la hora se agrupa como texto ISO
+    return func.strftime("%Y-%m-%d %H:00:00", ButtonReaction.created_at)
+
+
+class ReactionCounterStore:
+    """Per-user hourly reaction counts over a rolling window."""
+
+    def __init__(self, window_hours: int = WEEK_HOURS):
+        self.window_hours = window_hours
+        self._clear()
+        self.loaded = False
+
+    def _clear(self) -> None:
+        self._buckets: Dict[int, array] = {}
+        self._totals: Dict[int, int] = {}
+        # Usuarios con reacciones en cada franja, para expirarlas sin recorrerlos todos
+        self._slot_users: List[Set[int]] = [set() for _ in range(self.window_hours)]
+        self._ranking = Leaderboard()
+        self._current_hour: Optional[int] = None
+
+    def _advance(self, hour: int) -> None:
+        """Expire the buckets that fell out of the window before ``hour``."""
+        if self._current_hour is None:
+            self._current_hour = hour
+            return
+        if hour <= self._current_hour:
+            return
+        expired = min(hour - self._current_hour, self.window_hours)
+        for step in range(1, expired + 1):
+            slot = (self._current_hour + step) % self.window_hours
+            for user_id in self._slot_users[slot]:
+                buckets = self._buckets[user_id]
+                total = self._totals[user_id] - buckets[slot]
+                buckets[slot] = 0
+                if total:
+                    self._totals[user_id] = total
+                    self._ranking.update(user_id, total)
+                else:
+                    del self._totals[user_id]
+                    del self._buckets[user_id]
+                    self._ranking.remove(user_id)
+            self._slot_users[slot] = set()
+        self._current_hour = hour
+
+    def record(self, user_id: int, when: Optional[datetime] = None, count: int = 1) -> None:
+        """Add ``count`` reactions by ``user_id`` at ``when`` (default: now)."""
+        hour = _hour_of(when or datetime.utcnow())
+        self._advance(hour)
+        if hour <= self._current_hour - self.window_hours:
+            return
+        slot = hour % self.window_hours
+        buckets = self._buckets.get(user_id)
+        if buckets is None:
+            buckets = self._buckets[user_id] = array("I", bytes(4 * self.window_hours))
+        buckets[slot] += count
+        self._slot_users[slot].add(user_id)
+        total = self._totals.get(user_id, 0) + count
+        self._totals[user_id] = total
+        self._ranking.update(user_id, total)
+
+    def count(self, user_id: int, now: Optional[datetime] = None) -> int:
+        self._advance(_hour_of(now or datetime.utcnow()))
+        return self._totals.get(user_id, 0)
+
+    def top(self, limit: int = 3, now: Optional[datetime] = None) -> List[Tuple[int, int]]:
+        """``(user_id, count)`` for the users with most reactions in the window."""
+        self._advance(_hour_of(now or datetime.utcnow()))
+        return [(user_id, int(total)) for user_id, total in self._ranking.top(limit)]
+
+    async def seed(self, session_factory: async_sessionmaker[AsyncSession]) -> None:
+        """Rebuild the counters from the reactions stored in the window.
+
+        The database returns one ``(user_id, hour, count)`` row per user and
+        hour, so the cost follows the active users, not the reactions. The
+        new counts are built aside and swapped in at the end, so the ranking
+        is still served meanwhile. Reactions recorded here during the query
+        may be missed or counted twice until the next reseed.
+        """
+        now = datetime.utcnow()
+        since = now - timedelta(hours=self.window_hours)
+        fresh = ReactionCounterStore(self.window_hours)
+        fresh._advance(_hour_of(now))
+        rows = 0
+        async with session_factory() as session:
+            hour = _hour_bucket(session.get_bind().dialect.name).label("hour")
+            result = await session.stream(
+                select(ButtonReaction.user_id, hour, func.count())
+                .where(ButtonReaction.created_at >= since)
+                .group_by(ButtonReaction.user_id, hour)
+                .execution_options(yield_per=5000)
+            )
+            async for user_id, bucket, count in result:
+                if isinstance(bucket, str):
+                    bucket = datetime.fromisoformat(bucket)
+                fresh.record(user_id, bucket, count)
+                rows += count
+        self._buckets = fresh._buckets
+        self._totals = fresh._totals
+        self._slot_users = fresh._slot_users
+        self._ranking = fresh._ranking
+        self._current_hour = fresh._current_hour
+        self.loaded = True
+        logger.debug(f"Reaction counters seeded with {rows} reactions from {len(self._totals)} users")
+
+    async def run_reseeder(self, session_factory: async_sessionmaker[AsyncSession], interval: int) -> None:
+        """Seed the counters and rebuild them every ``interval`` seconds."""
+        if not self.loaded:
+            await self.seed(session_factory)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.seed(session_factory)
+            except Exception as e:
+                logger.error(f"Error reseeding reaction counters: {e}", exc_info=True)
+
+
+# Global counter store, same singleton pattern as the event bus
+_reaction_counters_instance = None
+
+
+def get_reaction_counters() -> ReactionCounterStore:
+    """
+    Get the global ReactionCounterStore instance.
+
+    Returns:
+        ReactionCounterStore: The global counter store
+    """
+    global _reaction_counters_instance
+    if _reaction_counters_instance is None:
+        _reaction_counters_instance = ReactionCounterStore()
+    return _reaction_counters_instance
+
+
+def reset_reaction_counters() -> None:
+    """
+    Reset the global ReactionCounterStore instance.
+    Primarily used for testing purposes.
+    """
+    global _reaction_counters_instance
+    _reaction_counters_instance = None
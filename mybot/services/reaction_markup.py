@@ -0,0 +1,216 @@
+"""
+Debounced reaction-counter keyboards for interactive posts.
+
+Counts per post are kept in memory: they are read from ``button_reactions``
+once per message (:meth:`ReactionMarkupUpdater.seed`) and then incremented by
+``MessageService.register_reaction``. Instead of editing the keyboard on
+every reaction, :meth:`ReactionMarkupUpdater.schedule` applies at most one
+edit per post every ``REACTION_MARKUP_WINDOW`` seconds with the latest counts,
+and skips it when they match what the keyboard already shows.
+"""
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramAPIError, TelegramBadRequest, TelegramRetryAfter
+
+from keyboards.inline_post_kb import get_reaction_kb
+from services.outbound_dispatcher import Priority, outbound_priority
+from utils.config import Config
+
+logger = logging.getLogger(__name__)
+
+# (reacciones configuradas, conteos por tipo, id de reacción más alto incluido)
+SeedLoader = Callable[[], Awaitable[Tuple[List[str], Dict[str, int], int]]]
+
+
+@dataclass
+class _PostState:
+    chat_id: int
+    reactions: List[str]
+    counts: Dict[str, int]
+    seed_max_id: int
+    rendered: Optional[Dict[str, int]] = None
+    last_edit: float = 0.0
+    handle: Optional[asyncio.TimerHandle] = field(default=None, repr=False)
+
+
+class ReactionMarkupUpdater:
+    """Per-post reaction counters with at most one keyboard edit per window."""
+
+    def __init__(self, window: float, max_messages: int = 2000):
+        self.window = window
+        self.max_messages = max_messages
+        self._posts: "OrderedDict[int, _PostState]" = OrderedDict()
+        # Reacciones registradas mientras se cargan los conteos de su mensaje
+        self._seeding: Dict[int, Tuple[asyncio.Future, List[Tuple[str, int]]]] = {}
+        self._tasks: set = set()
+        self.scheduled = 0
+        self.edits = 0
+        self.skipped = 0
+        self.failed = 0
+
+    def is_seeded(self, message_id: int) -> bool:
+        return message_id in self._posts
+
+    def counts(self, message_id: int) -> Optional[Dict[str, int]]:
+        state = self._posts.get(message_id)
+        return dict(state.counts) if state else None
+
+    async def seed(self, message_id: int, chat_id: int, loader: SeedLoader) -> None:
+        """Load the counts of ``message_id`` unless they are cached already."""
+        if message_id in self._posts:
+            return
+        pending = self._seeding.get(message_id)
+        if pending is not None:
+            await asyncio.shield(pending[0])
+            return
+        future = asyncio.get_running_loop().create_future()
+        early: List[Tuple[str, int]] = []
+        self._seeding[message_id] = (future, early)
+        try:
+            reactions, counts, max_id = await loader()
+            for reaction_type, reaction_id in early:
+                # La consulta pudo no ver las reacciones guardadas mientras se ejecutaba
+                if reaction_id > max_id:
+                    counts[reaction_type] = counts.get(reaction_type, 0) + 1
+            self._posts[message_id] = _PostState(chat_id, list(reactions), dict(counts), max_id)
+            if len(self._posts) > self.max_messages:
+                _, evicted = self._posts.popitem(last=False)
+                if evicted.handle is not None:
+                    evicted.handle.cancel()
+        finally:
+            del self._seeding[message_id]
+            future.set_result(None)
+
+    def record(self, message_id: int, reaction_type: str, reaction_id: int) -> None:
+        """Count a reaction just stored in ``button_reactions``."""
+        state = self._posts.get(message_id)
+        if state is not None:
+            if reaction_id > state.seed_max_id:
+                state.counts[reaction_type] = state.counts.get(reaction_type, 0) + 1
+            self._posts.move_to_end(message_id)
+            return
+        pending = self._seeding.get(message_id)
+        if pending is not None:
+            pending[1].append((reaction_type, reaction_id))
+        # Sin conteos en memoria: la próxima carga desde la BD ya incluye la reacción
+
+    def schedule(self, bot: Bot, message_id: int) -> None:
+        """Edit the keyboard of ``message_id`` now or when its window ends."""
+        state = self._posts.get(message_id)
+        if state is None or state.handle is not None:
+            return
+        self.scheduled += 1
+        loop = asyncio.get_running_loop()
+        delay = max(0.0, state.last_edit + self.window - time.monotonic())
+        state.handle = loop.call_later(delay, self._start_flush, bot, message_id)
+
+    def _start_flush(self, bot: Bot, message_id: int) -> None:
+        task = asyncio.create_task(self._flush(bot, message_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _flush(self, bot: Bot, message_id: int) -> None:
+        state = self._posts.get(message_id)
+        if state is None:
+            return
+        state.handle = None
+        if state.counts == state.rendered:
+            self.skipped += 1
+            return
+        counts = dict(state.counts)
+        state.last_edit = time.monotonic()
+        try:
+            markup = get_reaction_kb(
+                reactions=state.reactions,
+                current_counts=counts,
+                message_id=message_id,
+                channel_id=state.chat_id,
+            )
+            with outbound_priority(Priority.NOTIFICATION):
+                await bot.edit_message_reply_markup(
+                    chat_id=state.chat_id,
+                    message_id=message_id,
+                    reply_markup=markup,
+                )
+            state.rendered = counts
+            self.edits += 1
+        except TelegramRetryAfter as e:
+            self.failed += 1
+            state.last_edit = time.monotonic() + e.retry_after - self.window
+            self.schedule(bot, message_id)
+        except TelegramBadRequest as e:
+            if "message is not modified" in str(e).lower():
+                state.rendered = counts
+                self.skipped += 1
+                return
+            self.failed += 1
+            logger.error(
+                f"Failed to update reaction markup for chat {state.chat_id}, message {message_id}: {e}"
+            )
+            if "not found" in str(e).lower():
+                # Post borrado: se olvidan sus conteos en lugar de reintentar cada ventana
+                self._posts.pop(message_id, None)
+            return
+        except TelegramAPIError as e:
+            self.failed += 1
+            logger.error(
+                f"Unexpected API error updating reaction markup for chat {state.chat_id}, message {message_id}: {e}"
+            )
+            return
+        # Llegaron reacciones durante la edición: otra al terminar la ventana
+        if state.counts != state.rendered and state.rendered is not None:
+            self.schedule(bot, message_id)
+
+    async def shutdown(self) -> None:
+        """Cancel scheduled edits and wait for the ones in flight."""
+        for state in self._posts.values():
+            if state.handle is not None:
+                state.handle.cancel()
+                state.handle = None
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def get_metrics(self) -> Dict[str, int]:
+        """Return cached posts and scheduled, applied, skipped and failed edits."""
+        return {
+            "posts": len(self._posts),
+            "scheduled": self.scheduled,
+            "edits": self.edits,
+            "skipped": self.skipped,
+            "failed": self.failed,
+        }
+
+
+# Global updater instance, same singleton pattern as the leaderboard
+_updater_instance = None
+
+
+def get_reaction_markup_updater() -> ReactionMarkupUpdater:
+    """
+    Get the global ReactionMarkupUpdater instance.
+
+    Returns:
+        ReactionMarkupUpdater: The global reaction markup updater
+    """
+    global _updater_instance
+    if _updater_instance is None:
+        _updater_instance = ReactionMarkupUpdater(
+            Config.REACTION_MARKUP_WINDOW,
+            Config.REACTION_MARKUP_MAX_MESSAGES,
+        )
+    return _updater_instance
+
+
+def reset_reaction_markup_updater() -> None:
+    """
+    Reset the global ReactionMarkupUpdater instance.
+    Primarily used for testing purposes.
+    """
+    global _updater_instance
+    _updater_instance = None
@@ -26,6 +26,7 @@ from ..user_service import UserService
 from ..diana_menu_system import get_diana_menu_system
 from utils.handler_decorators import safe_handler
 from utils.message_safety import safe_send_message
+from utils.config import Config
 
 logger = logging.getLogger(__name__)
 
@@ -115,8 +116,6 @@ class CrossModuleRewards:
             "cross_module_bonus": "Diana está especialmente impresionada por tu dedicación..."
         }
         
-        # Initialize event subscribers
-        self._setup_event_subscriptions()
     
     async def initialize_reward_system(self) -> Dict[str, Any]:
         """
@@ -395,26 +394,25 @@ class CrossModuleRewards:
     # ==================== EVENT SYSTEM INTEGRATION ====================
     
     async def _setup_event_subscriptions(self) -> Dict[str, int]:
-        """Set up event subscriptions for cross-module communication."""
+        """Set up event subscriptions for cross-module communication.
+
+        Handlers run on a fresh session per dispatch, not on the session of
+        this instance, and are subscribed only once per process.
+        """
         try:
-            subscriptions_count = 0
-            
-            # Narrative events
-            self.event_bus.subscribe(EventType.NARRATIVE_PROGRESS, self._handle_narrative_progress_event)
-            self.event_bus.subscribe(EventType.NARRATIVE_DECISION, self._handle_narrative_decision_event)
-            subscriptions_count += 2
-            
-            # Gamification events  
-            self.event_bus.subscribe(EventType.ACHIEVEMENT_UNLOCKED, self._handle_achievement_unlock_event)
-            self.event_bus.subscribe(EventType.LEVEL_UP, self._handle_level_up_event)
-            self.event_bus.subscribe(EventType.POINTS_AWARDED, self._handle_points_awarded_event)
-            subscriptions_count += 3
-            
-            # Channel engagement events
-            self.event_bus.subscribe(EventType.CHANNEL_ENGAGEMENT, self._handle_channel_engagement_event)
-            self.event_bus.subscribe(EventType.USER_REACTION, self._handle_user_reaction_event)
-            self.event_bus.subscribe(EventType.USER_DAILY_CHECKIN, self._handle_daily_checkin_event)
-            subscriptions_count += 3
+            subscriptions = self.event_bus.get_scoped_subscriptions(SUBSCRIPTION_OWNER)
+            if subscriptions:
+                return {"total_subscriptions": len(subscriptions)}
+            
+            for event_type, name in _EVENT_HANDLERS.items():
+                self.event_bus.subscribe_scoped(
+                    event_type,
+                    _session_handler(name),
+                    batch_size=Config.EVENT_HANDLER_BATCH_SIZE,
+                    batch_window=Config.EVENT_HANDLER_BATCH_WINDOW,
+                    owner=SUBSCRIPTION_OWNER,
+                )
+            subscriptions_count = len(_EVENT_HANDLERS)
             
             logger.info(f"Set up {subscriptions_count} event subscriptions for cross-module rewards")
             return {"total_subscriptions": subscriptions_count}
@@ -430,10 +428,8 @@ class CrossModuleRewards:
             fragment_key = event.data.get("fragment_key")
             
             if fragment_key:
-                # Process narrative milestone in background
-                asyncio.create_task(
-                    self.process_narrative_milestone(user_id, fragment_key)
-                )
+                # Awaited: the dispatch session is closed once the handler returns
+                await self.process_narrative_milestone(user_id, fragment_key)
             
         except Exception as e:
             logger.exception(f"Error handling narrative progress event: {e}")
@@ -445,10 +441,7 @@ class CrossModuleRewards:
             achievement_id = event.data.get("achievement_id")
             
             if achievement_id:
-                # Process achievement unlock in background
-                asyncio.create_task(
-                    self.process_achievement_unlock(user_id, achievement_id)
-                )
+                await self.process_achievement_unlock(user_id, achievement_id)
             
         except Exception as e:
             logger.exception(f"Error handling achievement unlock event: {e}")
@@ -460,10 +453,7 @@ class CrossModuleRewards:
             engagement_type = event.data.get("action_type", "general")
             engagement_data = event.data
             
-            # Process engagement milestone in background
-            asyncio.create_task(
-                self.process_engagement_milestone(user_id, engagement_type, engagement_data)
-            )
+            await self.process_engagement_milestone(user_id, engagement_type, engagement_data)
             
         except Exception as e:
             logger.exception(f"Error handling channel engagement event: {e}")
@@ -742,6 +732,30 @@ class CrossModuleRewards:
 
 # ==================== GLOBAL INSTANCE MANAGEMENT ====================
 
+# Nombre con el que se registran las suscripciones en el bus, una sola vez por proceso
+SUBSCRIPTION_OWNER = "cross_module_rewards"
+
+_EVENT_HANDLERS = {
+    # Narrative events
+    EventType.NARRATIVE_PROGRESS: "_handle_narrative_progress_event",
+    # Gamification events
+    EventType.ACHIEVEMENT_UNLOCKED: "_handle_achievement_unlock_event",
+    EventType.LEVEL_UP: "_handle_level_up_event",
+    EventType.POINTS_AWARDED: "_handle_points_awarded_event",
+    # Channel engagement events
+    EventType.CHANNEL_ENGAGEMENT: "_handle_channel_engagement_event",
+    EventType.USER_REACTION: "_handle_user_reaction_event",
+    EventType.USER_DAILY_CHECKIN: "_handle_daily_checkin_event",
+}
+
+
+def _session_handler(name: str):
+    async def handler(session: AsyncSession, event: Event) -> None:
+        await getattr(CrossModuleRewards(session), name)(event)
+
+    handler.__qualname__ = f"CrossModuleRewards.{name}"
+    return handler
+
 # Global cross-module rewards instance
 _cross_module_rewards_instance = None
 
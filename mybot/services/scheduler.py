@@ -6,11 +6,18 @@ from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncSession
 from sqlalchemy import select
 
 from database.models import PendingChannelRequest, BotConfig, User
-from utils.config import CHANNEL_SCHEDULER_INTERVAL, VIP_SCHEDULER_INTERVAL
+from utils.config import VIP_SCHEDULER_INTERVAL, Config
 from services.config_service import ConfigService
 from services.auction_service import AuctionService
+from services.auction_clock import get_auction_clock
+from services.broadcast_service import get_broadcast_engine
 from services.free_channel_service import FreeChannelService
-from services.subscription_service import SubscriptionService
+from services.job_scheduler import JobScheduler, JobSpec, build_job_scheduler
+from services.join_request_pipeline import get_join_request_pipeline
+from services.notification_outbox import get_outbox_drainer
+from services.vip_expiry import get_vip_expiry_queue
+from services.vip_membership import verify_membership_sample
+from utils.user_roles import clear_role_cache
 
 
 async def run_channel_request_check(bot: Bot, session_factory: async_sessionmaker[AsyncSession]):
@@ -24,18 +31,10 @@ async def run_channel_request_check(bot: Bot, session_factory: async_sessionmake
 
 
 async def channel_request_scheduler(bot: Bot, session_factory: async_sessionmaker[AsyncSession]):
-    """Background task processing channel join requests."""
+    """Background task approving channel join requests when their wait time ends."""
     logging.info("Channel request scheduler started")
-    interval = CHANNEL_SCHEDULER_INTERVAL
     try:
-        while True:
-            await run_channel_request_check(bot, session_factory)
-            async with session_factory() as session:
-                config_service = ConfigService(session)
-                value = await config_service.get_value("channel_scheduler_interval")
-                if value and value.isdigit():
-                    interval = int(value)
-            await asyncio.sleep(interval)
+        await get_join_request_pipeline().run(bot, session_factory)
     except asyncio.CancelledError:
         logging.info("Channel request scheduler cancelled")
         raise
@@ -44,7 +43,10 @@ async def channel_request_scheduler(bot: Bot, session_factory: async_sessionmake
 
 
 async def run_vip_subscription_check(bot: Bot, session_factory: async_sessionmaker[AsyncSession]):
-    """Check VIP expirations and send reminders once."""
+    """Check VIP expirations and send reminders once with a full scan.
+
+    Used by the admin panel; the background task relies on the expiry queue.
+    """
     async with session_factory() as session:
         now = datetime.utcnow()
         remind_threshold = now + timedelta(hours=24)
@@ -91,48 +93,39 @@ async def run_vip_subscription_check(bot: Bot, session_factory: async_sessionmak
             await bot.send_message(user.id, farewell_msg)
             logging.info("VIP expired for %s", user.id)
         await session.commit()
+        for user in expired_users:
+            clear_role_cache(user.id)
 
 
 async def run_vip_membership_check(bot: Bot, session_factory: async_sessionmaker[AsyncSession]):
-    """Ensure users in the VIP channel have the correct role."""
+    """Verify a rotating sample of non-VIP users against the VIP channel.
+
+    Joins are tracked from ``ChatMemberUpdated`` updates; this pass only
+    catches what those updates missed (e.g. while the bot was offline).
+    """
     async with session_factory() as session:
         vip_channel_id = await ConfigService(session).get_vip_channel_id()
         if not vip_channel_id:
             return
-        stmt = select(User).where(User.role != "vip")
-        result = await session.execute(stmt)
-        users = result.scalars().all()
-        updated = 0
-        for user in users:
-            try:
-                member = await bot.get_chat_member(vip_channel_id, user.id)
-                if member.status in {"member", "administrator", "creator"}:
-                    user.role = "vip"
-                    sub_service = SubscriptionService(session)
-                    sub = await sub_service.get_subscription(user.id)
-                    if not sub:
-                        await sub_service.create_subscription(user.id, None)
-                    updated += 1
-            except Exception:
-                continue
-        if updated:
-            await session.commit()
-            logging.info("Synced %s users to VIP role via channel", updated)
+        stats = await verify_membership_sample(
+            bot,
+            session,
+            vip_channel_id,
+            sample_size=Config.VIP_MEMBERSHIP_SAMPLE_SIZE,
+            concurrency=Config.VIP_MEMBERSHIP_CONCURRENCY,
+            max_retries=Config.VIP_MEMBERSHIP_MAX_RETRIES,
+        )
+        logging.info(
+            "VIP membership check: %s sampled, %s promoted, %s API calls, %s flood waits",
+            stats["sampled"], stats["promoted"], stats["api_calls"], stats["flood_waits"],
+        )
 
 
 async def vip_subscription_scheduler(bot: Bot, session_factory: async_sessionmaker[AsyncSession]):
-    """Background task checking VIP subscriptions."""
+    """Background task firing VIP reminders and expirations at their due time."""
     logging.info("VIP subscription scheduler started")
-    interval = VIP_SCHEDULER_INTERVAL
     try:
-        while True:
-            await run_vip_subscription_check(bot, session_factory)
-            async with session_factory() as session:
-                config_service = ConfigService(session)
-                value = await config_service.get_value("vip_scheduler_interval")
-                if value and value.isdigit():
-                    interval = int(value)
-            await asyncio.sleep(interval)
+        await get_vip_expiry_queue().run(bot, session_factory)
     except asyncio.CancelledError:
         logging.info("VIP subscription scheduler cancelled")
         raise
@@ -140,26 +133,6 @@ async def vip_subscription_scheduler(bot: Bot, session_factory: async_sessionmak
         logging.exception("Unhandled error in VIP subscription scheduler")
 
 
-async def vip_membership_scheduler(bot: Bot, session_factory: async_sessionmaker[AsyncSession]):
-    """Background task syncing VIP roles based on channel membership."""
-    logging.info("VIP membership scheduler started")
-    interval = VIP_SCHEDULER_INTERVAL
-    try:
-        while True:
-            await run_vip_membership_check(bot, session_factory)
-            async with session_factory() as session:
-                config_service = ConfigService(session)
-                value = await config_service.get_value("vip_scheduler_interval")
-                if value and value.isdigit():
-                    interval = int(value)
-            await asyncio.sleep(interval)
-    except asyncio.CancelledError:
-        logging.info("VIP membership scheduler cancelled")
-        raise
-    except Exception:
-        logging.exception("Unhandled error in VIP membership scheduler")
-
-
 async def run_auction_monitor_check(bot: Bot, session_factory: async_sessionmaker[AsyncSession]):
     """Check for expired auctions and end them automatically."""
     async with session_factory() as session:
@@ -173,13 +146,10 @@ async def run_auction_monitor_check(bot: Bot, session_factory: async_sessionmake
 
 
 async def auction_monitor_scheduler(bot: Bot, session_factory: async_sessionmaker[AsyncSession]):
-    """Background task monitoring auction expirations."""
+    """Background task closing each auction at its exact deadline."""
     logging.info("Auction monitor scheduler started")
-    interval = 60  # Check every minute for auction expirations
     try:
-        while True:
-            await run_auction_monitor_check(bot, session_factory)
-            await asyncio.sleep(interval)
+        await get_auction_clock().run(bot, session_factory)
     except asyncio.CancelledError:
         logging.info("Auction monitor scheduler cancelled")
         raise
@@ -199,16 +169,51 @@ async def run_free_channel_cleanup(bot: Bot, session_factory: async_sessionmaker
             logging.exception("Error in free channel cleanup: %s", e)
 
 
-async def free_channel_cleanup_scheduler(bot: Bot, session_factory: async_sessionmaker[AsyncSession]):
-    """Background task for cleaning up old channel requests."""
-    logging.info("Free channel cleanup scheduler started")
-    interval = 86400  # Run once per day
+async def notification_outbox_scheduler(bot: Bot, session_factory: async_sessionmaker[AsyncSession]):
+    """Background task sending the notifications stored in the outbox."""
+    logging.info("Notification outbox drainer started")
+    try:
+        await get_outbox_drainer().run(bot, session_factory)
+    except asyncio.CancelledError:
+        logging.info("Notification outbox drainer cancelled")
+        raise
+    except Exception:
+        logging.exception("Unhandled error in notification outbox drainer")
+
+
+async def broadcast_scheduler(bot: Bot, session_factory: async_sessionmaker[AsyncSession]):
+    """Background task sending admin broadcasts, resuming them after a restart."""
+    logging.info("Broadcast engine started")
     try:
-        while True:
-            await run_free_channel_cleanup(bot, session_factory)
-            await asyncio.sleep(interval)
+        await get_broadcast_engine().run(bot, session_factory)
     except asyncio.CancelledError:
-        logging.info("Free channel cleanup scheduler cancelled")
+        logging.info("Broadcast engine cancelled")
         raise
     except Exception:
-        logging.exception("Unhandled error in free channel cleanup scheduler")
+        logging.exception("Unhandled error in broadcast engine")
+
+
+# Trabajos periódicos del bot; los de ``interval=None`` se ejecutan de forma continua
+SCHEDULED_JOBS = [
+    JobSpec("channel_requests", channel_request_scheduler),
+    JobSpec("vip_subscriptions", vip_subscription_scheduler),
+    JobSpec(
+        "vip_memberships",
+        run_vip_membership_check,
+        interval=VIP_SCHEDULER_INTERVAL,
+        interval_key="vip_scheduler_interval",
+    ),
+    JobSpec("auction_monitor", auction_monitor_scheduler),
+    JobSpec("channel_cleanup", run_free_channel_cleanup, interval=86400),
+    JobSpec("broadcasts", broadcast_scheduler),
+]
+if Config.NOTIFICATION_OUTBOX:
+    # Los reclamos por filas permiten drenar desde todas las réplicas a la vez
+    SCHEDULED_JOBS.append(
+        JobSpec("notification_outbox", notification_outbox_scheduler, leader_only=False)
+    )
+
+
+def create_job_scheduler(bot: Bot, session_factory: async_sessionmaker[AsyncSession]) -> JobScheduler:
+    """Return the scheduler running every job in ``SCHEDULED_JOBS``."""
+    return build_job_scheduler(bot, session_factory, SCHEDULED_JOBS)
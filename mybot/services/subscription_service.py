@@ -9,6 +9,8 @@ from services.config_service import ConfigService
 
 from database.models import VipSubscription, User
 from database.transaction_models import VipTransaction
+from services.vip_expiry import get_vip_expiry_queue
+from utils.user_roles import clear_role_cache
 import logging
 
 logger = logging.getLogger(__name__)
@@ -35,6 +37,7 @@ class SubscriptionService:
         self.session.add(sub)
         await self.session.commit()
         await self.session.refresh(sub)
+        clear_role_cache(user_id)
         logger.info(f"Created VIP subscription for user {user_id}, expires: {expires_at}")
         return sub
 
@@ -103,8 +106,11 @@ class SubscriptionService:
             else:
                 user.vip_expires_at = new_exp
             user.last_reminder_sent_at = None
+        new_deadline = user.vip_expires_at if user else sub.expires_at
 
         await self.session.commit()
+        clear_role_cache(user_id)
+        get_vip_expiry_queue().schedule(user_id, new_deadline)
         logger.info(f"Extended VIP subscription for user {user_id} by {days} days")
         return sub
 
@@ -131,6 +137,8 @@ class SubscriptionService:
                     logger.exception("Failed to remove %s from VIP channel: %s", user_id, e)
 
         await self.session.commit()
+        clear_role_cache(user_id)
+        get_vip_expiry_queue().unschedule(user_id)
         logger.info(f"Revoked VIP subscription for user {user_id}")
 
     async def set_subscription_expiration(
@@ -154,7 +162,11 @@ class SubscriptionService:
                 user.role = "free"
                 user.vip_expires_at = expires_at
 
+        is_vip = user is not None and user.role == "vip"
+
         await self.session.commit()
+        clear_role_cache(user_id)
+        get_vip_expiry_queue().schedule(user_id, expires_at if is_vip else None)
         logger.info(
             "Set VIP expiration for user %s to %s", user_id, expires_at
         )
@@ -205,6 +217,8 @@ class SubscriptionService:
         user.vip_expires_at = expires_at
         
         await self.session.commit()
+        clear_role_cache(user_id)
+        get_vip_expiry_queue().schedule(user_id, expires_at)
 
     async def _deactivate_previous_vip(self, user_id: int):
         """Desactivar transacciones VIP anteriores"""
@@ -63,6 +63,8 @@ class TokenService:
         await self.session.commit()
         ach_service = AchievementService(self.session)
         await ach_service.check_invite_achievements(obj.created_by, bot=bot)
+        # Las insignias de invitaciones dependen de los tokens usados de quien invitó
+        await ach_service.award_unlocked_badges(obj.created_by, ["invites"], bot=bot)
         return True
 
     async def create_subscription_token(self, plan_id: int, created_by: int) -> InviteToken:
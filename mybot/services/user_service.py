@@ -5,6 +5,7 @@ from typing import Dict, Any
 from sqlalchemy.ext.asyncio import AsyncSession
 from database.models import User
 from utils.text_utils import sanitize_text
+from utils.user_roles import clear_role_cache
 
 logger = logging.getLogger(__name__)
 
@@ -100,6 +101,7 @@ class UserService:
                 user.role = "admin"
             
             await self.session.commit()
+            clear_role_cache(user_id)
             
             return {
                 "success": True,
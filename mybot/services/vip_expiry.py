@@ -0,0 +1,273 @@
+"""
+Due-time queue for VIP reminders and expirations.
+
+Instead of scanning ``users`` every ``VIP_SCHEDULER_INTERVAL``, upcoming
+``vip_expires_at`` deadlines are kept in a min-heap. Each user has a reminder
+entry (``VIP_REMINDER_BEFORE_HOURS`` before the deadline) and an expiry entry.
+The runner sleeps until the earliest entry is due, then processes every due
+user with bounded concurrency and one session/commit per user.
+
+``SubscriptionService`` reschedules users when their expiration changes.
+The queue is leader-only under the ``vip_subscriptions`` lease, see
+:mod:`services.job_scheduler`. Entries are never removed from the heap: an entry whose deadline no longer
+matches the user's current one is simply skipped when it is popped.
+"""
+import asyncio
+import heapq
+import itertools
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from aiogram import Bot
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from database.models import User
+from services.config_service import ConfigService
+from utils.config import Config
+from utils.user_roles import clear_role_cache
+
+logger = logging.getLogger(__name__)
+
+REMINDER = "reminder"
+EXPIRY = "expiry"
+
+DEFAULT_REMINDER_MESSAGE = "Tu suscripción VIP expira pronto."
+DEFAULT_FAREWELL_MESSAGE = "Tu suscripción VIP ha expirado."
+
+Entry = Tuple[datetime, int, int, str, datetime]
+
+
+class VipExpiryQueue:
+    """Min-heap of ``(due_at, seq, user_id, kind, expires_at)`` entries."""
+
+    def __init__(self, remind_before: timedelta):
+        self.remind_before = remind_before
+        self._heap: List[Entry] = []
+        self._deadlines: Dict[int, datetime] = {}
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        self.loaded = False
+        self.running = False
+
+    def __len__(self) -> int:
+        return len(self._deadlines)
+
+    def schedule(self, user_id: int, expires_at: Optional[datetime]) -> None:
+        """Set the VIP deadline of ``user_id``; ``None`` removes it."""
+        if expires_at is None:
+            self.unschedule(user_id)
+            return
+        if not self.running or self._deadlines.get(user_id) == expires_at:
+            return
+        self._deadlines[user_id] = expires_at
+        heapq.heappush(
+            self._heap,
+            (expires_at - self.remind_before, next(self._seq), user_id, REMINDER, expires_at),
+        )
+        heapq.heappush(self._heap, (expires_at, next(self._seq), user_id, EXPIRY, expires_at))
+        self._wakeup.set()
+
+    def unschedule(self, user_id: int) -> None:
+        self._deadlines.pop(user_id, None)
+
+    def next_due(self) -> Optional[datetime]:
+        """Return the due time of the earliest live entry."""
+        self._drop_stale()
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now: datetime, limit: int) -> List[Tuple[int, str]]:
+        """Pop up to ``limit`` live entries due at ``now``."""
+        due: List[Tuple[int, str]] = []
+        while len(due) < limit:
+            self._drop_stale()
+            if not self._heap or self._heap[0][0] > now:
+                break
+            _, _, user_id, kind, expires_at = heapq.heappop(self._heap)
+            if kind == EXPIRY:
+                self._deadlines.pop(user_id, None)
+            elif expires_at <= now:
+                # Ya venció: la entrada de expiración se encarga
+                continue
+            due.append((user_id, kind))
+        return due
+
+    def _drop_stale(self) -> None:
+        while self._heap:
+            _, _, user_id, _, expires_at = self._heap[0]
+            if self._deadlines.get(user_id) == expires_at:
+                return
+            heapq.heappop(self._heap)
+
+    async def seed(self, session_factory: async_sessionmaker[AsyncSession]) -> None:
+        """Load every VIP deadline with one query on the ``vip_expires_at`` index."""
+        async with session_factory() as session:
+            rows = (
+                await session.execute(
+                    select(User.id, User.vip_expires_at).where(
+                        User.role == "vip", User.vip_expires_at.is_not(None)
+                    )
+                )
+            ).all()
+        deadlines = {user_id: expires_at for user_id, expires_at in rows}
+        for user_id in [uid for uid in self._deadlines if uid not in deadlines]:
+            self.unschedule(user_id)
+        for user_id, expires_at in deadlines.items():
+            self.schedule(user_id, expires_at)
+        self.loaded = True
+        logger.info(f"VIP expiry queue loaded with {len(self)} deadlines")
+
+    async def _sleep_until_due(self, max_wait: float) -> None:
+        next_due = self.next_due()
+        timeout = max_wait
+        if next_due is not None:
+            timeout = min(timeout, max(0.0, (next_due - datetime.utcnow()).total_seconds()))
+        self._wakeup.clear()
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def run(self, bot: Bot, session_factory: async_sessionmaker[AsyncSession]) -> None:
+        """Fire reminders and expirations as they become due.
+
+        The queue is reloaded every ``VIP_SCHEDULER_INTERVAL`` seconds to pick
+        up changes made outside ``SubscriptionService`` or on other replicas.
+        """
+        self.running = True
+        try:
+            await self._run(bot, session_factory)
+        finally:
+            self.running = False
+            self.loaded = False
+            self._heap.clear()
+            self._deadlines.clear()
+
+    async def _run(self, bot: Bot, session_factory: async_sessionmaker[AsyncSession]) -> None:
+        await self.seed(session_factory)
+        loop = asyncio.get_running_loop()
+        resync_at = loop.time() + Config.VIP_SCHEDULER_INTERVAL
+        while True:
+            await self._sleep_until_due(max(0.0, resync_at - loop.time()))
+            if loop.time() >= resync_at:
+                try:
+                    await self.seed(session_factory)
+                except Exception as e:
+                    logger.error(f"Error reloading VIP expiry queue: {e}", exc_info=True)
+                resync_at = loop.time() + Config.VIP_SCHEDULER_INTERVAL
+            due = self.pop_due(datetime.utcnow(), Config.VIP_EXPIRY_BATCH_SIZE)
+            if due:
+                await process_due(bot, session_factory, due)
+
+
+async def _send_reminder(
+    bot: Bot, session_factory: async_sessionmaker[AsyncSession], user_id: int, message: str
+) -> bool:
+    now = datetime.utcnow()
+    async with session_factory() as session:
+        user = await session.get(User, user_id)
+        if (
+            not user
+            or user.role != "vip"
+            or user.vip_expires_at is None
+            or user.vip_expires_at <= now
+            or (user.last_reminder_sent_at and user.last_reminder_sent_at > now - timedelta(hours=24))
+        ):
+            return False
+        try:
+            await bot.send_message(user_id, message)
+        except Exception as e:
+            logger.exception("Failed to send reminder to %s: %s", user_id, e)
+            return False
+        user.last_reminder_sent_at = now
+        await session.commit()
+    logger.info("Sent VIP expiry reminder to %s", user_id)
+    return True
+
+
+async def _expire_user(
+    bot: Bot,
+    session_factory: async_sessionmaker[AsyncSession],
+    user_id: int,
+    message: str,
+    vip_channel_id: Optional[int],
+) -> bool:
+    async with session_factory() as session:
+        user = await session.get(User, user_id)
+        if (
+            not user
+            or user.role != "vip"
+            or user.vip_expires_at is None
+            or user.vip_expires_at > datetime.utcnow()
+        ):
+            return False
+        if vip_channel_id:
+            try:
+                await bot.ban_chat_member(vip_channel_id, user_id)
+                await bot.unban_chat_member(vip_channel_id, user_id)
+            except Exception as e:
+                logger.exception("Failed to remove %s from VIP channel: %s", user_id, e)
+        user.role = "free"
+        await session.commit()
+    clear_role_cache(user_id)
+    try:
+        await bot.send_message(user_id, message)
+    except Exception as e:
+        logger.warning("Failed to send farewell to %s: %s", user_id, e)
+    logger.info("VIP expired for %s", user_id)
+    return True
+
+
+async def process_due(
+    bot: Bot,
+    session_factory: async_sessionmaker[AsyncSession],
+    due: List[Tuple[int, str]],
+) -> int:
+    """Handle a batch of due ``(user_id, kind)`` entries. Returns how many acted."""
+    async with session_factory() as session:
+        config_service = ConfigService(session)
+        reminder_msg = await config_service.get_value("vip_reminder_message") or DEFAULT_REMINDER_MESSAGE
+        farewell_msg = await config_service.get_value("vip_farewell_message") or DEFAULT_FAREWELL_MESSAGE
+        vip_channel_id = await config_service.get_vip_channel_id()
+
+    semaphore = asyncio.Semaphore(max(1, Config.VIP_EXPIRY_CONCURRENCY))
+
+    async def handle(user_id: int, kind: str) -> bool:
+        async with semaphore:
+            try:
+                if kind == REMINDER:
+                    return await _send_reminder(bot, session_factory, user_id, reminder_msg)
+                return await _expire_user(bot, session_factory, user_id, farewell_msg, vip_channel_id)
+            except Exception as e:
+                logger.error(f"Error processing VIP {kind} for user {user_id}: {e}", exc_info=True)
+                return False
+
+    results = await asyncio.gather(*(handle(user_id, kind) for user_id, kind in due))
+    return sum(results)
+
+
+# Global queue instance, same singleton pattern as the leaderboard
+_expiry_queue_instance = None
+
+
+def get_vip_expiry_queue() -> VipExpiryQueue:
+    """
+    Get the global VipExpiryQueue instance.
+
+    Returns:
+        VipExpiryQueue: The global expiry queue
+    """
+    global _expiry_queue_instance
+    if _expiry_queue_instance is None:
+        _expiry_queue_instance = VipExpiryQueue(timedelta(hours=Config.VIP_REMINDER_BEFORE_HOURS))
+    return _expiry_queue_instance
+
+
+def reset_vip_expiry_queue() -> None:
+    """
+    Reset the global VipExpiryQueue instance.
+    Primarily used for testing purposes.
+    """
+    global _expiry_queue_instance
+    _expiry_queue_instance = None
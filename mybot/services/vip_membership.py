@@ -0,0 +1,171 @@
+"""
+VIP channel membership tracker.
+
+Membership is learned from ``ChatMemberUpdated`` updates of the VIP channel and
+stored in ``channel_memberships``. The periodic job no longer calls
+``get_chat_member`` for every free user: it only verifies a bounded sample,
+oldest verification first, so the whole user base is covered over several
+runs without hitting Telegram flood limits.
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramRetryAfter
+from sqlalchemy import and_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.models import ChannelMembership, User
+from database.unit_of_work import commit_or_flush
+from services.subscription_service import SubscriptionService
+from utils.user_roles import clear_role_cache
+
+logger = logging.getLogger(__name__)
+
+MEMBER_STATUSES = {"member", "administrator", "creator"}
+# Estado guardado cuando Telegram no pudo devolver la membresía
+UNKNOWN_STATUS = "unknown"
+
+
+async def record_membership(
+    session: AsyncSession,
+    chat_id: int,
+    user_id: int,
+    status: str,
+    *,
+    verified: bool = False,
+) -> ChannelMembership:
+    """Store the last known ``status`` of ``user_id`` in ``chat_id``."""
+    membership = await session.get(ChannelMembership, (chat_id, user_id))
+    if membership is None:
+        membership = ChannelMembership(chat_id=chat_id, user_id=user_id, status=status)
+        session.add(membership)
+    else:
+        membership.status = status
+    if verified:
+        membership.verified_at = datetime.utcnow()
+    return membership
+
+
+async def promote_channel_member(session: AsyncSession, user_id: int) -> bool:
+    """Give the VIP role to a member of the VIP channel. Returns True if it changed."""
+    user = await session.get(User, user_id)
+    if user is None or user.role == "vip":
+        return False
+    user.role = "vip"
+    sub_service = SubscriptionService(session)
+    if not await sub_service.get_subscription(user_id):
+        await sub_service.create_subscription(user_id, None)
+    clear_role_cache(user_id)
+    return True
+
+
+async def track_member_update(
+    session: AsyncSession, chat_id: int, user_id: int, status: str
+) -> bool:
+    """Apply a ``ChatMemberUpdated`` of the VIP channel. Returns True if the user was promoted."""
+    await record_membership(session, chat_id, user_id, status)
+    promoted = False
+    if status in MEMBER_STATUSES:
+        promoted = await promote_channel_member(session, user_id)
+    await commit_or_flush(session)
+    if promoted:
+        logger.info("User %s promoted to VIP after joining the VIP channel", user_id)
+    return promoted
+
+
+async def select_verification_sample(
+    session: AsyncSession, chat_id: int, sample_size: int
+) -> List[int]:
+    """Return non-VIP user ids whose membership was verified longest ago."""
+    stmt = (
+        select(User.id)
+        .outerjoin(
+            ChannelMembership,
+            and_(ChannelMembership.user_id == User.id, ChannelMembership.chat_id == chat_id),
+        )
+        .where(User.role != "vip")
+        .order_by(ChannelMembership.verified_at.asc().nullsfirst(), User.id)
+        .limit(sample_size)
+    )
+    result = await session.execute(stmt)
+    return list(result.scalars().all())
+
+
+class _MembershipChecker:
+    """Run ``get_chat_member`` calls with a concurrency limit and shared flood waits."""
+
+    def __init__(self, bot: Bot, chat_id: int, concurrency: int, max_retries: int):
+        self.bot = bot
+        self.chat_id = chat_id
+        self.max_retries = max_retries
+        self._semaphore = asyncio.Semaphore(max(1, concurrency))
+        self._resume_at = 0.0
+        self.api_calls = 0
+        self.flood_waits = 0
+
+    async def _wait_flood(self) -> None:
+        delay = self._resume_at - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def status_of(self, user_id: int) -> Optional[str]:
+        """Return the member status, ``UNKNOWN_STATUS`` on errors or None if retries ran out."""
+        for _ in range(self.max_retries + 1):
+            await self._wait_flood()
+            async with self._semaphore:
+                await self._wait_flood()
+                self.api_calls += 1
+                try:
+                    member = await self.bot.get_chat_member(self.chat_id, user_id)
+                    return member.status
+                except TelegramRetryAfter as e:
+                    self.flood_waits += 1
+                    # Todas las llamadas esperan: el límite de Telegram es por bot
+                    self._resume_at = max(self._resume_at, time.monotonic() + e.retry_after)
+                    logger.warning("Flood wait of %ss checking VIP membership", e.retry_after)
+                except Exception as e:
+                    logger.debug("Could not check VIP membership of %s: %s", user_id, e)
+                    return UNKNOWN_STATUS
+        return None
+
+
+async def verify_membership_sample(
+    bot: Bot,
+    session: AsyncSession,
+    chat_id: int,
+    *,
+    sample_size: int,
+    concurrency: int,
+    max_retries: int,
+) -> Dict[str, int]:
+    """Verify a rotating sample of non-VIP users against the VIP channel.
+
+    Telegram calls run concurrently; the results are then written serially
+    with the given session. Returns counters including the API calls made.
+    """
+    user_ids = await select_verification_sample(session, chat_id, sample_size)
+    checker = _MembershipChecker(bot, chat_id, concurrency, max_retries)
+    statuses = await asyncio.gather(*(checker.status_of(user_id) for user_id in user_ids))
+
+    promoted = 0
+    verified = 0
+    for user_id, status in zip(user_ids, statuses):
+        if status is None:
+            continue
+        await record_membership(session, chat_id, user_id, status, verified=True)
+        verified += 1
+        if status in MEMBER_STATUSES and await promote_channel_member(session, user_id):
+            promoted += 1
+    await commit_or_flush(session)
+
+    return {
+        "sampled": len(user_ids),
+        "verified": verified,
+        "promoted": promoted,
+        "api_calls": checker.api_calls,
+        "flood_waits": checker.flood_waits,
+    }
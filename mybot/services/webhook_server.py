@@ -0,0 +1,225 @@
+"""
+Webhook serving mode on aiogram's aiohttp integration.
+
+:class:`QueuedRequestHandler` validates ``X-Telegram-Bot-Api-Secret-Token``,
+queues the raw update and answers 200 at once; ``WEBHOOK_MAX_CONCURRENCY``
+workers feed the queued updates to the dispatcher. Updates of the same user
+or chat are processed in arrival order: when a worker takes an update whose
+user or chat is already being handled, it parks it behind that one and moves
+on, and the worker handling the key drains its parked updates afterwards, so
+a burst from one chat never ties up more than one worker. With
+``WEBHOOK_QUEUE_SIZE`` updates queued, parked or in progress the request gets
+a 503 and Telegram delivers it again later, so an overload slows ingestion
+down instead of losing updates.
+
+:func:`run_webhook` registers the webhook with Telegram and serves it until
+SIGINT/SIGTERM. Polling remains the default (``WEBHOOK_MODE`` off).
+"""
+import asyncio
+import logging
+import secrets
+import signal
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from aiohttp import web
+
+from utils.config import Config
+
+logger = logging.getLogger(__name__)
+
+# Segundos que Telegram debe esperar antes de reenviar una actualización rechazada
+RETRY_AFTER = 5
+DRAIN_TIMEOUT = 30
+
+
+def update_key(update: Dict[str, Any]) -> Optional[Tuple[str, int]]:
+    """Return the user or chat whose updates must keep their order."""
+    for field, payload in update.items():
+        if field == "update_id" or not isinstance(payload, dict):
+            continue
+        for holder in (payload, payload.get("message")):
+            if not isinstance(holder, dict):
+                continue
+            for name in ("from", "user", "chat"):
+                entity = holder.get(name)
+                if isinstance(entity, dict) and "id" in entity:
+                    return name, entity["id"]
+    return None
+
+
+class QueuedRequestHandler(SimpleRequestHandler):
+    """Acknowledge webhook requests immediately and process them on a worker pool."""
+
+    def __init__(
+        self,
+        dispatcher: Dispatcher,
+        bot: Bot,
+        secret_token: Optional[str],
+        max_concurrency: int,
+        queue_size: int,
+        **data: Any,
+    ):
+        super().__init__(dispatcher, bot, handle_in_background=True, secret_token=secret_token, **data)
+        self.max_concurrency = max(1, max_concurrency)
+        self.queue_size = queue_size
+        self._queue: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue()
+        self._workers: list = []
+        # Usuarios/chats con una actualización en curso y las que esperan detrás, en orden
+        self._backlog: Dict[Tuple[str, int], Deque[Dict[str, Any]]] = {}
+        # Aceptadas y aún sin procesar: en cola, aparcadas o en curso
+        self._pending = 0
+        self._overloaded = False
+        self.received = 0
+        self.processed = 0
+        self.rejected = 0
+        self.unauthorized = 0
+        self.failed = 0
+
+    def verify_secret(self, telegram_secret_token: str, bot: Bot) -> bool:
+        if super().verify_secret(telegram_secret_token, bot):
+            return True
+        self.unauthorized += 1
+        return False
+
+    def start(self) -> None:
+        for number in range(self.max_concurrency):
+            self._workers.append(asyncio.create_task(self._run_worker(), name=f"webhook_worker_{number}"))
+
+    async def _handle_request_background(self, bot: Bot, request: web.Request) -> web.Response:
+        try:
+            update = await request.json(loads=bot.session.json_loads)
+        except ValueError:
+            return web.Response(status=400, text="Invalid JSON")
+        if self._pending >= self.queue_size:
+            self.rejected += 1
+            if not self._overloaded:
+                # Un aviso por episodio de sobrecarga, no uno por petición rechazada
+                self._overloaded = True
+                logger.warning(f"Webhook queue full ({self.queue_size}), answering 503 until it drains")
+            return web.Response(status=503, headers={"Retry-After": str(RETRY_AFTER)})
+        self._overloaded = False
+        self._pending += 1
+        self._queue.put_nowait(update)
+        self.received += 1
+        return web.json_response({}, dumps=bot.session.json_dumps)
+
+    async def _run_worker(self) -> None:
+        while True:
+            update = await self._queue.get()
+            key = update_key(update)
+            if key is None:
+                await self._process(update)
+                continue
+            backlog = self._backlog.get(key)
+            if backlog is not None:
+                # Otro worker está con este usuario/chat: se aparca detrás y se sigue con otra
+                backlog.append(update)
+                continue
+            backlog = self._backlog[key] = deque()
+            try:
+                await self._process(update)
+                while backlog:
+                    await self._process(backlog.popleft())
+            finally:
+                del self._backlog[key]
+
+    async def _process(self, update: Dict[str, Any]) -> None:
+        try:
+            await self._background_feed_update(self.bot, update)
+            self.processed += 1
+        except Exception as e:
+            self.failed += 1
+            logger.error(f"Error processing webhook update {update.get('update_id')}: {e}", exc_info=True)
+        finally:
+            self._pending -= 1
+            self._queue.task_done()
+
+    async def close(self) -> None:
+        """Process the queued updates and stop the workers.
+
+        The bot session is closed by ``bot.py`` after the other shutdown callbacks.
+        """
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=DRAIN_TIMEOUT)
+        except asyncio.TimeoutError:
+            logger.warning(f"Webhook shutdown with {self._pending} updates still pending")
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers.clear()
+
+    def get_metrics(self) -> Dict[str, int]:
+        """Return queue depth and received, processed, rejected, unauthorized and failed updates."""
+        return {
+            "queued": self._queue.qsize(),
+            "parked": sum(len(backlog) for backlog in self._backlog.values()),
+            "in_flight": len(self._backlog),
+            "received": self.received,
+            "processed": self.processed,
+            "rejected": self.rejected,
+            "unauthorized": self.unauthorized,
+            "failed": self.failed,
+        }
+
+
+def build_webhook_app(dp: Dispatcher, bot: Bot, secret_token: Optional[str]) -> Tuple[web.Application, QueuedRequestHandler]:
+    """Create the aiohttp application serving ``Config.WEBHOOK_PATH``."""
+    app = web.Application()
+    handler = QueuedRequestHandler(
+        dp,
+        bot,
+        secret_token=secret_token,
+        max_concurrency=Config.WEBHOOK_MAX_CONCURRENCY,
+        queue_size=Config.WEBHOOK_QUEUE_SIZE,
+    )
+    handler.register(app, path=Config.WEBHOOK_PATH)
+    setup_application(app, dp, bot=bot)
+    return app, handler
+
+
+async def run_webhook(dp: Dispatcher, bot: Bot) -> None:
+    """Serve updates through the webhook until SIGINT or SIGTERM."""
+    secret_token = Config.WEBHOOK_SECRET
+    if not secret_token:
+        # Válido sólo con una réplica: cada arranque registra un secreto distinto
+        secret_token = secrets.token_urlsafe(32)
+        logger.warning("WEBHOOK_SECRET is not set, using a random secret for this process")
+
+    app, handler = build_webhook_app(dp, bot, secret_token)
+    handler.start()
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, Config.WEBHOOK_HOST, Config.WEBHOOK_PORT)
+    await site.start()
+
+    if Config.WEBHOOK_BASE_URL:
+        url = Config.WEBHOOK_BASE_URL.rstrip("/") + Config.WEBHOOK_PATH
+        await bot.set_webhook(
+            url,
+            secret_token=secret_token,
+            allowed_updates=dp.resolve_used_update_types(),
+            max_connections=Config.WEBHOOK_MAX_CONNECTIONS,
+        )
+        logger.info(f"Webhook set to {url}")
+    else:
+        # Sin URL pública no se registra en Telegram: sólo recibe lo que envíe scripts/webhook_harness.py
+        logger.warning("WEBHOOK_BASE_URL is not set, the webhook is not registered with Telegram")
+    logger.info(f"Listening for updates on {Config.WEBHOOK_HOST}:{Config.WEBHOOK_PORT}{Config.WEBHOOK_PATH}")
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:
+            # Windows: KeyboardInterrupt cancela la tarea principal
+            pass
+    try:
+        await stop.wait()
+    finally:
+        logger.info(f"Stopping webhook server: {handler.get_metrics()}")
+        # Deja de aceptar peticiones y procesa las que ya estaban en cola
+        await runner.cleanup()
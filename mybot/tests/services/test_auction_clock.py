@@ -0,0 +1,91 @@
+"""
+Tests del AuctionClock: orden de los plazos, re-armado al extender una subasta,
+recarga periódica de las subastas activas desde la BD y réplicas que no
+tienen el lease.
+"""
+import asyncio
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from services.auction_clock import AuctionClock
+
+NOW = datetime(2026, 1, 1, 12, 0, 0)
+
+
+class FakeSessionFactory:
+    def __call__(self):
+        return self
+
+    async def __aenter__(self):
+        return MagicMock()
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+def auction_service(active):
+    """Patch AuctionService so ``seed`` sees ``active`` as the active auctions."""
+    service = MagicMock()
+    service.check_expired_auctions = AsyncMock(return_value=[])
+    service.get_active_auctions = AsyncMock(side_effect=lambda: list(active))
+    return patch("services.auction_service.AuctionService", return_value=service)
+
+
+def test_pop_due_returns_auctions_in_deadline_order():
+    clock = AuctionClock(resync_interval=30)
+    clock.running = True
+    clock.arm(2, NOW + timedelta(seconds=2))
+    clock.arm(1, NOW + timedelta(seconds=1))
+    clock.arm(3, NOW + timedelta(seconds=10))
+
+    assert clock.pop_due(NOW + timedelta(seconds=5)) == [1, 2]
+    assert clock.next_deadline() == NOW + timedelta(seconds=10)
+
+
+def test_rearm_skips_the_old_deadline():
+    clock = AuctionClock(resync_interval=30)
+    clock.running = True
+    clock.arm(1, NOW + timedelta(seconds=1))
+    clock.arm(1, NOW + timedelta(seconds=60))
+
+    assert clock.pop_due(NOW + timedelta(seconds=5)) == []
+    assert len(clock) == 1
+
+
+@pytest.mark.asyncio
+async def test_seed_arms_active_auctions_and_drops_the_rest():
+    clock = AuctionClock(resync_interval=30)
+    clock.running = True
+    clock.arm(9, NOW)
+    active = [SimpleNamespace(id=1, end_time=NOW + timedelta(minutes=5))]
+
+    with auction_service(active):
+        await clock.seed(MagicMock(), FakeSessionFactory())
+
+    assert len(clock) == 1
+    assert clock.next_deadline() == NOW + timedelta(minutes=5)
+
+
+@pytest.mark.asyncio
+async def test_run_reloads_auctions_armed_on_another_replica():
+    clock = AuctionClock(resync_interval=0.05)
+    active = []
+
+    with auction_service(active):
+        task = asyncio.create_task(clock.run(MagicMock(), FakeSessionFactory()))
+        await asyncio.sleep(0.01)
+        assert len(clock) == 0
+        # Otra réplica crea la subasta: sólo llega a este reloj a través de la BD
+        active.append(SimpleNamespace(id=7, end_time=datetime.utcnow() + timedelta(hours=1)))
+        await asyncio.sleep(0.1)
+        assert len(clock) == 1
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    # Al perder el lease el reloj se vacía y deja de aceptar plazos
+    assert len(clock) == 0
+    clock.arm(8, NOW)
+    assert len(clock) == 0
@@ -0,0 +1,160 @@
+"""
+Tests del EventBus: pool de workers y políticas de desbordamiento de las colas.
+"""
+import asyncio
+
+import pytest
+
+from services.event_bus import EventBus, EventType, OverflowPolicy
+
+
+class Gate:
+    """Manejador que se queda bloqueado hasta ``open()`` y registra lo recibido."""
+
+    def __init__(self):
+        self.opened = asyncio.Event()
+        self.started = asyncio.Event()
+        self.received = []
+
+    async def __call__(self, event):
+        self.started.set()
+        await self.opened.wait()
+        self.received.append((event.user_id, event.data.get("n")))
+
+    def open(self):
+        self.opened.set()
+
+
+async def fill(bus, gate, events):
+    """Publica el primer evento, espera a que el único worker lo tome y publica el resto."""
+    user_id, n = events[0]
+    await bus.publish(EventType.POINTS_AWARDED, user_id, {"n": n})
+    await gate.started.wait()
+    for user_id, n in events[1:]:
+        await bus.publish(EventType.POINTS_AWARDED, user_id, {"n": n})
+
+
+def queue_metrics(bus):
+    return bus.get_metrics()["queues"][EventType.POINTS_AWARDED.value]
+
+
+@pytest.mark.asyncio
+async def test_publish_does_not_wait_for_handlers():
+    bus = EventBus(workers=1)
+    gate = Gate()
+    bus.subscribe(EventType.POINTS_AWARDED, gate)
+
+    await asyncio.wait_for(fill(bus, gate, [(1, 0), (1, 1)]), timeout=1)
+    assert gate.received == []
+
+    gate.open()
+    await bus.shutdown()
+    assert gate.received == [(1, 0), (1, 1)]
+
+
+@pytest.mark.asyncio
+async def test_drop_oldest_keeps_newest_events():
+    bus = EventBus(workers=1, queue_size=2, overflow=OverflowPolicy.DROP_OLDEST)
+    gate = Gate()
+    bus.subscribe(EventType.POINTS_AWARDED, gate)
+
+    await fill(bus, gate, [(1, n) for n in range(5)])
+    gate.open()
+    await bus.shutdown()
+
+    # El 0 ya estaba en el worker; de 1..4 sólo caben los dos últimos
+    assert gate.received == [(1, 0), (1, 3), (1, 4)]
+    assert queue_metrics(bus)["dropped"] == 2
+
+
+@pytest.mark.asyncio
+async def test_coalesce_replaces_event_of_same_user():
+    bus = EventBus(workers=1, queue_size=2, overflow=OverflowPolicy.COALESCE)
+    gate = Gate()
+    bus.subscribe(EventType.POINTS_AWARDED, gate)
+
+    await fill(bus, gate, [(1, 0), (1, 1), (2, 2), (1, 3), (3, 4)])
+    gate.open()
+    await bus.shutdown()
+
+    # (1, 3) sustituye a (1, 1) en su posición; (3, 4) no tiene evento propio en cola
+    # y descarta el más antiguo, que ya es (1, 3)
+    assert gate.received == [(1, 0), (2, 2), (3, 4)]
+    assert queue_metrics(bus)["coalesced"] == 1
+    assert queue_metrics(bus)["dropped"] == 1
+
+
+@pytest.mark.asyncio
+async def test_block_waits_for_room():
+    bus = EventBus(workers=1, queue_size=1, overflow=OverflowPolicy.BLOCK)
+    gate = Gate()
+    bus.subscribe(EventType.POINTS_AWARDED, gate)
+
+    await fill(bus, gate, [(1, 0), (1, 1)])
+    blocked = asyncio.create_task(bus.publish(EventType.POINTS_AWARDED, 1, {"n": 2}))
+    await asyncio.sleep(0.05)
+    assert not blocked.done()
+
+    gate.open()
+    await asyncio.wait_for(blocked, timeout=1)
+    await bus.shutdown()
+    assert gate.received == [(1, 0), (1, 1), (1, 2)]
+    assert queue_metrics(bus)["dropped"] == 0
+
+
+@pytest.mark.asyncio
+async def test_block_inside_handler_falls_back_to_drop_oldest():
+    bus = EventBus(workers=1, queue_size=1, overflow=OverflowPolicy.BLOCK)
+    received = []
+
+    async def republish(event):
+        received.append(event.data["n"])
+        if event.data["n"] == 0:
+            # Con la cola llena, esperar aquí bloquearía al único worker para siempre
+            for n in range(1, 4):
+                await bus.publish(EventType.POINTS_AWARDED, 1, {"n": n})
+
+    bus.subscribe(EventType.POINTS_AWARDED, republish)
+    await bus.publish(EventType.POINTS_AWARDED, 1, {"n": 0})
+    await asyncio.sleep(0.05)
+    await bus.shutdown()
+
+    assert received == [0, 3]
+    assert queue_metrics(bus)["dropped"] == 2
+
+
+@pytest.mark.asyncio
+async def test_event_types_share_workers_in_turn():
+    bus = EventBus(workers=1)
+    order = []
+    gate = Gate()
+
+    async def record(event):
+        order.append(event.event_type)
+
+    bus.subscribe(EventType.POINTS_AWARDED, gate)
+    bus.subscribe(EventType.USER_REACTION, record)
+    await fill(bus, gate, [(1, 0), (1, 1), (1, 2)])
+    await bus.publish(EventType.USER_REACTION, 1, {})
+    gate.open()
+    await bus.shutdown()
+
+    # La reacción no espera a que se vacíe la cola de puntos
+    assert order == [EventType.USER_REACTION]
+    assert [n for _, n in gate.received] == [0, 1, 2]
+
+
+@pytest.mark.asyncio
+async def test_handler_errors_are_counted():
+    bus = EventBus(workers=2)
+
+    async def failing(event):
+        raise RuntimeError("boom")
+
+    bus.subscribe(EventType.POINTS_AWARDED, failing)
+    await bus.publish(EventType.POINTS_AWARDED, 1, {})
+    await bus.shutdown()
+
+    stats = next(iter(bus.get_metrics()["handlers"].values()))
+    assert stats["calls"] == 1
+    assert stats["errors"] == 1
@@ -0,0 +1,86 @@
+"""
+Tests de la agregación de eventos por usuario (enable_coalescing).
+"""
+import asyncio
+
+import pytest
+
+from services.event_bus import EventBus, EventType, merge_points_awarded, merge_user_reaction
+
+
+def test_merge_points_awarded():
+    data = {"points": 5, "total_points": 10, "source": "message"}
+    merge_points_awarded(data, {"points": 3, "total_points": 13, "source": "reaction"})
+    merge_points_awarded(data, {"points": None})
+
+    assert data == {"points": 8, "total_points": 13, "source": "reaction"}
+
+
+def test_merge_user_reaction():
+    data = {"points_awarded": 1, "total_points": 1, "hint_unlocked": None}
+    merge_user_reaction(data, {"points_awarded": 2, "total_points": 3, "hint_unlocked": "pista_1"})
+    merge_user_reaction(data, {"points_awarded": 1, "total_points": 4, "hint_unlocked": None})
+
+    # Una pista desbloqueada no se pierde porque una reacción posterior no traiga ninguna
+    assert data == {"points_awarded": 4, "total_points": 4, "hint_unlocked": "pista_1"}
+
+
+@pytest.mark.asyncio
+async def test_burst_is_delivered_as_one_event_per_user():
+    bus = EventBus(workers=2)
+    received = []
+    bus.subscribe(EventType.POINTS_AWARDED, lambda event: received.append(event))
+    bus.enable_coalescing(EventType.POINTS_AWARDED, window=0.1)
+
+    published = {"points": 1}
+    await bus.publish(EventType.POINTS_AWARDED, 1, published)
+    for points in (2, 3):
+        await bus.publish(EventType.POINTS_AWARDED, 1, {"points": points})
+    await bus.publish(EventType.POINTS_AWARDED, 2, {"points": 10})
+    assert received == []
+
+    await asyncio.sleep(0.3)
+    by_user = {event.user_id: event.data for event in received}
+    assert by_user == {1: {"points": 6, "coalesced": 3}, 2: {"points": 10, "coalesced": 1}}
+    # El diccionario del publicador no se modifica
+    assert published == {"points": 1}
+    metrics = bus.get_metrics()["coalescing"][EventType.POINTS_AWARDED.value]
+    assert metrics == {"pending": 0, "merged": 2, "emitted": 2}
+    await bus.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_history_and_sinks_see_every_event():
+    bus = EventBus(workers=1)
+    sunk = []
+    bus.add_sink(sunk.append)
+    bus.subscribe(EventType.POINTS_AWARDED, lambda event: None)
+    bus.enable_coalescing(EventType.POINTS_AWARDED, window=0.1)
+
+    for points in range(3):
+        await bus.publish(EventType.POINTS_AWARDED, 1, {"points": points})
+
+    assert len(sunk) == 3
+    assert len(bus.get_event_history()) == 3
+    await bus.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_shutdown_releases_pending_aggregates():
+    bus = EventBus(workers=1)
+    received = []
+    bus.subscribe(EventType.POINTS_AWARDED, lambda event: received.append(event.data))
+    bus.enable_coalescing(EventType.POINTS_AWARDED, window=60)
+
+    await bus.publish(EventType.POINTS_AWARDED, 1, {"points": 1})
+    await bus.publish(EventType.POINTS_AWARDED, 1, {"points": 2})
+    await bus.shutdown()
+
+    assert received == [{"points": 3, "coalesced": 2}]
+
+
+def test_coalescing_requires_merge_function():
+    bus = EventBus()
+
+    with pytest.raises(ValueError):
+        bus.enable_coalescing(EventType.USER_DAILY_CHECKIN, window=1)
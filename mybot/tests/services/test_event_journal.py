@@ -0,0 +1,114 @@
+"""
+Tests del diario de eventos: rotación de segmentos, índices y reproducción.
+"""
+import asyncio
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from services.event_bus import Event, EventBus, EventType, OverflowPolicy
+from services.event_journal import EventJournal, read_events, replay
+
+BASE = datetime(2026, 10, 1, 12, 0, 0)
+
+
+def make_event(index: int, user_id: int, correlation_id=None) -> Event:
+    return Event(
+        event_type=EventType.POINTS_AWARDED,
+        user_id=user_id,
+        data={"points": index},
+        timestamp=BASE + timedelta(seconds=index),
+        correlation_id=correlation_id,
+    )
+
+
+async def write_journal(directory, events, segment_bytes=1024):
+    journal = EventJournal(str(directory), segment_bytes=segment_bytes, flush_interval=0.01)
+    for event in events:
+        journal.append(event)
+    await journal.close()
+    return journal
+
+
+@pytest.mark.asyncio
+async def test_segments_rotate_and_are_indexed(tmp_path):
+    events = [make_event(i, user_id=i % 3) for i in range(60)]
+    journal = await write_journal(tmp_path, events)
+
+    segments = sorted(tmp_path.glob("events-*.jsonl"))
+    assert len(segments) > 1
+    assert journal.written == 60
+    # Cada segmento cerrado tiene su índice con el rango y los desplazamientos por usuario
+    for segment in segments:
+        index = json.loads(segment.with_suffix(".idx.json").read_text())
+        lines = segment.read_bytes().splitlines(keepends=True)
+        assert index["count"] == len(lines)
+        offsets = [offset for user_offsets in index["users"].values() for offset in user_offsets]
+        assert sorted(offsets) == [sum(len(line) for line in lines[:n]) for n in range(len(lines))]
+
+
+@pytest.mark.asyncio
+async def test_read_events_filters(tmp_path):
+    events = [make_event(i, user_id=i % 3, correlation_id=f"c{i % 5}") for i in range(60)]
+    await write_journal(tmp_path, events)
+
+    assert [e.data["points"] for e in read_events(str(tmp_path))] == list(range(60))
+    by_user = list(read_events(str(tmp_path), user_id=1))
+    assert [e.data["points"] for e in by_user] == [i for i in range(60) if i % 3 == 1]
+    in_range = list(read_events(str(tmp_path), start=BASE + timedelta(seconds=10), end=BASE + timedelta(seconds=19)))
+    assert [e.data["points"] for e in in_range] == list(range(10, 20))
+    both = list(read_events(str(tmp_path), user_id=1, correlation_id="c2"))
+    assert [e.data["points"] for e in both] == [i for i in range(60) if i % 3 == 1 and i % 5 == 2]
+    assert list(read_events(str(tmp_path), event_types=[EventType.USER_REACTION])) == []
+
+
+@pytest.mark.asyncio
+async def test_unindexed_segment_is_scanned(tmp_path):
+    await write_journal(tmp_path, [make_event(i, user_id=7) for i in range(5)], segment_bytes=10**6)
+    for index_file in tmp_path.glob("*.idx.json"):
+        index_file.unlink()
+    # Línea a medias de un proceso interrumpido
+    with open(next(tmp_path.glob("events-*.jsonl")), "ab") as f:
+        f.write(b'{"t": "2026-10')
+
+    assert len(list(read_events(str(tmp_path), user_id=7))) == 5
+
+
+@pytest.mark.asyncio
+async def test_new_journal_starts_new_segment(tmp_path):
+    await write_journal(tmp_path, [make_event(0, 1)], segment_bytes=10**6)
+    await write_journal(tmp_path, [make_event(1, 1)], segment_bytes=10**6)
+
+    assert [p.name for p in sorted(tmp_path.glob("events-*.jsonl"))] == [
+        "events-00000001.jsonl",
+        "events-00000002.jsonl",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_replay_delivers_every_event_through_a_full_queue():
+    bus = EventBus(workers=2, queue_size=10, overflow=OverflowPolicy.DROP_OLDEST)
+    handled = []
+
+    async def handler(event):
+        await asyncio.sleep(0)
+        handled.append(event.data["points"])
+
+    bus.subscribe(EventType.POINTS_AWARDED, handler)
+    events = [make_event(i, user_id=1) for i in range(500)]
+
+    count = await replay(bus, events)
+    await bus.shutdown(timeout=5)
+
+    assert count == 500
+    assert sorted(handled) == list(range(500))
+    assert bus.get_metrics()["queues"][EventType.POINTS_AWARDED.value]["dropped"] == 0
+
+
+@pytest.mark.asyncio
+async def test_replay_without_subscribers_counts_nothing():
+    bus = EventBus(workers=1)
+
+    assert await replay(bus, [make_event(0, 1)]) == 0
+    await bus.shutdown()
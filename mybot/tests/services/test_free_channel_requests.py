@@ -0,0 +1,87 @@
+"""
+Tests de process_pending_requests: un fallo no rompe las solicitudes
+siguientes y un retry_after pausa el límite compartido con el pipeline.
+"""
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+import pytest_asyncio
+from aiogram.exceptions import TelegramRetryAfter
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from database.base import Base
+from database.models import BotConfig, PendingChannelRequest
+from services.free_channel_service import FreeChannelService
+from services.join_request_pipeline import get_join_request_pipeline, reset_join_request_pipeline
+
+CHANNEL_ID = -100500
+
+
+@pytest_asyncio.fixture
+async def session_factory():
+    reset_join_request_pipeline()
+    engine = create_async_engine(
+        "sqlite+aiosqlite:///:memory:",
+        poolclass=StaticPool,
+        connect_args={"check_same_thread": False},
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with factory() as session:
+        session.add(BotConfig(id=1, free_channel_wait_time_minutes=0, auto_approval_enabled=True))
+        for user_id in (1, 2, 3):
+            session.add(PendingChannelRequest(
+                user_id=user_id,
+                chat_id=CHANNEL_ID,
+                request_timestamp=datetime.utcnow() - timedelta(minutes=1),
+                approved=False,
+            ))
+        await session.commit()
+    yield factory
+    await engine.dispose()
+    reset_join_request_pipeline()
+
+
+def bot_failing_for(user_id, error):
+    async def approve(chat_id, uid):
+        if uid == user_id:
+            raise error
+        return True
+
+    bot = MagicMock()
+    bot.approve_chat_join_request = AsyncMock(side_effect=approve)
+    bot.send_message = AsyncMock()
+    bot.get_chat_member = AsyncMock(return_value=MagicMock(status="left"))
+    return bot
+
+
+async def approved_users(session_factory):
+    async with session_factory() as session:
+        rows = await session.execute(
+            PendingChannelRequest.__table__.select().where(PendingChannelRequest.approved == True)
+        )
+        return sorted(row.user_id for row in rows)
+
+
+@pytest.mark.asyncio
+async def test_failed_request_does_not_break_the_rest(session_factory):
+    bot = bot_failing_for(1, RuntimeError("boom"))
+    async with session_factory() as session:
+        processed = await FreeChannelService(session, bot).process_pending_requests()
+
+    assert processed == 2
+    assert await approved_users(session_factory) == [2, 3]
+
+
+@pytest.mark.asyncio
+async def test_retry_after_pauses_the_shared_limiter(session_factory):
+    bot = bot_failing_for(3, TelegramRetryAfter(method=MagicMock(), message="flood", retry_after=30))
+    async with session_factory() as session:
+        processed = await FreeChannelService(session, bot).process_pending_requests()
+
+    assert processed == 2
+    assert await approved_users(session_factory) == [1, 2]
+    assert get_join_request_pipeline().limiter.delay() > 25
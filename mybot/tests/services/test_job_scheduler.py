@@ -0,0 +1,131 @@
+"""
+Tests del lease en BD y del JobScheduler: una sola réplica ejecuta cada tarea,
+el lease caduca en un TTL aunque el intervalo sea largo y se renueva mientras
+la tarea está en marcha.
+"""
+import asyncio
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from database.leases import acquire_lease, release_lease
+from database.models import SchedulerLease
+from services.job_scheduler import JobScheduler, JobSpec
+
+LEASE_TTL = 60
+
+
+@pytest_asyncio.fixture
+async def session_factory():
+    engine = create_async_engine(
+        "sqlite+aiosqlite:///:memory:",
+        poolclass=StaticPool,
+        connect_args={"check_same_thread": False},
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(SchedulerLease.__table__.create)
+    yield async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    await engine.dispose()
+
+
+async def lease_of(session_factory, name):
+    async with session_factory() as session:
+        return await session.get(SchedulerLease, name)
+
+
+async def expire(session_factory, name):
+    async with session_factory() as session:
+        await session.execute(
+            update(SchedulerLease)
+            .where(SchedulerLease.name == name)
+            .values(expires_at=datetime.utcnow() - timedelta(seconds=1))
+        )
+        await session.commit()
+
+
+def scheduler(session_factory, owner, func, interval=86400):
+    jobs = [JobSpec("cleanup", func, interval=interval)]
+    sched = JobScheduler(MagicMock(), session_factory, jobs, lease_ttl=LEASE_TTL)
+    sched.owner = owner
+    sched._intervals["cleanup"] = interval
+    return sched
+
+
+@pytest.mark.asyncio
+async def test_lease_is_exclusive_until_it_expires(session_factory):
+    async with session_factory() as session:
+        assert await acquire_lease(session, "job", "a", LEASE_TTL)
+        assert await acquire_lease(session, "job", "a", LEASE_TTL)
+        assert not await acquire_lease(session, "job", "b", LEASE_TTL)
+
+    await expire(session_factory, "job")
+
+    async with session_factory() as session:
+        assert await acquire_lease(session, "job", "b", LEASE_TTL)
+    assert (await lease_of(session_factory, "job")).owner == "b"
+
+
+@pytest.mark.asyncio
+async def test_release_lets_another_replica_take_over(session_factory):
+    async with session_factory() as session:
+        assert await acquire_lease(session, "job", "a", LEASE_TTL)
+        await release_lease(session, "job", "b")
+        assert not await acquire_lease(session, "job", "b", LEASE_TTL)
+        await release_lease(session, "job", "a")
+        assert await acquire_lease(session, "job", "b", LEASE_TTL)
+
+
+@pytest.mark.asyncio
+async def test_interval_job_runs_on_one_replica(session_factory):
+    runs = []
+
+    async def job(bot, factory):
+        runs.append(1)
+
+    leader = scheduler(session_factory, "a", job)
+    follower = scheduler(session_factory, "b", job)
+    await leader._run_interval_job("cleanup")
+    await follower._run_interval_job("cleanup")
+
+    assert len(runs) == 1
+    assert follower.metrics["cleanup"].skipped == 1
+
+
+@pytest.mark.asyncio
+async def test_interval_job_lease_does_not_last_an_interval(session_factory):
+    async def job(bot, factory):
+        pass
+
+    await scheduler(session_factory, "a", job)._run_interval_job("cleanup")
+
+    lease = await lease_of(session_factory, "cleanup")
+    assert lease.expires_at <= datetime.utcnow() + timedelta(seconds=LEASE_TTL + 1)
+
+
+@pytest.mark.asyncio
+async def test_lease_is_renewed_while_the_job_runs(session_factory):
+    started = asyncio.Event()
+    finish = asyncio.Event()
+
+    async def job(bot, factory):
+        started.set()
+        await finish.wait()
+
+    leader = scheduler(session_factory, "a", job)
+    run = asyncio.create_task(leader._run_interval_job("cleanup"))
+    await started.wait()
+    await expire(session_factory, "cleanup")
+    await leader._renew_lease("cleanup")
+
+    follower = scheduler(session_factory, "b", job)
+    await follower._run_interval_job("cleanup")
+    finish.set()
+    await run
+
+    assert follower.metrics["cleanup"].skipped == 1
+    assert (await lease_of(session_factory, "cleanup")).owner == "a"
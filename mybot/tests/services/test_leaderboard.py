@@ -0,0 +1,147 @@
+"""
+Tests del ranking en memoria: la skip list indexable frente a una lista
+ordenada de referencia, las consultas top/rank/vecinos del Leaderboard y las
+actualizaciones preparadas que se aplican al confirmar la sesión.
+"""
+import random
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from database.base import Base
+from database.models import User
+from database.unit_of_work import unit_of_work
+from services.leaderboard import (
+    IndexableSkipList,
+    Leaderboard,
+    get_leaderboard,
+    reset_leaderboard,
+    stage_points_update,
+)
+
+
+def assert_matches(skip_list, expected):
+    expected = sorted(expected)
+    assert len(skip_list) == len(expected)
+    assert skip_list.slice(0, len(expected) + 5) == expected
+    for position, key in enumerate(expected):
+        assert skip_list.index(key) == position
+        assert skip_list.slice(position, position + 1) == [key]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_random_inserts_and_removes_match_a_sorted_list(seed):
+    rng = random.Random(seed)
+    random.seed(seed)
+    skip_list = IndexableSkipList()
+    expected = set()
+
+    for _ in range(400):
+        key = (-float(rng.randint(0, 50)), rng.randint(1, 40))
+        if key in expected and rng.random() < 0.5:
+            assert skip_list.remove(key)
+            expected.discard(key)
+        elif key not in expected:
+            skip_list.insert(key)
+            expected.add(key)
+    assert_matches(skip_list, expected)
+
+    for key in list(expected):
+        assert skip_list.remove(key)
+        expected.discard(key)
+        if len(expected) % 25 == 0:
+            assert_matches(skip_list, expected)
+    assert len(skip_list) == 0
+
+
+def test_missing_keys_and_out_of_range_slices():
+    skip_list = IndexableSkipList()
+    for key in [(-3.0, 1), (-2.0, 2), (-1.0, 3)]:
+        skip_list.insert(key)
+
+    assert skip_list.index((-5.0, 9)) is None
+    assert not skip_list.remove((-5.0, 9))
+    assert skip_list.slice(-2, 1) == [(-3.0, 1)]
+    assert skip_list.slice(2, 10) == [(-1.0, 3)]
+    assert skip_list.slice(3, 10) == []
+
+
+def test_leaderboard_orders_by_points_then_user_id():
+    board = Leaderboard()
+    board.load([(1, 10), (2, 30), (3, 30), (4, 5)])
+
+    assert board.top(3) == [(2, 30.0), (3, 30.0), (1, 10.0)]
+    assert board.rank_of(3) == 2
+    assert board.rank_of(99) is None
+
+
+def test_update_moves_the_user_and_remove_drops_it():
+    board = Leaderboard()
+    board.load([(1, 10), (2, 20), (3, 30)])
+
+    board.update(1, 40)
+    assert board.rank_of(1) == 1
+    assert board.rank_of(3) == 2
+    board.remove(3)
+    assert len(board) == 2
+    assert board.top(5) == [(1, 40.0), (2, 20.0)]
+
+
+def test_neighbours_are_clamped_at_the_top():
+    board = Leaderboard()
+    board.load([(uid, 100 - uid) for uid in range(1, 11)])
+
+    assert board.neighbours(5, radius=1) == [(4, 4, 96.0), (5, 5, 95.0), (6, 6, 94.0)]
+    assert [rank for rank, _, _ in board.neighbours(1, radius=2)] == [1, 2, 3]
+    assert board.neighbours(99) == []
+
+
+@pytest_asyncio.fixture
+async def session_factory():
+    engine = create_async_engine(
+        "sqlite+aiosqlite:///:memory:",
+        poolclass=StaticPool,
+        connect_args={"check_same_thread": False},
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with factory() as session:
+        session.add(User(id=1, points=0))
+        await session.commit()
+    reset_leaderboard()
+    get_leaderboard().load([(1, 0)])
+    yield factory
+    reset_leaderboard()
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_failed_savepoint_keeps_staged_updates(session_factory):
+    async with session_factory() as session:
+        async with unit_of_work(session):
+            user = await session.get(User, 1)
+            user.points = 50
+            stage_points_update(session, 1, 50)
+            with pytest.raises(IntegrityError):
+                async with session.begin_nested():
+                    await session.execute(insert(User).values(id=1, points=0))
+
+    assert get_leaderboard().points_of(1) == 50.0
+
+
+@pytest.mark.asyncio
+async def test_rollback_discards_staged_updates(session_factory):
+    async with session_factory() as session:
+        with pytest.raises(RuntimeError):
+            async with unit_of_work(session):
+                stage_points_update(session, 1, 50)
+                await session.get(User, 1)
+                raise RuntimeError("boom")
+        await session.commit()
+
+    assert get_leaderboard().points_of(1) == 0.0
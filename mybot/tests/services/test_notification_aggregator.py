@@ -0,0 +1,117 @@
+"""
+Tests del NotificationAggregator: rueda de envíos, duplicados con TTL y límite de memoria.
+"""
+import asyncio
+import time
+from unittest.mock import AsyncMock
+
+import pytest
+
+from services.notification_config import NotificationConfig
+from services.notification_service import (
+    NotificationAggregator,
+    NotificationData,
+    NotificationPriority,
+)
+
+
+def make_config(**overrides) -> NotificationConfig:
+    values = dict(
+        aggregation_delays={0: 0.01, 1: 0.05, 2: 0.1, 3: 1.5},
+        max_wait_time=0.3,
+        duplicate_window=60,
+        wheel_tick=0.01,
+    )
+    values.update(overrides)
+    return NotificationConfig(**values)
+
+
+@pytest.fixture
+def bot():
+    bot = AsyncMock()
+    bot.send_message = AsyncMock()
+    return bot
+
+
+@pytest.mark.asyncio
+async def test_deadline_capped_at_max_wait_time(bot):
+    aggregator = NotificationAggregator(make_config())
+    start = time.monotonic()
+
+    await aggregator.add(bot, 1, NotificationData("points", {"points": 1}, NotificationPriority.LOW))
+
+    # El retraso LOW (1.5 s) queda recortado por max_wait_time (0.3 s)
+    deadline = aggregator._wheel.deadline(1)
+    assert deadline is not None
+    assert deadline <= start + 0.3 + 2 * aggregator.config.wheel_tick
+    await aggregator.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_new_notifications_do_not_extend_past_max_wait(bot):
+    aggregator = NotificationAggregator(make_config(max_wait_time=0.25))
+    start = time.monotonic()
+
+    for points in range(5):
+        await aggregator.add(bot, 1, NotificationData("points", {"points": points}, NotificationPriority.MEDIUM))
+        await asyncio.sleep(0.06)
+
+    await asyncio.sleep(0.1)
+    # Un solo mensaje con las cinco notificaciones, enviado sin pasar de max_wait_time
+    bot.send_message.assert_called_once()
+    assert time.monotonic() - start < 0.6
+    assert aggregator.get_metrics()["merged"] == 4
+    assert aggregator.get_metrics()["sent_messages"] == 1
+
+
+@pytest.mark.asyncio
+async def test_duplicates_expire_after_window(bot):
+    aggregator = NotificationAggregator(make_config(duplicate_window=0.1))
+    notification = NotificationData("badge", {"name": "Pionero"})
+
+    assert aggregator.accept(1, notification)
+    assert not aggregator.accept(1, notification)
+    # Otro usuario no comparte la ventana de duplicados
+    assert aggregator.accept(2, notification)
+
+    await asyncio.sleep(0.15)
+    assert aggregator.accept(1, notification)
+    assert aggregator.get_metrics()["duplicates"] == 1
+
+
+@pytest.mark.asyncio
+async def test_dedup_entries_are_bounded(bot):
+    aggregator = NotificationAggregator(make_config(max_dedup_entries=3))
+
+    for user_id in range(5):
+        aggregator.accept(user_id, NotificationData("badge", {"name": "Pionero"}))
+
+    assert aggregator.get_metrics()["dedup_entries"] == 3
+    # Los más antiguos se descartaron y vuelven a aceptarse
+    assert aggregator.accept(0, NotificationData("badge", {"name": "Pionero"}))
+
+
+@pytest.mark.asyncio
+async def test_oldest_user_flushed_above_max_pending_users(bot):
+    aggregator = NotificationAggregator(make_config(max_pending_users=2))
+
+    for user_id in (1, 2, 3):
+        await aggregator.add(bot, user_id, NotificationData("points", {"points": 5}, NotificationPriority.LOW))
+
+    bot.send_message.assert_called_once()
+    assert bot.send_message.call_args[0][0] == 1
+    assert set(aggregator.pending_notifications) == {2, 3}
+    assert aggregator.get_metrics()["forced_flushes"] == 1
+    await aggregator.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_shutdown_sends_pending(bot):
+    aggregator = NotificationAggregator(make_config())
+
+    await aggregator.add(bot, 1, NotificationData("points", {"points": 5}, NotificationPriority.LOW))
+    await aggregator.add(bot, 2, NotificationData("points", {"points": 5}, NotificationPriority.LOW))
+    await aggregator.shutdown()
+
+    assert bot.send_message.call_count == 2
+    assert aggregator.pending_notifications == {}
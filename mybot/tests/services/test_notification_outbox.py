@@ -0,0 +1,175 @@
+"""
+Tests del outbox de notificaciones: escritura con la recompensa, reclamación
+por lotes, un mensaje por usuario, reintentos con espera y descarte.
+"""
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+import pytest_asyncio
+from aiogram.exceptions import TelegramForbiddenError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from database.models import NotificationOutbox
+from services.notification_outbox import OutboxDrainer, claim_due
+from services.notification_service import NotificationService
+from utils.config import Config
+
+
+@pytest_asyncio.fixture
+async def session_factory():
+    engine = create_async_engine(
+        "sqlite+aiosqlite:///:memory:",
+        poolclass=StaticPool,
+        connect_args={"check_same_thread": False},
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(NotificationOutbox.__table__.create)
+    yield async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    await engine.dispose()
+
+
+@pytest.fixture
+def bot():
+    bot = AsyncMock()
+    bot.send_message = AsyncMock()
+    return bot
+
+
+def make_drainer(**overrides) -> OutboxDrainer:
+    values = dict(batch_size=100, poll_interval=0.1, claim_ttl=60, max_attempts=3, retention_hours=24)
+    values.update(overrides)
+    return OutboxDrainer(**values)
+
+
+async def add_rows(session_factory, *rows):
+    now = datetime.utcnow()
+    async with session_factory() as session:
+        for user_id, points, delay in rows:
+            session.add(
+                NotificationOutbox(
+                    user_id=user_id,
+                    notification_type="points",
+                    data={"points": points, "total": 100},
+                    priority=2,
+                    created_at=now,
+                    available_at=now + timedelta(seconds=delay),
+                )
+            )
+        await session.commit()
+
+
+async def all_rows(session_factory):
+    async with session_factory() as session:
+        return list((await session.execute(select(NotificationOutbox).order_by(NotificationOutbox.id))).scalars())
+
+
+@pytest.mark.asyncio
+async def test_add_notification_writes_outbox_row(session_factory, bot, monkeypatch):
+    monkeypatch.setattr(Config, "NOTIFICATION_OUTBOX", True)
+    async with session_factory() as session:
+        service = NotificationService(session, bot)
+        await service.add_notification(1, "points", {"points": 5, "total": 10})
+        # Duplicado dentro de la ventana: no se escribe otra fila
+        await service.add_notification(1, "points", {"points": 5, "total": 10})
+
+    rows = await all_rows(session_factory)
+    assert len(rows) == 1
+    assert rows[0].user_id == 1
+    assert rows[0].available_at > rows[0].created_at
+    assert service.pending_notifications == {}
+    bot.send_message.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_one_message_per_user(session_factory, bot):
+    await add_rows(session_factory, (1, 5, -1), (1, 10, -1), (1, 20, -1), (2, 3, -1))
+    drainer = make_drainer()
+
+    claimed = await drainer.drain_once(bot, session_factory)
+
+    assert claimed == 4
+    assert bot.send_message.call_count == 2
+    messages = {call.args[0]: call.args[1] for call in bot.send_message.call_args_list}
+    assert "+35 besitos" in messages[1]
+    assert "+3 besitos" in messages[2]
+    assert all(row.sent_at is not None for row in await all_rows(session_factory))
+    assert drainer.get_metrics()["merged"] == 2
+
+
+@pytest.mark.asyncio
+async def test_claim_takes_pending_rows_of_due_users_only(session_factory):
+    # Usuario 1: una fila vencida y otra aún en ventana; usuario 2: nada vencido
+    await add_rows(session_factory, (1, 5, -1), (1, 10, 30), (2, 3, 30))
+
+    async with session_factory() as session:
+        rows = await claim_due(session, "owner-a", batch_size=10, claim_ttl=60)
+
+    assert sorted(row.user_id for row in rows) == [1, 1]
+    async with session_factory() as session:
+        # Ya reclamadas por owner-a: otro drenador no las vuelve a tomar
+        assert await claim_due(session, "owner-b", batch_size=10, claim_ttl=60) == []
+
+
+@pytest.mark.asyncio
+async def test_expired_claim_is_taken_again(session_factory):
+    await add_rows(session_factory, (1, 5, -1))
+    async with session_factory() as session:
+        assert len(await claim_due(session, "dead-replica", batch_size=10, claim_ttl=-1)) == 1
+
+    async with session_factory() as session:
+        rows = await claim_due(session, "owner-b", batch_size=10, claim_ttl=60)
+
+    assert len(rows) == 1
+    assert rows[0].claimed_by == "owner-b"
+
+
+@pytest.mark.asyncio
+async def test_failed_send_is_retried_with_backoff(session_factory, bot):
+    await add_rows(session_factory, (1, 5, -1))
+    bot.send_message.side_effect = RuntimeError("network down")
+    drainer = make_drainer()
+
+    await drainer.drain_once(bot, session_factory)
+
+    row = (await all_rows(session_factory))[0]
+    assert row.sent_at is None
+    assert row.attempts == 1
+    assert row.claimed_by is None
+    assert row.claimed_until > datetime.utcnow() + timedelta(seconds=1)
+    # Durante la espera la fila no se reclama
+    assert await drainer.drain_once(bot, session_factory) == 0
+    assert drainer.get_metrics()["retried"] == 1
+
+
+@pytest.mark.asyncio
+async def test_row_dropped_at_max_attempts(session_factory, bot):
+    await add_rows(session_factory, (1, 5, -1))
+    async with session_factory() as session:
+        row = (await session.execute(select(NotificationOutbox))).scalar_one()
+        row.attempts = 2
+        await session.commit()
+    bot.send_message.side_effect = RuntimeError("network down")
+    drainer = make_drainer(max_attempts=3)
+
+    await drainer.drain_once(bot, session_factory)
+
+    row = (await all_rows(session_factory))[0]
+    assert row.attempts == 3
+    assert row.sent_at is not None
+    assert drainer.get_metrics()["dropped"] == 1
+
+
+@pytest.mark.asyncio
+async def test_blocked_user_is_not_retried(session_factory, bot):
+    await add_rows(session_factory, (1, 5, -1), (1, 6, -1))
+    bot.send_message.side_effect = TelegramForbiddenError(method=MagicMock(), message="bot was blocked by the user")
+    drainer = make_drainer()
+
+    await drainer.drain_once(bot, session_factory)
+
+    rows = await all_rows(session_factory)
+    assert all(row.sent_at is not None and row.attempts == 0 for row in rows)
+    assert drainer.get_metrics()["dropped"] == 2
@@ -0,0 +1,137 @@
+"""
+Tests del OutboundDispatcher: orden por prioridad, chats limitados que no
+frenan a los demás y reintentos ante retry_after en OutboundMiddleware.
+"""
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from aiogram.exceptions import TelegramRetryAfter
+
+from services.outbound_dispatcher import (
+    MAX_RETRIES,
+    MAX_RETRY_AFTER,
+    OutboundDispatcher,
+    OutboundMiddleware,
+    Priority,
+    current_priority,
+    send_notification,
+)
+
+
+def dispatcher(global_rate=1000, chat_rate=1000, group_rate=1000, chat_burst=10):
+    return OutboundDispatcher(global_rate, chat_rate, group_rate, chat_burst)
+
+
+def method(name="sendMessage", chat_id=5):
+    m = SimpleNamespace(chat_id=chat_id)
+    setattr(m, "__api_method__", name)
+    return m
+
+
+def retry_after(seconds):
+    return TelegramRetryAfter(method=MagicMock(), message="flood", retry_after=seconds)
+
+
+@pytest.mark.asyncio
+async def test_higher_priority_is_served_first():
+    d = dispatcher(global_rate=200)
+    d.global_bucket.pause(0.05)
+    served = []
+
+    async def send(priority, chat_id):
+        await d.acquire(chat_id, priority)
+        served.append(priority)
+
+    tasks = [
+        asyncio.create_task(send(Priority.BULK, 1)),
+        asyncio.create_task(send(Priority.NOTIFICATION, 2)),
+        asyncio.create_task(send(Priority.INTERACTIVE, 3)),
+    ]
+    await asyncio.wait_for(asyncio.gather(*tasks), timeout=1)
+
+    assert served == [Priority.INTERACTIVE, Priority.NOTIFICATION, Priority.BULK]
+    assert d.get_metrics()["bulk"]["sent"] == 1
+
+
+@pytest.mark.asyncio
+async def test_throttled_chat_does_not_block_other_chats():
+    d = dispatcher(chat_rate=1, chat_burst=1)
+    await d.acquire(1, Priority.INTERACTIVE)
+    served = []
+
+    async def send(chat_id):
+        await d.acquire(chat_id, Priority.INTERACTIVE)
+        served.append(chat_id)
+
+    waiting = asyncio.create_task(send(1))
+    await asyncio.sleep(0)
+    await asyncio.wait_for(send(2), timeout=0.5)
+
+    assert served == [2]
+    waiting.cancel()
+    await asyncio.gather(waiting, return_exceptions=True)
+    assert len(d) == 0
+
+
+def test_backoff_pauses_only_that_chat():
+    d = dispatcher()
+    d.backoff(5, 30)
+
+    assert d._ready(5) > 25
+    assert d._ready(6) == 0
+    d.backoff(None, 10)
+    assert d.global_bucket.delay() > 5
+
+
+@pytest.mark.asyncio
+async def test_middleware_retries_after_flood_wait():
+    d = dispatcher()
+    make_request = AsyncMock(side_effect=[retry_after(0), "ok"])
+
+    result = await OutboundMiddleware(d)(make_request, MagicMock(), method())
+
+    assert result == "ok"
+    assert make_request.await_count == 2
+    assert d.retries == 1
+
+
+@pytest.mark.asyncio
+async def test_middleware_gives_up_on_long_or_repeated_waits():
+    d = dispatcher()
+    long_wait = AsyncMock(side_effect=retry_after(MAX_RETRY_AFTER + 1))
+    with pytest.raises(TelegramRetryAfter):
+        await OutboundMiddleware(d)(long_wait, MagicMock(), method())
+    assert long_wait.await_count == 1
+
+    repeated = AsyncMock(side_effect=retry_after(0))
+    with pytest.raises(TelegramRetryAfter):
+        await OutboundMiddleware(d)(repeated, MagicMock(), method())
+    assert repeated.await_count == MAX_RETRIES + 1
+    assert d.gave_up == 2
+
+
+@pytest.mark.asyncio
+async def test_other_api_calls_are_not_throttled():
+    d = dispatcher()
+    d.global_bucket.pause(60)
+    make_request = AsyncMock(return_value=True)
+
+    await asyncio.wait_for(
+        OutboundMiddleware(d)(make_request, MagicMock(), method("approveChatJoinRequest")), timeout=0.5
+    )
+
+    make_request.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_send_notification_uses_notification_priority():
+    seen = []
+    bot = MagicMock()
+    bot.send_message = AsyncMock(side_effect=lambda *a, **k: seen.append(current_priority()))
+
+    await send_notification(bot, 1, "hola")
+
+    assert seen == [Priority.NOTIFICATION]
+    assert current_priority() == Priority.INTERACTIVE
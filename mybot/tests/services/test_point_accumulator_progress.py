@@ -0,0 +1,70 @@
+"""
+Tests de las comprobaciones tras un flush del PointAccumulator: un fallo en un
+usuario no afecta a los demás y los usuarios sin cambios no abren sesión.
+"""
+from unittest.mock import AsyncMock, patch
+
+import pytest
+import pytest_asyncio
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from database.base import Base
+from database.models import User, UserStats
+from services.level_service import LevelService
+from services.point_accumulator import PointAccumulator, _PendingDelta
+
+
+@pytest_asyncio.fixture
+async def session_factory():
+    engine = create_async_engine(
+        "sqlite+aiosqlite:///:memory:",
+        poolclass=StaticPool,
+        connect_args={"check_same_thread": False},
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with factory() as session:
+        for uid, points in ((1, 5000), (2, 5000), (3, 1)):
+            session.add(User(id=uid, points=points, level=1))
+            session.add(UserStats(user_id=uid, messages_sent=0))
+        await session.commit()
+    yield factory
+    await engine.dispose()
+
+
+def accumulator(session_factory):
+    acc = PointAccumulator()
+    acc._session_factory = session_factory
+    acc._bot = AsyncMock()
+    return acc
+
+
+@pytest.mark.asyncio
+async def test_failure_of_one_user_does_not_break_the_rest(session_factory):
+    original = LevelService.check_for_level_up
+
+    async def fail_for_first(self, user, *, bot=None):
+        if user.id == 1:
+            raise RuntimeError("boom")
+        return await original(self, user, bot=bot)
+
+    batch = {1: _PendingDelta(points=5000), 2: _PendingDelta(points=5000)}
+    with patch.object(LevelService, "check_for_level_up", fail_for_first), \
+         patch("services.outbound_dispatcher.send_notification", AsyncMock()):
+        await accumulator(session_factory)._run_progress_checks(batch, {1: 5000, 2: 5000})
+
+    async with session_factory() as session:
+        assert (await session.get(User, 1)).level == 1
+        assert (await session.get(User, 2)).level > 1
+
+
+@pytest.mark.asyncio
+async def test_users_without_level_change_are_skipped(session_factory):
+    check = AsyncMock()
+    batch = {3: _PendingDelta(points=0.5)}
+    with patch.object(LevelService, "check_for_level_up", check):
+        await accumulator(session_factory)._run_progress_checks(batch, {3: 1.5})
+
+    check.assert_not_awaited()
@@ -0,0 +1,86 @@
+"""
+Tests del saldo atómico de PointService: el usuario sólo se carga cuando el
+nuevo saldo cambia su nivel y deduct_points devuelve el saldo resultante.
+"""
+from unittest.mock import patch
+
+import pytest
+import pytest_asyncio
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from database.base import Base
+from database.models import User
+from database.unit_of_work import unit_of_work
+from services.achievement_service import AchievementService
+from services.level_service import LevelService
+from services.point_service import PointService
+
+USER_ID = 1
+
+
+@pytest_asyncio.fixture
+async def session_factory():
+    engine = create_async_engine(
+        "sqlite+aiosqlite:///:memory:",
+        poolclass=StaticPool,
+        connect_args={"check_same_thread": False},
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with factory() as session:
+        session.add(User(id=USER_ID, points=0, level=1))
+        await session.commit()
+    yield factory
+    await engine.dispose()
+
+
+def point_service(session):
+    return PointService(session, LevelService(session), AchievementService(session))
+
+
+def user_loads(get):
+    return [call for call in get.call_args_list if call.args and call.args[0] is User]
+
+
+@pytest.mark.asyncio
+async def test_add_points_skips_user_load_without_level_change(session_factory):
+    async with session_factory() as session:
+        service = point_service(session)
+        with patch.object(session, "get", wraps=session.get) as get:
+            async with unit_of_work(session):
+                await service.add_points(USER_ID, 1)
+
+        assert user_loads(get) == []
+        assert await service.get_balance(USER_ID) == 1
+
+
+@pytest.mark.asyncio
+async def test_add_points_levels_up_when_threshold_is_crossed(session_factory):
+    async with session_factory() as session:
+        service = point_service(session)
+        async with unit_of_work(session):
+            await service.add_points(USER_ID, 5000)
+
+    async with session_factory() as session:
+        user = await session.get(User, USER_ID)
+        assert user.points == 5000
+        assert user.level > 1
+
+
+@pytest.mark.asyncio
+async def test_deduct_points_returns_the_new_balance(session_factory):
+    async with session_factory() as session:
+        service = point_service(session)
+        async with unit_of_work(session):
+            await service.add_points(USER_ID, 5)
+        async with unit_of_work(session):
+            assert await service.deduct_points(USER_ID, 2) == 3
+        async with unit_of_work(session):
+            assert await service.deduct_points(USER_ID, 10) is None
+        assert await service.get_balance(USER_ID) == 3
+        # Dejar el saldo a cero es un descuento válido, no un fallo
+        async with unit_of_work(session):
+            balance = await service.deduct_points(USER_ID, 3)
+        assert balance is not None and balance == 0
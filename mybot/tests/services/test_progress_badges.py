@@ -0,0 +1,79 @@
+"""
+Tests de las insignias que no dependen del contador de mensajes: completar
+una misión desbloquea las de misiones y usar un token las de invitaciones.
+"""
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from database.base import Base
+from database.models import Badge, InviteToken, Mission, User, UserBadge, UserStats
+from database.unit_of_work import unit_of_work
+from services.badge_engine import invalidate_badge_catalog
+from services.mission_service import MissionService
+from services.token_service import TokenService
+
+
+@pytest_asyncio.fixture
+async def session_factory():
+    engine = create_async_engine(
+        "sqlite+aiosqlite:///:memory:",
+        poolclass=StaticPool,
+        connect_args={"check_same_thread": False},
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with factory() as session:
+        for uid in (1, 2):
+            session.add(User(id=uid, points=0, level=1))
+            session.add(UserStats(user_id=uid, messages_sent=0))
+        session.add(Badge(name="Misionero", icon="🎯", condition_type="missions", condition_value=1))
+        session.add(Badge(name="Anfitrión", icon="🤝", condition_type="invites", condition_value=1))
+        await session.commit()
+    invalidate_badge_catalog()
+    yield factory
+    invalidate_badge_catalog()
+    await engine.dispose()
+
+
+async def badge_names(session_factory, user_id):
+    async with session_factory() as session:
+        stmt = select(Badge.name).join(UserBadge, UserBadge.badge_id == Badge.id).where(UserBadge.user_id == user_id)
+        return set((await session.execute(stmt)).scalars())
+
+
+def fake_bot():
+    bot = MagicMock()
+    bot.send_message = AsyncMock()
+    return bot
+
+
+@pytest.mark.asyncio
+async def test_completing_a_mission_awards_mission_badges(session_factory):
+    async with session_factory() as session:
+        session.add(Mission(id="m1", name="Primera", type="messages", target_value=1, reward_points=5))
+        await session.commit()
+
+        async with unit_of_work(session):
+            await MissionService(session).update_progress(1, "messages", bot=fake_bot(), _skip_notification=True)
+
+    assert await badge_names(session_factory, 1) == {"Misionero"}
+
+
+@pytest.mark.asyncio
+async def test_using_a_token_awards_invite_badges_to_the_inviter(session_factory):
+    bot = fake_bot()
+    async with session_factory() as session:
+        session.add(InviteToken(token="abc", created_by=1))
+        await session.commit()
+
+        assert await TokenService(session).use_token("abc", 2, bot=bot)
+
+    assert await badge_names(session_factory, 1) == {"Anfitrión"}
+    assert await badge_names(session_factory, 2) == set()
+    assert any("Anfitrión" in c.args[1] for c in bot.send_message.await_args_list)
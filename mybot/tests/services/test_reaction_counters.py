@@ -0,0 +1,103 @@
+"""
+Tests del ReactionCounterStore: ventana deslizante por horas y recarga
+periódica desde los recuentos por hora de button_reactions para incluir las
+reacciones de otras réplicas.
+"""
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+import pytest_asyncio
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from database.models import ButtonReaction
+from services.reaction_counters import ReactionCounterStore
+
+NOW = datetime(2026, 3, 2, 12, 30)
+
+
+@pytest_asyncio.fixture
+async def session_factory():
+    engine = create_async_engine(
+        "sqlite+aiosqlite:///:memory:",
+        poolclass=StaticPool,
+        connect_args={"check_same_thread": False},
+    )
+    # Sin claves foráneas en SQLite por defecto: basta con la tabla de reacciones
+    async with engine.begin() as conn:
+        await conn.run_sync(ButtonReaction.__table__.create)
+    yield async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    await engine.dispose()
+
+
+async def add_reactions(session_factory, *user_ids, when=None):
+    async with session_factory() as session:
+        for user_id in user_ids:
+            session.add(ButtonReaction(
+                message_id=1, user_id=user_id, reaction_type="👍",
+                created_at=when or datetime.utcnow(),
+            ))
+        await session.commit()
+
+
+def test_reactions_leave_the_window():
+    store = ReactionCounterStore(window_hours=3)
+    store.record(1, NOW - timedelta(hours=2))
+    store.record(1, NOW)
+    store.record(2, NOW, count=3)
+
+    assert store.top(2, now=NOW) == [(2, 3), (1, 2)]
+    assert store.count(1, now=NOW + timedelta(hours=1)) == 1
+    assert store.top(1, now=NOW + timedelta(hours=3)) == []
+
+
+def test_reactions_older_than_the_window_are_ignored():
+    store = ReactionCounterStore(window_hours=3)
+    store.record(1, NOW)
+    store.record(1, NOW - timedelta(hours=5))
+
+    assert store.count(1, now=NOW) == 1
+
+
+@pytest.mark.asyncio
+async def test_seed_replaces_counts_with_the_database(session_factory):
+    await add_reactions(session_factory, 1, 1, 2)
+    await add_reactions(session_factory, 3, when=datetime.utcnow() - timedelta(days=30))
+    store = ReactionCounterStore()
+    store.record(9)
+
+    await store.seed(session_factory)
+
+    assert store.loaded
+    assert store.top(5) == [(1, 2), (2, 1)]
+
+
+@pytest.mark.asyncio
+async def test_seed_keeps_the_hour_of_each_reaction(session_factory):
+    now = datetime.utcnow()
+    await add_reactions(session_factory, 1, 1, when=now - timedelta(hours=2))
+    await add_reactions(session_factory, 1, when=now)
+    store = ReactionCounterStore(window_hours=3)
+
+    await store.seed(session_factory)
+
+    assert store.count(1) == 3
+    # Las dos reacciones de hace dos horas salen de la ventana una hora después
+    assert store.count(1, now=now + timedelta(hours=1)) == 1
+
+
+@pytest.mark.asyncio
+async def test_reseeder_picks_up_reactions_from_other_replicas(session_factory):
+    store = ReactionCounterStore()
+    task = asyncio.create_task(store.run_reseeder(session_factory, interval=0.05))
+    await asyncio.sleep(0.01)
+    assert store.top(1) == []
+
+    # Otra réplica guarda la reacción; este proceso nunca llama a record()
+    await add_reactions(session_factory, 4)
+    await asyncio.sleep(0.1)
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+
+    assert store.top(1) == [(4, 1)]
@@ -0,0 +1,171 @@
+"""
+Tests del ReactionMarkupUpdater: una edición por ventana, reacciones durante
+la carga de conteos y errores de edición que no deben reintentarse.
+"""
+import asyncio
+import time
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+import pytest_asyncio
+from aiogram.exceptions import TelegramBadRequest
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from database.models import ButtonReaction
+from services.message_service import MessageService
+from services.reaction_markup import ReactionMarkupUpdater
+
+CHAT_ID = -100123
+WINDOW = 0.05
+
+
+def loader(counts, max_id=10, reactions=("👍", "❤️")):
+    async def load():
+        return list(reactions), dict(counts), max_id
+    return load
+
+
+@pytest.fixture
+def bot():
+    bot = AsyncMock()
+    bot.edit_message_reply_markup = AsyncMock()
+    return bot
+
+
+def bad_request(message: str) -> TelegramBadRequest:
+    return TelegramBadRequest(method=MagicMock(), message=message)
+
+
+@pytest.mark.asyncio
+async def test_burst_produces_few_edits(bot):
+    updater = ReactionMarkupUpdater(window=WINDOW)
+    await updater.seed(1, CHAT_ID, loader({"👍": 2}))
+
+    for reaction_id in range(11, 31):
+        updater.record(1, "👍", reaction_id)
+        updater.schedule(bot, 1)
+        await asyncio.sleep(WINDOW / 10)
+    await asyncio.sleep(WINDOW * 3)
+
+    assert bot.edit_message_reply_markup.call_count <= 4
+    assert updater.counts(1) == {"👍": 22}
+    # El último teclado enviado muestra el conteo final
+    assert updater._posts[1].rendered == {"👍": 22}
+    # chat_id entero: el OutboundMiddleware aplica el límite por grupo/canal
+    assert bot.edit_message_reply_markup.call_args.kwargs["chat_id"] == CHAT_ID
+
+
+@pytest.mark.asyncio
+async def test_unchanged_counts_skip_edit(bot):
+    updater = ReactionMarkupUpdater(window=WINDOW)
+    await updater.seed(1, CHAT_ID, loader({"👍": 2}))
+    updater.schedule(bot, 1)
+    await asyncio.sleep(WINDOW)
+    updater.schedule(bot, 1)
+    await asyncio.sleep(WINDOW * 2)
+
+    assert bot.edit_message_reply_markup.call_count == 1
+    assert updater.get_metrics()["skipped"] == 1
+
+
+@pytest.mark.asyncio
+async def test_reactions_during_seed_are_counted_once(bot):
+    updater = ReactionMarkupUpdater(window=WINDOW)
+    release = asyncio.Event()
+
+    async def slow_load():
+        await release.wait()
+        # La consulta ya vio la reacción 11, pero no la 12
+        return ["👍"], {"👍": 3}, 11
+
+    seeding = asyncio.create_task(updater.seed(1, CHAT_ID, slow_load))
+    await asyncio.sleep(0)
+    updater.record(1, "👍", 11)
+    updater.record(1, "👍", 12)
+    release.set()
+    await seeding
+
+    assert updater.counts(1) == {"👍": 4}
+
+
+@pytest.mark.asyncio
+async def test_deleted_post_is_forgotten(bot):
+    updater = ReactionMarkupUpdater(window=WINDOW)
+    await updater.seed(1, CHAT_ID, loader({"👍": 1}))
+    updater.schedule(bot, 1)
+    await asyncio.sleep(WINDOW * 2)
+    bot.edit_message_reply_markup.side_effect = bad_request("message to edit not found")
+
+    updater.record(1, "👍", 11)
+    updater.schedule(bot, 1)
+    await asyncio.sleep(WINDOW * 6)
+
+    assert bot.edit_message_reply_markup.call_count == 2
+    assert not updater.is_seeded(1)
+
+
+@pytest.mark.asyncio
+async def test_failed_edit_is_not_retried_every_window(bot):
+    updater = ReactionMarkupUpdater(window=WINDOW)
+    await updater.seed(1, CHAT_ID, loader({"👍": 1}))
+    updater.schedule(bot, 1)
+    await asyncio.sleep(WINDOW * 2)
+    bot.edit_message_reply_markup.side_effect = bad_request("chat not found or rights missing")
+
+    updater.record(1, "👍", 11)
+    updater.schedule(bot, 1)
+    await asyncio.sleep(WINDOW * 6)
+
+    assert bot.edit_message_reply_markup.call_count == 2
+    assert updater.get_metrics()["failed"] == 1
+
+
+@pytest.mark.asyncio
+async def test_lru_eviction_cancels_scheduled_edit(bot):
+    updater = ReactionMarkupUpdater(window=1, max_messages=2)
+    for message_id in (1, 2):
+        await updater.seed(message_id, CHAT_ID, loader({"👍": 1}))
+    # Edición pendiente del post 1 (el menos reciente) para dentro de una ventana
+    updater._posts[1].counts["👍"] = 2
+    updater._posts[1].last_edit = time.monotonic()
+    updater.schedule(bot, 1)
+
+    await updater.seed(3, CHAT_ID, loader({"👍": 1}))
+
+    assert not updater.is_seeded(1)
+    assert updater.is_seeded(3)
+    await updater.shutdown()
+    bot.edit_message_reply_markup.assert_not_called()
+
+
+@pytest_asyncio.fixture
+async def session():
+    engine = create_async_engine(
+        "sqlite+aiosqlite:///:memory:",
+        poolclass=StaticPool,
+        connect_args={"check_same_thread": False},
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(ButtonReaction.__table__.create)
+    async with async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)() as session:
+        yield session
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_load_reaction_state_counts_up_to_max_id(session, bot):
+    for user_id, reaction_type in ((1, "👍"), (2, "👍"), (3, "❤️")):
+        session.add(ButtonReaction(message_id=7, user_id=user_id, reaction_type=reaction_type))
+    session.add(ButtonReaction(message_id=8, user_id=1, reaction_type="👍"))
+    await session.commit()
+    service = MessageService(session, bot)
+    service.channel_service.get_reactions_and_points = AsyncMock(return_value=(["👍", "❤️"], {}))
+
+    reactions, counts, max_id = await service._load_reaction_state(CHAT_ID, 7)
+
+    assert reactions == ["👍", "❤️"]
+    assert counts == {"👍": 2, "❤️": 1}
+    assert max_id == 3
+    # Una reacción con id por encima de max_id no entra en los conteos
+    assert await service.get_reaction_counts(7, up_to_id=2) == {"👍": 2}
@@ -0,0 +1,105 @@
+"""
+Tests de los avisos de recompensa dentro de una unidad de trabajo: sólo se
+envían cuando la sesión confirma y se descartan si hace rollback.
+"""
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+import pytest_asyncio
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from database.base import Base
+from database.models import User
+from database.unit_of_work import savepoint, unit_of_work
+from services.level_service import LevelService
+from services.outbound_dispatcher import notify_after_commit
+
+
+@pytest_asyncio.fixture
+async def session_factory():
+    engine = create_async_engine(
+        "sqlite+aiosqlite:///:memory:",
+        poolclass=StaticPool,
+        connect_args={"check_same_thread": False},
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with factory() as session:
+        session.add(User(id=1, points=5000, level=1))
+        await session.commit()
+    yield factory
+    await engine.dispose()
+
+
+def fake_bot():
+    bot = MagicMock()
+    bot.send_message = AsyncMock()
+    return bot
+
+
+async def drain():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+@pytest.mark.asyncio
+async def test_level_up_is_announced_after_commit(session_factory):
+    bot = fake_bot()
+    async with session_factory() as session:
+        async with unit_of_work(session):
+            user = await session.get(User, 1)
+            assert await LevelService(session).check_for_level_up(user, bot=bot)
+            await drain()
+            bot.send_message.assert_not_awaited()
+        await drain()
+
+    assert bot.send_message.await_count >= 1
+    assert bot.send_message.await_args_list[0].args[0] == 1
+
+
+@pytest.mark.asyncio
+async def test_rolled_back_level_up_is_not_announced(session_factory):
+    bot = fake_bot()
+    async with session_factory() as session:
+        with pytest.raises(RuntimeError):
+            async with unit_of_work(session):
+                user = await session.get(User, 1)
+                await LevelService(session).check_for_level_up(user, bot=bot)
+                raise RuntimeError("boom")
+        await drain()
+
+    bot.send_message.assert_not_awaited()
+    async with session_factory() as session:
+        assert (await session.get(User, 1)).level == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_savepoint_keeps_earlier_messages(session_factory):
+    bot = fake_bot()
+    async with session_factory() as session:
+        async with unit_of_work(session):
+            user = await session.get(User, 1)
+            user.points = 10
+            await session.flush()
+            await notify_after_commit(session, bot, 1, "first")
+            with pytest.raises(RuntimeError):
+                async with savepoint(session):
+                    user.points = 20
+                    await session.flush()
+                    raise RuntimeError("boom")
+            await notify_after_commit(session, bot, 1, "second")
+        await drain()
+
+    assert [c.args[1] for c in bot.send_message.await_args_list] == ["first", "second"]
+
+
+@pytest.mark.asyncio
+async def test_sent_immediately_outside_a_unit_of_work(session_factory):
+    bot = fake_bot()
+    async with session_factory() as session:
+        await notify_after_commit(session, bot, 1, "hola")
+
+    bot.send_message.assert_awaited_once_with(1, "hola")
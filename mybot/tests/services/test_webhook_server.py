@@ -0,0 +1,107 @@
+"""
+Tests del QueuedRequestHandler: orden por usuario/chat, una ráfaga de un chat
+no bloquea a los demás workers y 503 cuando se alcanza WEBHOOK_QUEUE_SIZE.
+"""
+import asyncio
+import json
+from collections import defaultdict
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from services.webhook_server import QueuedRequestHandler, update_key
+
+
+def message(update_id, chat_id):
+    return {
+        "update_id": update_id,
+        "message": {"message_id": update_id, "chat": {"id": chat_id}, "from": {"id": chat_id}},
+    }
+
+
+def request_for(update):
+    request = MagicMock()
+    request.json = AsyncMock(return_value=update)
+    return request
+
+
+class Recorder:
+    """Fake feed that records processing order and can hold one chat."""
+
+    def __init__(self, hold_chat=None):
+        self.order = defaultdict(list)
+        self.hold_chat = hold_chat
+        self.release = asyncio.Event()
+
+    async def __call__(self, bot, update):
+        _, chat_id = update_key(update)
+        if chat_id == self.hold_chat:
+            await self.release.wait()
+        else:
+            await asyncio.sleep(0)
+        self.order[chat_id].append(update["update_id"])
+
+
+def handler(feed, *, workers=4, queue_size=100):
+    bot = MagicMock()
+    bot.session.json_loads = json.loads
+    bot.session.json_dumps = json.dumps
+    h = QueuedRequestHandler(MagicMock(), bot, secret_token=None, max_concurrency=workers, queue_size=queue_size)
+    h._background_feed_update = feed
+    return h
+
+
+async def post(h, update):
+    return await h._handle_request_background(h.bot, request_for(update))
+
+
+def test_update_key_prefers_the_sender():
+    assert update_key(message(1, 42)) == ("from", 42)
+    assert update_key({"update_id": 1, "poll": {"id": "x"}}) is None
+
+
+@pytest.mark.asyncio
+async def test_updates_of_a_chat_keep_their_order():
+    feed = Recorder()
+    h = handler(feed)
+    h.start()
+    for update_id in range(30):
+        await post(h, message(update_id, chat_id=update_id % 3))
+    await h.close()
+
+    for chat_id in range(3):
+        assert feed.order[chat_id] == [u for u in range(30) if u % 3 == chat_id]
+    assert h.get_metrics()["processed"] == 30
+
+
+@pytest.mark.asyncio
+async def test_busy_chat_does_not_park_other_workers():
+    feed = Recorder(hold_chat=1)
+    h = handler(feed, workers=2)
+    h.start()
+    for update_id in range(10):
+        await post(h, message(update_id, chat_id=1))
+    await post(h, message(100, chat_id=2))
+    await asyncio.sleep(0.05)
+
+    # El chat 1 ocupa un solo worker y el otro atiende al chat 2
+    assert feed.order[2] == [100]
+    assert h.get_metrics()["parked"] == 9
+    feed.release.set()
+    await h.close()
+    assert feed.order[1] == list(range(10))
+
+
+@pytest.mark.asyncio
+async def test_full_queue_answers_503():
+    feed = Recorder(hold_chat=1)
+    h = handler(feed, workers=1, queue_size=3)
+    h.start()
+    responses = [await post(h, message(update_id, chat_id=1)) for update_id in range(4)]
+
+    assert [r.status for r in responses] == [200, 200, 200, 503]
+    assert responses[-1].headers["Retry-After"]
+    assert h.get_metrics()["rejected"] == 1
+    feed.release.set()
+    await h.close()
+    assert (await post(h, message(9, chat_id=1))).status == 200
@@ -0,0 +1,59 @@
+"""
+Tests del TokenBucket: ráfaga inicial, reposición según el ritmo y pausa por
+retry_after compartida por todos los que usan el mismo bucket.
+"""
+import asyncio
+import time
+
+import pytest
+
+from utils.rate_limiter import TokenBucket
+
+
+def test_burst_up_to_capacity():
+    bucket = TokenBucket(rate=1, capacity=3)
+
+    assert [bucket.try_acquire() for _ in range(4)] == [True, True, True, False]
+
+
+def test_capacity_defaults_to_rate_with_a_minimum_of_one():
+    assert TokenBucket(rate=20).capacity == 20
+    assert TokenBucket(rate=0.5).capacity == 1
+
+
+def test_tokens_refill_at_rate(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    bucket = TokenBucket(rate=2, capacity=1)
+
+    assert bucket.try_acquire()
+    assert not bucket.try_acquire()
+    assert bucket.delay() == pytest.approx(0.5)
+    now[0] += 0.5
+    assert bucket.try_acquire()
+
+
+def test_pause_blocks_until_it_ends(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    bucket = TokenBucket(rate=100, capacity=100)
+
+    bucket.pause(5)
+    assert not bucket.try_acquire()
+    assert bucket.delay() == pytest.approx(5)
+    # Una pausa más corta no acorta la que ya está en curso
+    bucket.pause(1)
+    assert bucket.delay() == pytest.approx(5)
+    now[0] += 5
+    assert bucket.try_acquire()
+
+
+@pytest.mark.asyncio
+async def test_acquire_waits_for_a_token():
+    bucket = TokenBucket(rate=50, capacity=1)
+    await bucket.acquire()
+
+    started = time.monotonic()
+    await asyncio.wait_for(bucket.acquire(), timeout=1)
+
+    assert time.monotonic() - started >= 0.015
@@ -0,0 +1,68 @@
+"""
+Tests de utils.timer_wheel.
+"""
+from utils.timer_wheel import TimerWheel
+
+
+def test_fires_at_deadline():
+    wheel = TimerWheel(tick=1.0, slots=8)
+    wheel._current = 100
+    wheel.schedule_at("a", 103.0)
+    wheel.schedule_at("b", 105.5)
+
+    assert wheel.advance(102.0) == []
+    assert wheel.advance(103.0) == ["a"]
+    assert "a" not in wheel
+    assert wheel.advance(106.0) == ["b"]
+    assert len(wheel) == 0
+
+
+def test_reschedule_replaces_deadline():
+    wheel = TimerWheel(tick=1.0, slots=8)
+    wheel._current = 100
+    wheel.schedule_at("a", 102.0)
+    wheel.schedule_at("a", 104.0)
+
+    assert wheel.advance(103.0) == []
+    assert wheel.deadline("a") == 104.0
+    assert wheel.advance(104.0) == ["a"]
+
+
+def test_cancel():
+    wheel = TimerWheel(tick=1.0, slots=8)
+    wheel._current = 100
+    wheel.schedule_at("a", 102.0)
+    wheel.cancel("a")
+    wheel.cancel("missing")
+
+    assert wheel.advance(110.0) == []
+    assert len(wheel) == 0
+
+
+def test_deadline_beyond_one_turn_waits_for_its_round():
+    wheel = TimerWheel(tick=1.0, slots=4)
+    wheel._current = 100
+    # Misma ranura que 102, pero dos vueltas después
+    wheel.schedule_at("far", 110.0)
+
+    assert wheel.advance(102.0) == []
+    assert wheel.advance(106.0) == []
+    assert wheel.advance(110.0) == ["far"]
+
+
+def test_past_deadline_fires_on_next_tick():
+    wheel = TimerWheel(tick=1.0, slots=8)
+    wheel._current = 100
+    wheel.schedule_at("late", 50.0)
+
+    assert wheel.deadline("late") == 101.0
+    assert wheel.advance(101.0) == ["late"]
+
+
+def test_long_pause_fires_everything_due():
+    wheel = TimerWheel(tick=1.0, slots=4)
+    wheel._current = 100
+    for offset in range(1, 10):
+        wheel.schedule_at(offset, 100.0 + offset)
+
+    assert sorted(wheel.advance(200.0)) == list(range(1, 10))
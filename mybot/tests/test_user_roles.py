@@ -0,0 +1,85 @@
+"""
+Tests de la caché de roles: los fallos al consultar el canal VIP no se
+guardan y el rol cacheado se invalida al cambiar el estado de admin.
+"""
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from aiogram.exceptions import TelegramNetworkError
+
+from services.admin_service import AdminService
+from utils import user_roles
+from utils.user_roles import clear_role_cache, get_user_role, get_user_roles, is_vip_member
+
+USER_ID = 555
+VIP_CHANNEL_ID = -100999
+
+
+@pytest.fixture(autouse=True)
+def clean_cache():
+    clear_role_cache()
+    with patch.object(user_roles, "VIP_CHANNEL_ID", VIP_CHANNEL_ID), \
+         patch.object(user_roles, "ADMIN_IDS", []):
+        yield
+    clear_role_cache()
+
+
+def bot_with(*outcomes):
+    bot = MagicMock()
+    bot.get_chat_member = AsyncMock(side_effect=list(outcomes))
+    return bot
+
+
+def member(status):
+    return MagicMock(status=status)
+
+
+def network_error():
+    return TelegramNetworkError(method=MagicMock(), message="timeout")
+
+
+@pytest.mark.asyncio
+async def test_failed_membership_check_is_not_cached():
+    bot = bot_with(network_error(), member("member"))
+
+    assert await is_vip_member(bot, USER_ID) is False
+    assert await is_vip_member(bot, USER_ID) is True
+    assert bot.get_chat_member.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_membership_result_is_cached():
+    bot = bot_with(member("left"))
+
+    assert await is_vip_member(bot, USER_ID) is False
+    assert await is_vip_member(bot, USER_ID) is False
+    assert bot.get_chat_member.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_role_from_failed_check_is_not_cached():
+    bot = bot_with(network_error(), member("member"))
+
+    assert await get_user_role(bot, USER_ID) == "free"
+    assert await get_user_role(bot, USER_ID) == "vip"
+
+
+@pytest.mark.asyncio
+async def test_bulk_roles_skip_cache_on_failed_check():
+    bot = bot_with(network_error(), member("creator"))
+
+    assert await get_user_roles(bot, [USER_ID]) == {USER_ID: "free"}
+    assert await get_user_roles(bot, [USER_ID]) == {USER_ID: "vip"}
+
+
+@pytest.mark.asyncio
+async def test_admin_promotion_clears_cached_role():
+    bot = bot_with(member("left"))
+    assert await get_user_role(bot, USER_ID) == "free"
+
+    session = MagicMock()
+    session.get = AsyncMock(return_value=MagicMock(role="free"))
+    session.commit = AsyncMock()
+    await AdminService(session).ensure_admin_user(USER_ID)
+
+    assert user_roles._ROLE_CACHE.get(USER_ID) is None
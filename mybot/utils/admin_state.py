@@ -199,3 +199,10 @@ class AdminGrantVipStates(StatesGroup):
     waiting_for_duration = State()
     waiting_for_reason = State()
     confirming_grant = State()
+
+
+class AdminBroadcastStates(StatesGroup):
+    """States for sending a broadcast to users."""
+
+    waiting_for_text = State()
+    confirming = State()
@@ -16,6 +16,9 @@ from utils.message_utils import get_profile_message, get_ranking_message
 from services.mission_service import MissionService
 from services.reward_service import RewardSystem as RewardService
 from services.point_service import PointService
+from services.level_service import LevelService
+from services.achievement_service import AchievementService
+from utils.messages import BOT_MESSAGES
 from keyboards.auction_kb import get_auction_main_kb
 
 async def create_profile_menu(user_id: int, session: AsyncSession) -> Tuple[str, InlineKeyboardMarkup]:
@@ -89,8 +92,13 @@ async def create_auction_menu(user_id: int, session: AsyncSession) -> Tuple[str,
 
 async def create_ranking_menu(user_id: int, session: AsyncSession) -> Tuple[str, InlineKeyboardMarkup]:
     """Create the ranking menu for a user."""
-    point_service = PointService(session)
+    point_service = PointService(session, LevelService(session), AchievementService(session))
     top_users = await point_service.get_top_users(limit=10)
     
     ranking_text = await get_ranking_message(top_users, user_id)
+    if top_users and user_id not in {user.id for user in top_users}:
+        rank = await point_service.get_user_rank(user_id)
+        if rank:
+            points = await point_service.get_balance(user_id)
+            ranking_text += "\n" + BOT_MESSAGES["ranking_your_position"].format(rank=rank, points=points)
     return ranking_text, get_ranking_keyboard()
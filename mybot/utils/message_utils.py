@@ -3,6 +3,7 @@ from database.models import User, Mission, Reward, UserAchievement
 from services.level_service import LevelService
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
+from sqlalchemy.orm.util import identity_key
 from services.achievement_service import ACHIEVEMENTS
 from utils.messages import BOT_MESSAGES
 from utils.text_utils import anonymize_username
@@ -131,12 +132,35 @@ async def get_ranking_message(users_ranking: list[User], viewer_user_id: int) ->
     return ranking_text
 
 
+async def load_user_names(session: AsyncSession, user_ids: list[int]) -> dict:
+    """
+    Load the name fields of several users at once for display purposes.
+    Users already in the session are reused, so at most one query is issued.
+    """
+    users: dict = {}
+    missing = []
+    for user_id in user_ids:
+        cached = session.identity_map.get(identity_key(User, user_id))
+        if cached is not None:
+            users[user_id] = cached
+        else:
+            missing.append(user_id)
+    if missing:
+        stmt = select(User.id, User.username, User.first_name, User.last_name).where(
+            User.id.in_(missing)
+        )
+        for row in (await session.execute(stmt)).all():
+            users[row.id] = row
+    return users
+
+
 async def get_weekly_reaction_ranking_message(ranking: list[tuple[int, int]], session: AsyncSession, viewer_user_id: int) -> str:
     text = BOT_MESSAGES["weekly_ranking_title"] + "\n\n"
     if not ranking:
         return text + BOT_MESSAGES["no_ranking_data"]
+    users = await load_user_names(session, [user_id for user_id, _ in ranking])
     for idx, (user_id, count) in enumerate(ranking):
-        user = await session.get(User, user_id)
+        user = users.get(user_id)
         display_name = anonymize_username(user, viewer_user_id)
         text += BOT_MESSAGES["weekly_ranking_entry"].format(rank=idx + 1, username=display_name, count=count) + "\n"
     return text
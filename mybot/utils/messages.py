@@ -38,6 +38,7 @@ BUTLER_MESSAGES = {
     "ranking_title": "🏆 *Tabla de Posiciones*",
     "ranking_entry": "#{rank}. @{username} - Puntos: `{points}`, Nivel: `{level}`",
     "no_ranking_data": "Aún no hay datos en el ranking. Sea usted el primero en aparecer.",
+    "ranking_your_position": "📍 Su posición: #{rank} con `{points}` puntos",
     "no_active_subscription": "No tiene una suscripción activa.",
 }
 
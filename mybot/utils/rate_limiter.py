@@ -0,0 +1,49 @@
+import asyncio
+import time
+
+
+class TokenBucket:
+    """Async token bucket: ``rate`` tokens per second, bursts up to ``capacity``.
+
+    ``pause`` blocks every caller for a while, which is how a Telegram
+    ``retry_after`` is honoured by everything sharing the bucket.
+    """
+
+    def __init__(self, rate: float, capacity: float | None = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._resume_at = 0.0
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, tokens: float = 1) -> bool:
+        """Take ``tokens`` if available right now."""
+        now = time.monotonic()
+        if now < self._resume_at:
+            return False
+        self._refill(now)
+        if self._tokens >= tokens:
+            self._tokens -= tokens
+            return True
+        return False
+
+    def delay(self, tokens: float = 1) -> float:
+        """Seconds until ``tokens`` would be available."""
+        now = time.monotonic()
+        self._refill(now)
+        wait = max(0.0, (tokens - self._tokens) / self.rate) if self.rate > 0 else 0.0
+        return max(wait, self._resume_at - now)
+
+    async def acquire(self, tokens: float = 1) -> None:
+        """Wait until ``tokens`` can be taken and take them."""
+        while not self.try_acquire(tokens):
+            await asyncio.sleep(self.delay(tokens))
+
+    def pause(self, seconds: float) -> None:
+        """Stop handing out tokens for ``seconds``."""
+        self._resume_at = max(self._resume_at, time.monotonic() + seconds)
+        self._tokens = 0.0
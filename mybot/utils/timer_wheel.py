@@ -0,0 +1,66 @@
+import math
+import time
+from typing import Dict, Hashable, List, Optional, Set
+
+
+class TimerWheel:
+    """Hashed timer wheel: O(1) schedule/cancel for many short deadlines.
+
+    Deadlines are rounded up to ``tick`` seconds and stored in one of
+    ``slots`` buckets. Deadlines further away than one turn stay in their
+    slot until the wheel has gone round enough times. Rescheduling a key
+    replaces its previous deadline.
+    """
+
+    def __init__(self, tick: float, slots: int = 256):
+        self.tick = tick
+        self._slots: List[Set[Hashable]] = [set() for _ in range(slots)]
+        self._deadlines: Dict[Hashable, int] = {}
+        self._current = self._tick_of(time.monotonic())
+
+    def __len__(self) -> int:
+        return len(self._deadlines)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._deadlines
+
+    def _tick_of(self, moment: float) -> int:
+        return math.ceil(moment / self.tick)
+
+    def schedule(self, key: Hashable, delay: float) -> None:
+        """Fire ``key`` ``delay`` seconds from now."""
+        self.schedule_at(key, time.monotonic() + delay)
+
+    def schedule_at(self, key: Hashable, moment: float) -> None:
+        """Fire ``key`` at the monotonic time ``moment``."""
+        self.cancel(key)
+        due = max(self._current + 1, self._tick_of(moment))
+        self._deadlines[key] = due
+        self._slots[due % len(self._slots)].add(key)
+
+    def cancel(self, key: Hashable) -> None:
+        due = self._deadlines.pop(key, None)
+        if due is not None:
+            self._slots[due % len(self._slots)].discard(key)
+
+    def deadline(self, key: Hashable) -> Optional[float]:
+        """Monotonic time at which ``key`` fires, or None."""
+        due = self._deadlines.get(key)
+        return due * self.tick if due is not None else None
+
+    def advance(self, now: Optional[float] = None) -> List[Hashable]:
+        """Move the wheel to ``now`` and return the keys that fired."""
+        target = math.floor((time.monotonic() if now is None else now) / self.tick)
+        if target <= self._current:
+            return []
+        # Tras un parón largo basta con recorrer cada ranura una vez
+        start = max(self._current + 1, target - len(self._slots) + 1)
+        fired = []
+        for tick in range(start, target + 1):
+            slot = self._slots[tick % len(self._slots)]
+            for key in [k for k in slot if self._deadlines[k] <= target]:
+                slot.discard(key)
+                del self._deadlines[key]
+                fired.append(key)
+        self._current = target
+        return fired
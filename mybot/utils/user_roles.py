@@ -1,11 +1,12 @@
 from aiogram import Bot
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from .config import ADMIN_IDS, VIP_CHANNEL_ID
+from .config import ADMIN_IDS, VIP_CHANNEL_ID, Config
 from database.models import User, VipSubscription
 import os
 import time
-from typing import Dict, Tuple
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
 from datetime import datetime
 import logging
 
@@ -13,8 +14,52 @@ logger = logging.getLogger(__name__)
 
 DEFAULT_VIP_MULTIPLIER = int(os.environ.get("VIP_POINTS_MULTIPLIER", "2"))
 
-# Cache user roles for a short time to avoid repeated API calls
-_ROLE_CACHE: Dict[int, Tuple[str, float]] = {}
+_CHANNEL_MEMBER_STATUSES = {"member", "administrator", "creator"}
+
+
+class RoleCache:
+    """Size-bounded LRU cache whose entries expire after ``ttl`` seconds.
+
+    Negative results ("free", not VIP) are cached like any other value, so
+    users outside the VIP channel don't trigger a Telegram call per update.
+    Results of a membership check that failed are not cached.
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[int, Tuple[object, float]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, user_id: int):
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if time.monotonic() >= expires_at:
+            del self._entries[user_id]
+            return None
+        self._entries.move_to_end(user_id)
+        return value
+
+    def set(self, user_id: int, value) -> None:
+        self._entries[user_id] = (value, time.monotonic() + self.ttl)
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def pop(self, user_id: int) -> None:
+        self._entries.pop(user_id, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+# Rol resuelto (admin, vip o free) y estado VIP por usuario
+_ROLE_CACHE = RoleCache(Config.ROLE_CACHE_MAX_SIZE, Config.ROLE_CACHE_TTL)
+_VIP_CACHE = RoleCache(Config.ROLE_CACHE_MAX_SIZE, Config.ROLE_CACHE_TTL)
 
 
 async def is_admin(user_id: int, session: AsyncSession | None = None) -> bool:
@@ -22,7 +67,7 @@ async def is_admin(user_id: int, session: AsyncSession | None = None) -> bool:
     # Primero verificar en la lista estática de admins
     if user_id in ADMIN_IDS:
         return True
-    
+
     # Si tenemos sesión, verificar en la base de datos
     if session:
         try:
@@ -32,15 +77,41 @@ async def is_admin(user_id: int, session: AsyncSession | None = None) -> bool:
             return result.scalar_one_or_none() or False
         except Exception as e:
             logger.error(f"Error checking admin status in DB: {e}")
-    
+
     return False
 
 
+def _subscription_active(expires_at: Optional[datetime], now: datetime) -> bool:
+    return expires_at is None or expires_at > now
 
-async def is_vip_member(bot: Bot, user_id: int, session: AsyncSession | None = None) -> bool:
-    """Check if the user should be considered a VIP."""
+
+async def _resolve_vip_channel_id(session: AsyncSession | None) -> int:
     from services.config_service import ConfigService
 
+    vip_channel_id = VIP_CHANNEL_ID
+    if session:
+        try:
+            stored_vip_id = await ConfigService(session).get_vip_channel_id()
+            if stored_vip_id is not None:
+                vip_channel_id = stored_vip_id
+        except Exception as e:
+            logger.error(f"Error getting VIP channel ID from config: {e}")
+    return vip_channel_id
+
+
+async def _is_channel_member(bot: Bot, vip_channel_id: int, user_id: int) -> Optional[bool]:
+    """Return channel membership, or None if Telegram could not be asked."""
+    try:
+        member = await bot.get_chat_member(vip_channel_id, user_id)
+        is_member = member.status in _CHANNEL_MEMBER_STATUSES
+        logger.debug(f"User {user_id} channel membership check: {is_member} (status: {member.status})")
+        return is_member
+    except Exception as e:
+        logger.warning(f"Error checking channel membership for user {user_id}: {e}")
+        return None
+
+
+async def _check_vip_member(bot: Bot, user_id: int, session: AsyncSession | None) -> Optional[bool]:
     # First check database subscription status
     if session:
         try:
@@ -48,7 +119,7 @@ async def is_vip_member(bot: Bot, user_id: int, session: AsyncSession | None = N
             user = await session.get(User, user_id)
             if user and user.role == "vip":
                 # Check if subscription is still valid
-                if user.vip_expires_at is None or user.vip_expires_at > datetime.utcnow():
+                if _subscription_active(user.vip_expires_at, datetime.utcnow()):
                     logger.debug(f"User {user_id} is VIP via database record")
                     return True
                 else:
@@ -56,13 +127,13 @@ async def is_vip_member(bot: Bot, user_id: int, session: AsyncSession | None = N
                     user.role = "free"
                     await session.commit()
                     logger.info(f"User {user_id} VIP subscription expired, updated to free")
-            
+
             # Also check VipSubscription table
-            stmt = select(VipSubscription).where(VipSubscription.user_id == user_id)
+            stmt = select(VipSubscription.expires_at).where(VipSubscription.user_id == user_id)
             result = await session.execute(stmt)
-            subscription = result.scalar_one_or_none()
-            if subscription:
-                if subscription.expires_at is None or subscription.expires_at > datetime.utcnow():
+            row = result.first()
+            if row:
+                if _subscription_active(row.expires_at, datetime.utcnow()):
                     logger.debug(f"User {user_id} is VIP via subscription table")
                     return True
                 else:
@@ -71,28 +142,27 @@ async def is_vip_member(bot: Bot, user_id: int, session: AsyncSession | None = N
             logger.error(f"Error checking VIP status in database for user {user_id}: {e}")
 
     # Fallback to channel membership check
-    vip_channel_id = VIP_CHANNEL_ID
-    if session:
-        try:
-            config_service = ConfigService(session)
-            stored_vip_id = await config_service.get_vip_channel_id()
-            if stored_vip_id is not None:
-                vip_channel_id = stored_vip_id
-        except Exception as e:
-            logger.error(f"Error getting VIP channel ID from config: {e}")
-
+    vip_channel_id = await _resolve_vip_channel_id(session)
     if not vip_channel_id:
         logger.debug(f"No VIP channel configured, user {user_id} is not VIP")
         return False
+    return await _is_channel_member(bot, vip_channel_id, user_id)
 
-    try:
-        member = await bot.get_chat_member(vip_channel_id, user_id)
-        is_member = member.status in {"member", "administrator", "creator"}
-        logger.debug(f"User {user_id} channel membership check: {is_member} (status: {member.status})")
-        return is_member
-    except Exception as e:
-        logger.warning(f"Error checking channel membership for user {user_id}: {e}")
-        return False
+
+async def _vip_status(bot: Bot, user_id: int, session: AsyncSession | None) -> Optional[bool]:
+    cached = _VIP_CACHE.get(user_id)
+    if cached is not None:
+        return cached
+    is_member = await _check_vip_member(bot, user_id, session)
+    # Un fallo de Telegram no se guarda: la siguiente actualización vuelve a preguntar
+    if is_member is not None:
+        _VIP_CACHE.set(user_id, is_member)
+    return is_member
+
+
+async def is_vip_member(bot: Bot, user_id: int, session: AsyncSession | None = None) -> bool:
+    """Check if the user should be considered a VIP."""
+    return bool(await _vip_status(bot, user_id, session))
 
 
 async def get_points_multiplier(bot: Bot, user_id: int, session: AsyncSession | None = None) -> int:
@@ -110,42 +180,119 @@ async def get_user_role(
     bot: Bot, user_id: int, session: AsyncSession | None = None
 ) -> str:
     """Return the role for the given user (admin, vip or free)."""
-    now = time.time()
+    # Los admins estáticos no necesitan caché ni consultas
+    if user_id in ADMIN_IDS:
+        return "admin"
+
     cached = _ROLE_CACHE.get(user_id)
-    
-    # Use cache only for non-admin users and only for 2 minutes
-    if cached and now < cached[1] and not await is_admin(user_id, session):
-        logger.debug(f"Using cached role for user {user_id}: {cached[0]}")
-        return cached[0]
+    if cached is not None:
+        logger.debug(f"Using cached role for user {user_id}: {cached}")
+        return cached
 
     # Check admin first (highest priority)
     if await is_admin(user_id, session):
         role = "admin"
-        _ROLE_CACHE[user_id] = (role, now + 120)  # cache for 2 minutes
         logger.debug(f"User {user_id} is admin")
-        return role
-    
-    # Check VIP status
-    try:
-        if await is_vip_member(bot, user_id, session=session):
-            role = "vip"
-            logger.debug(f"User {user_id} is VIP")
-        else:
-            role = "free"
-            logger.debug(f"User {user_id} is free user")
-    except Exception as e:
-        logger.error(f"Error determining user role for {user_id}: {e}")
-        role = "free"
+    else:
+        # Check VIP status
+        try:
+            is_member = await _vip_status(bot, user_id, session)
+        except Exception as e:
+            logger.error(f"Error determining user role for {user_id}: {e}")
+            is_member = None
+        if is_member is None:
+            # Rol provisional sin caché hasta que la comprobación funcione
+            return "free"
+        role = "vip" if is_member else "free"
+        logger.debug(f"User {user_id} is {role}")
 
-    _ROLE_CACHE[user_id] = (role, now + 120)  # cache for 2 minutes
+    _ROLE_CACHE.set(user_id, role)
     return role
 
 
+async def get_user_roles(
+    bot: Bot, user_ids: Iterable[int], session: AsyncSession | None = None
+) -> Dict[int, str]:
+    """Return the role of many users at once.
+
+    Cached and static admins are answered from memory. The rest are resolved
+    with one query on ``users`` and one on ``vip_subscriptions``; only users
+    that are neither admin nor VIP in the database fall back to a channel
+    membership call. Users whose membership call fails are returned as free
+    but not cached. Expired roles are not rewritten here, the VIP scheduler
+    takes care of that.
+    """
+    roles: Dict[int, str] = {}
+    pending = []
+    for user_id in dict.fromkeys(user_ids):
+        if user_id in ADMIN_IDS:
+            roles[user_id] = "admin"
+            continue
+        cached = _ROLE_CACHE.get(user_id)
+        if cached is not None:
+            roles[user_id] = cached
+        else:
+            pending.append(user_id)
+    if not pending:
+        return roles
+
+    unresolved = list(pending)
+    failed = set()
+    if session:
+        try:
+            now = datetime.utcnow()
+            user_rows = await session.execute(
+                select(User.id, User.is_admin, User.role, User.vip_expires_at).where(
+                    User.id.in_(pending)
+                )
+            )
+            for row in user_rows:
+                if row.is_admin:
+                    roles[row.id] = "admin"
+                elif row.role == "vip" and _subscription_active(row.vip_expires_at, now):
+                    roles[row.id] = "vip"
+            sub_rows = await session.execute(
+                select(VipSubscription.user_id, VipSubscription.expires_at).where(
+                    VipSubscription.user_id.in_([uid for uid in pending if uid not in roles])
+                )
+            )
+            for row in sub_rows:
+                if _subscription_active(row.expires_at, now):
+                    roles[row.user_id] = "vip"
+            unresolved = [uid for uid in pending if uid not in roles]
+        except Exception as e:
+            logger.error(f"Error resolving roles in database: {e}")
+
+    if unresolved:
+        cached_vip = {uid: _VIP_CACHE.get(uid) for uid in unresolved}
+        to_check = [uid for uid, vip in cached_vip.items() if vip is None]
+        vip_channel_id = await _resolve_vip_channel_id(session) if to_check else 0
+        for user_id in unresolved:
+            is_member = cached_vip[user_id]
+            if is_member is None:
+                is_member = bool(vip_channel_id) and await _is_channel_member(
+                    bot, vip_channel_id, user_id
+                )
+            if is_member is None:
+                failed.add(user_id)
+            roles[user_id] = "vip" if is_member else "free"
+
+    for user_id in pending:
+        if user_id in failed:
+            continue
+        _ROLE_CACHE.set(user_id, roles[user_id])
+        if roles[user_id] != "admin":
+            _VIP_CACHE.set(user_id, roles[user_id] == "vip")
+    return roles
+
+
 def clear_role_cache(user_id: int = None):
     """Clear role cache for a specific user or all users."""
     if user_id:
-        _ROLE_CACHE.pop(user_id, None)
+        _ROLE_CACHE.pop(user_id)
+        _VIP_CACHE.pop(user_id)
         logger.debug(f"Cleared role cache for user {user_id}")
     else:
         _ROLE_CACHE.clear()
+        _VIP_CACHE.clear()
         logger.debug("Cleared all role cache")